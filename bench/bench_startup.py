@@ -0,0 +1,105 @@
+"""Time-to-first-response for both MCP servers, plus a check that answering the
+listing methods does not import heavy modules.
+
+    python bench/bench_startup.py --runs 10 --max-ms 400
+
+Each run spawns a fresh server, sends initialize, tools/list, prompts/list and
+resources/list, then closes stdin. The server is started with -X importtime, so the
+modules it loaded before exiting are exactly what those four answers cost. Exits
+non-zero if a median crosses --max-ms or a forbidden module was imported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+SERVERS = {
+    "runner": REPO / "mcp-runner" / "runner.py",
+    "browser": REPO / "mcp-browser-python" / "server.py",
+}
+# must only load on the first tools/call
+FORBIDDEN = ("playwright", "yaml", "asyncio", "sqlite3", "concurrent.futures", "orjson", "src")
+# ...except the stdlib-only framing and request metrics both servers use from the first message
+ALLOWED = {"src", "src.utils", "src.utils.jsonrpc", "src.utils.tracing"}
+LISTING = [
+    {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+    {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+    {"jsonrpc": "2.0", "id": 3, "method": "prompts/list"},
+    {"jsonrpc": "2.0", "id": 4, "method": "resources/list"},
+]
+
+def _imported(stderr: str) -> set:
+    mods = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name and name != "package":
+                mods.add(name)
+    return mods
+
+def run_once(script: Path) -> dict:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", str(script)], cwd=str(REPO),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env={**os.environ, "PYTHONIOENCODING": "utf-8"})
+    err_chunks = []  # drained on a thread so a chatty stderr cannot block the server
+    drain = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    proc.stdin.write((json.dumps(LISTING[0]) + "\n").encode())
+    proc.stdin.flush()
+    first = None
+    answered = set()
+    while len(answered) < len(LISTING):
+        line = proc.stdout.readline()
+        if not line:
+            break
+        msg = json.loads(line)
+        if msg.get("id") == 1 and first is None:
+            first = (time.perf_counter() - t0) * 1000
+            for req in LISTING[1:]:
+                proc.stdin.write((json.dumps(req) + "\n").encode())
+            proc.stdin.flush()
+        if "id" in msg:
+            answered.add(msg["id"])
+    listed = (time.perf_counter() - t0) * 1000
+    proc.stdin.close()
+    proc.wait(timeout=30)
+    drain.join(timeout=30)
+    err = b"".join(err_chunks)
+    if len(answered) < len(LISTING):
+        raise RuntimeError(f"{script.name} answered {sorted(answered)}:\n{err.decode(errors='replace')[-2000:]}")
+    mods = _imported(err.decode(errors="replace")) - ALLOWED
+    heavy = [f for f in FORBIDDEN if any(m == f or m.startswith(f + ".") for m in mods)]
+    return {"first_ms": first, "listed_ms": listed, "heavy": heavy}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=400.0,
+                        help="fail if the median time to the tools/list answer exceeds this")
+    parser.add_argument("--server", choices=sorted(SERVERS), action="append")
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.server or sorted(SERVERS):
+        results = [run_once(SERVERS[name]) for _ in range(max(1, args.runs))]
+        first = statistics.median(r["first_ms"] for r in results)
+        listed = statistics.median(r["listed_ms"] for r in results)
+        heavy = results[-1]["heavy"]
+        status = "ok"
+        if listed > args.max_ms:
+            status, failed = f"SLOW (> {args.max_ms:.0f} ms)", True
+        if heavy:
+            status, failed = f"imports {', '.join(heavy)} before first tools/call", True
+        print(f"{name:<8} initialize {first:7.1f} ms   all listings {listed:7.1f} ms   "
+              f"(median of {len(results)})  {status}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,370 @@
+"""Offline benchmark suite: each stage, the whole pipeline and local-runner save_post
+round-trips, compared against a saved baseline.
+
+    python bench/bench_suite.py --save                 # record a baseline on this machine
+    python bench/bench_suite.py                        # rerun; exit 1 on a regression
+    python bench/bench_suite.py --only rpc --sizes 1K,1M,5M --threshold 0.3
+
+Nothing touches the network: the Claude client is disabled so research uses its seed
+sources, unless --stub-latency-ms starts src/clients/stub_server.py and points the
+client at it. Outputs, state and blobs go to a temp dir. Every run is written to --out;
+when --baseline exists, each metric more than --threshold worse than its baseline value
+is reported and the exit status is 1. Baselines depend on the machine, so they live
+under run/bench/ rather than in git.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+RUNNER = REPO / "mcp-runner" / "runner.py"
+SUITES = ("stages", "pipeline", "rpc")
+
+WORDS = ["python", "kafka", "streams", "llm", "agents", "postgres", "indexing", "vector", "search",
+         "caching", "latency", "kubernetes", "rust", "async", "observability", "testing", "queues",
+         "schemas", "replication", "sharding", "tracing", "batching", "compilers", "embeddings"]
+HINTS = ["vs", "how to", "guide", "interview questions", "rag"]
+PROSE = WORDS + ["the", "a", "with", "for", "and", "when", "is", "of", "to", "in", "we", "it", "cost",
+                 "throughput", "budget", "failure", "design", "trade-off", "p99", "cache"]
+
+def make_topics(n: int, seed: int = 11) -> list:
+    """n distinct topics, some carrying intent keywords so every outline path is exercised."""
+    rnd = random.Random(seed)
+    seen, out = set(), []
+    while len(out) < n:
+        words = rnd.sample(WORDS, rnd.randint(2, 4))
+        if rnd.random() < 0.4:
+            words.insert(rnd.randrange(len(words)), rnd.choice(HINTS))
+        topic = " ".join(words).capitalize() + f" {len(out)}"
+        if topic not in seen:
+            seen.add(topic)
+            out.append(topic)
+    return out
+
+def make_markdown(size: int, seed: int) -> str:
+    """Roughly `size` bytes of post-shaped markdown: sections, paragraphs, lists and links."""
+    rnd = random.Random(seed)
+    parts, total, n = [f"# Benchmark post {seed}\n"], 0, 0
+    while total < size:
+        if n % 12 == 0:
+            parts.append(f"## Section {n // 12 + 1}\n")
+        if n % 5 == 4:
+            chunk = "\n".join(f"- {' '.join(rnd.choices(PROSE, k=8))}" for _ in range(4)) + "\n"
+        else:
+            chunk = " ".join(rnd.choices(PROSE, k=60)).capitalize() + "."
+            if n % 7 == 3:
+                chunk += f" See [notes {n}](https://example.com/{seed}/{n})."
+            chunk += "\n"
+        parts.append(chunk)
+        total += len(chunk) + 1
+        n += 1
+    return "\n".join(parts)
+
+def parse_size(text: str) -> int:
+    units = {"K": 1024, "M": 1024 * 1024}
+    text = text.strip().upper().rstrip("B")
+    return int(float(text[:-1]) * units[text[-1]]) if text[-1:] in units else int(text)
+
+def pct(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def metric(value: float, unit: str, better: str) -> dict:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+# ---- stages ---------------------------------------------------------------------------
+
+def bench_stages(topics: list, repeat: int, tmp: Path, fsync: bool) -> dict:
+    from src.stages import archive_stage, draft_stage, outline_stage, research_stage, review_stage
+    from src.utils.io import RunBundle
+
+    research = {t: research_stage.run(t) for t in topics}
+    outlines = {t: outline_stage.run(t, []) for t in topics}
+    drafts = {t: draft_stage.run(o.title, o.standfirst, o.hook, o.sections, research[t].sources)
+              for t, o in outlines.items()}
+    counter = iter(range(10 ** 9))
+
+    def archive(t):
+        d = drafts[t]
+        bundle = RunBundle(tmp / "archive" / str(next(counter)), fsync=fsync)
+        archive_stage.run(bundle, d.markdown, d.document.reference_lines(), document=d.document)
+
+    cases = {
+        "research": lambda t: research_stage.run(t),
+        "outline": lambda t: outline_stage.run(t, []),
+        "draft": lambda t: draft_stage.run(outlines[t].title, outlines[t].standfirst, outlines[t].hook,
+                                           outlines[t].sections, research[t].sources),
+        "review": lambda t: review_stage.run(drafts[t].markdown),
+        "archive": archive,
+    }
+    out = {}
+    for name, fn in cases.items():
+        best, lat = None, []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for t in topics:
+                t0 = time.perf_counter()
+                fn(t)
+                lat.append(time.perf_counter() - t0)
+            secs = time.perf_counter() - start
+            best = secs if best is None else min(best, secs)
+        out[f"stage.{name}.ops_per_s"] = metric(len(topics) / best, "ops/s", "higher")
+        out[f"stage.{name}.p95_ms"] = metric(pct(lat, 95) * 1000, "ms", "lower")
+        print(f"  {name:<10} {len(topics) / best:>10,.0f} ops/s   p50 {pct(lat, 50) * 1e6:8.1f} us"
+              f"   p95 {pct(lat, 95) * 1e6:8.1f} us")
+    return out
+
+# ---- pipeline -------------------------------------------------------------------------
+
+def bench_pipeline(topics: list, repeat: int, tmp: Path, workers: int) -> dict:
+    from src.blobs import open_blobs
+    from src.catalog import open_catalog
+    from src.config import get_config
+    from src.dedupe import open_guard
+    from src.orchestrator import RunOptions, _research_cache, run_batch
+
+    base = get_config()
+    best, lat = None, []
+    for n in range(repeat):
+        # fresh outputs and state each round, so no round reuses another's checkpoints
+        root = tmp / f"pipeline-{n}"
+        cfg = replace(base, paths=replace(base.paths, local_output=root / "outputs",
+                                          state_root=root / "state", blob_root=root / "blobs"))
+        opts = RunOptions(cache=_research_cache(cfg), catalog=open_catalog(cfg), dedupe=open_guard(cfg, "warn"),
+                          fsync=cfg.io.fsync, blobs=open_blobs(cfg))
+        start = time.perf_counter()
+        results = run_batch([(t, None) for t in topics], cfg.paths.local_output, workers=workers, opts=opts)
+        secs = time.perf_counter() - start
+        failed = [r for r in results if not r.ok]
+        if failed:
+            raise RuntimeError(f"pipeline failed for {failed[0].topic!r}: {failed[0].notes}")
+        lat += [r.seconds for r in results]
+        best = secs if best is None else min(best, secs)
+    print(f"  {len(topics)} posts, {workers} workers: {len(topics) / best:,.1f} posts/s   "
+          f"p50 {pct(lat, 50) * 1000:.1f} ms   p95 {pct(lat, 95) * 1000:.1f} ms per post")
+    return {
+        "pipeline.posts_per_s": metric(len(topics) / best, "posts/s", "higher"),
+        "pipeline.p95_ms": metric(pct(lat, 95) * 1000, "ms", "lower"),
+    }
+
+# ---- runner round-trips ---------------------------------------------------------------
+
+class Runner:
+    """mcp-runner as a subprocess; replies are collected on a reader thread."""
+
+    def __init__(self, tmp: Path):
+        env = {k: v for k, v in os.environ.items() if not k.startswith("ANTHROPIC_")}
+        env.update(ANTHROPIC_API_KEY="", LOCAL_OUTPUT_DIR=str(tmp / "outputs"), STATE_DIR=str(tmp / "state"),
+                   BLOB_DIR=str(tmp / "blobs"), SIMILARITY_ACTION="warn", PYTHONIOENCODING="utf-8")
+        self.proc = subprocess.Popen([sys.executable, str(RUNNER)], cwd=str(REPO), env=env,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.replies: "queue.Queue[dict]" = queue.Queue()
+        self.stderr: list = []
+        threading.Thread(target=self._read, daemon=True).start()
+        threading.Thread(target=lambda: self.stderr.append(self.proc.stderr.read()), daemon=True).start()
+        self.next_id = 0
+
+    def _read(self):
+        for line in self.proc.stdout:
+            msg = json.loads(line)
+            if isinstance(msg, list) or "id" in msg:  # skip notifications such as notifications/ready
+                self.replies.put(msg)
+
+    def request(self, method: str, params: dict | None = None) -> dict:
+        self.next_id += 1
+        return {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params or {}}
+
+    def write(self, payload):
+        self.proc.stdin.write(json.dumps(payload).encode("utf-8") + b"\n")
+        self.proc.stdin.flush()
+
+    def send(self, method: str, params: dict | None = None) -> int:
+        req = self.request(method, params)
+        self.write(req)
+        return req["id"]
+
+    def wait(self, count: int = 1, timeout: float = 300.0) -> list:
+        """Replies for the next `count` response lines (a batch array is one line)."""
+        out = []
+        for _ in range(count):
+            try:
+                msg = self.replies.get(timeout=timeout)
+            except queue.Empty:
+                raise RuntimeError(f"runner stopped answering:\n{self._tail()}") from None
+            for reply in msg if isinstance(msg, list) else [msg]:
+                result = reply.get("result") or {}
+                if "error" in reply or result.get("isError"):
+                    raise RuntimeError(f"runner call failed: {json.dumps(reply)[:500]}")
+                out.append(reply)
+        return out
+
+    def save_post(self, topic: str, markdown: str) -> int:
+        return self.send("tools/call", {"name": "save_post", "arguments": {"topic": topic, "markdown": markdown}})
+
+    def save_post_batch(self, posts: list) -> int:
+        """All (topic, markdown) pairs as one JSON-RPC batch line; answered by one array."""
+        self.write([self.request("tools/call", {"name": "save_post", "arguments": {"topic": t, "markdown": md}})
+                    for t, md in posts])
+        return len(posts)
+
+    def _tail(self) -> str:
+        return b"".join(self.stderr).decode(errors="replace")[-2000:]
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait(timeout=60)
+
+def bench_rpc(sizes: list, tmp: Path, budget_mb: float) -> dict:
+    runner = Runner(tmp)
+    out = {}
+    try:
+        runner.send("initialize")
+        runner.wait()
+        runner.save_post("warmup", make_markdown(2048, 0))  # first call pays for the lazy imports
+        runner.wait()
+        for size in sizes:
+            calls = max(3, min(50, int(budget_mb * 1024 * 1024 / size)))
+            docs = [make_markdown(size, seed=size + i) for i in range(calls)]
+            label = f"{size // 1024}K" if size < 1024 * 1024 else f"{size / 1024 / 1024:g}M"
+            lat = []
+            for i, md in enumerate(docs):  # one at a time: round-trip latency
+                t0 = time.perf_counter()
+                runner.save_post(f"rpc {label} serial {i}", md)
+                runner.wait()
+                lat.append(time.perf_counter() - t0)
+            start = time.perf_counter()  # all at once: throughput with the worker pool busy
+            for i, md in enumerate(docs):
+                runner.save_post(f"rpc {label} burst {i}", md)
+            runner.wait(len(docs))
+            secs = time.perf_counter() - start
+            start = time.perf_counter()  # one batch line carrying every call
+            runner.save_post_batch([(f"rpc {label} batch {i}", md) for i, md in enumerate(docs)])
+            runner.wait()
+            batch_secs = time.perf_counter() - start
+            mb_s = len(docs) * size / secs / 1024 / 1024
+            out[f"rpc.save_post.{label}.p50_ms"] = metric(pct(lat, 50) * 1000, "ms", "lower")
+            out[f"rpc.save_post.{label}.calls_per_s"] = metric(len(docs) / secs, "calls/s", "higher")
+            out[f"rpc.save_post.{label}.batch_calls_per_s"] = metric(len(docs) / batch_secs, "calls/s", "higher")
+            print(f"  {label:>5} x{len(docs):<3} p50 {pct(lat, 50) * 1000:8.1f} ms   p95 {pct(lat, 95) * 1000:8.1f} ms"
+                  f"   burst {len(docs) / secs:8.1f} calls/s {mb_s:7.1f} MB/s   batch {len(docs) / batch_secs:8.1f} calls/s")
+    finally:
+        runner.close()
+    return out
+
+# ---- baseline -------------------------------------------------------------------------
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Metrics that got worse than the baseline by more than `threshold` (0.25 = 25%)."""
+    regressions = []
+    print(f"\n{'metric':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, m in current.items():
+        old = baseline.get(name)
+        if not old or not old["value"] or not m["value"]:
+            print(f"{name:<36} {'-':>12} {m['value']:>12,.2f}")
+            continue
+        ratio = m["value"] / old["value"]
+        worse = (ratio - 1) if m["better"] == "lower" else (1 / ratio - 1)
+        flag = "  REGRESSION" if worse > threshold else ""
+        print(f"{name:<36} {old['value']:>12,.2f} {m['value']:>12,.2f} {(ratio - 1) * 100:>+7.1f}%{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", default=",".join(SUITES), help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--topics", type=int, default=200, help="corpus size for the stage benchmarks")
+    parser.add_argument("--posts", type=int, default=50, help="topics pushed through the whole pipeline")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per benchmark; the best round counts")
+    parser.add_argument("--sizes", default="1K,16K,256K,1M,5M", help="save_post payload sizes")
+    parser.add_argument("--rpc-budget-mb", type=float, default=8.0,
+                        help="payload bytes per size (bounds the call count for large sizes)")
+    parser.add_argument("--stub-latency-ms", type=float, default=None,
+                        help="serve research from the local Messages API stub instead of seed data")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    parser.add_argument("--baseline", default=str(REPO / "run" / "bench" / "baseline.json"))
+    parser.add_argument("--out", default=str(REPO / "run" / "bench" / "latest.json"))
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--keep", action="store_true", help="keep the temp dir with the generated runs")
+    args = parser.parse_args()
+    suites = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    for k in [k for k in os.environ if k.startswith("ANTHROPIC_")]:
+        del os.environ[k]
+    # empty rather than unset: get_config() copies .env into the environment, but never over
+    # a variable that is present, and an empty key keeps the client offline
+    os.environ["ANTHROPIC_API_KEY"] = ""
+    if args.stub_latency_ms is not None:
+        from src.clients.stub_server import serve
+        stub = serve(latency_ms=args.stub_latency_ms)
+        os.environ.update(ANTHROPIC_API_KEY="stub", ANTHROPIC_RATE_PER_SEC="0",
+                          ANTHROPIC_BASE_URL=f"http://127.0.0.1:{stub.server_port}")
+    from src.config import get_config
+    fsync = get_config().io.fsync
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench-"))
+    metrics = {}
+    try:
+        if "stages" in suites:
+            print(f"stages ({args.topics} topics, best of {args.repeat}):")
+            metrics.update(bench_stages(make_topics(args.topics), args.repeat, tmp, fsync))
+        if "pipeline" in suites:
+            print("pipeline:")
+            metrics.update(bench_pipeline(make_topics(args.posts, seed=12), args.repeat, tmp, args.workers))
+        if "rpc" in suites:
+            print("mcp-runner save_post:")
+            metrics.update(bench_rpc([parse_size(s) for s in args.sizes.split(",")], tmp / "rpc", args.rpc_budget_mb))
+    finally:
+        if args.keep:
+            print(f"runs kept in {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    result = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"topics": args.topics, "posts": args.posts, "workers": args.workers, "repeat": args.repeat,
+                     "fsync": fsync, "stub_latency_ms": args.stub_latency_ms},
+        "metrics": metrics,
+    }
+    for path in [args.out] + ([args.baseline] if args.save else []):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    if args.save:
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print(f"\nno baseline at {baseline_path}; rerun with --save to record one")
+        return 0
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("settings") != result["settings"]:
+        print(f"\nnote: baseline was recorded with different settings: {baseline.get('settings')}")
+    regressions = compare(metrics, baseline.get("metrics", {}), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nno regressions beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,57 +1,144 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import json, sys, io, pathlib
+import json, sys, io, pathlib, threading, re, time
 from typing import Any, Dict, Optional
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
 
-try:
-    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
-    sys.stderr.reconfigure(encoding="utf-8", errors="replace")
-except Exception:
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+# Cold start: initialize/tools/list must not pay for playwright, asyncio or src/ imports
+# (src.utils.tracing aside). Those load on the first tools/call (see _playwright(),
+# BrowserSession.run, _load_article).
+
+def _setup_stdio():
+    try:
+        sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+        sys.stderr.reconfigure(encoding="utf-8", errors="replace")
+    except Exception:
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+
+def _playwright():
+    import playwright.async_api
+    return playwright.async_api
 
 HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # shared helpers under src/
+from src.utils import jsonrpc  # line framing, batches; stdlib only until a large request
+from src.utils.tracing import Metrics, span  # stdlib only, cheap enough for cold start
+STATE_FILE = HERE / ".browser_state.json"  # signed-in cookies/localStorage, reused across launches
+TRACE_FILE = "publish.trace.json"  # next to the pipeline's trace.json, when tracing.enabled
+# the saved Medium draft (/p/<id>/edit) of a folder. published_url.txt stays for real
+# publications (finalize_stage), which the catalog reads as status "published"
+DRAFT_URL_FILE = "medium_draft_url.txt"
+# batch tabs never wait for an interactive sign-in: sign in once with medium_publish_from_folder
+BATCH_EDITOR_WAIT_MS = 5000
+
+# count and latency of every request, per method and per tool (see the metrics tool)
+METRICS = Metrics()
+TOOL_NAMES = ("medium_publish_from_folder", "medium_publish_batch", "metrics")
+
+# batch: the jsonrpc.Batch a request belongs to; its response goes out with the rest of the batch
+def send(o, batch=None):
+    if batch is not None:
+        batch.add(o); return
+    sys.stdout.buffer.write(jsonrpc.frame(o)); sys.stdout.buffer.flush()
+def respond(i, r, batch=None): send({"jsonrpc":"2.0","id":i,"result":r}, batch)
+def respond_err(i, c, m, batch=None): send({"jsonrpc":"2.0","id":i,"error":{"code":c,"message":m}}, batch)
+
+def _tracer(fp: pathlib.Path):
+    """Tracer for one folder's publish when tracing.enabled, else None."""
+    from src.config import get_config
+    if not get_config().tracing.enabled:
+        return None
+    from src.utils.tracing import Tracer
+    return Tracer("publish", folder=fp.name)
+
+def _load_article(folder: pathlib.Path) -> "Rendered":
+    # draft.json is rendered straight from the tree; older folders, or a draft.md edited since the
+    # tree was saved, fall back to parsing draft.md once
+    from src.utils.document import load_document
+    return load_document(folder).render()
+
+# Dispatch a synthetic paste so the editor ingests the whole body in one event;
+# fall back to execCommand when the editor does not handle the event itself.
+_PASTE_JS = """([html, text]) => {
+  let el = document.activeElement;
+  if (!el || !el.isContentEditable) el = document.querySelector("div[contenteditable='true']");
+  if (!el) return "none";
+  const dt = new DataTransfer();
+  dt.setData("text/html", html);
+  dt.setData("text/plain", text);
+  const ev = new ClipboardEvent("paste", {clipboardData: dt, bubbles: true, cancelable: true});
+  el.dispatchEvent(ev);
+  if (ev.defaultPrevented) return "paste";
+  return document.execCommand("insertHTML", false, html) ? "execCommand" : "none";
+}"""
+
+# Medium assigns a story id (/p/<id>/edit) on first save and shows "Saved" in the top bar.
+_SAVED_JS = """() => /\\/p\\/[0-9a-f]+\\/edit/.test(location.pathname)
+  || /\\bSaved\\b/.test((document.querySelector("header, .metabar") || document.body).innerText)"""
+
+INSERT_MODES = ("paste", "insert_text", "type")
+STORY_URL_RE = re.compile(r"/p/[0-9a-f]+/edit")
+
+async def _insert_article(page, art: "Rendered", mode: str) -> str:
+    title, body = art.title, art.body
+    if mode == "type":
+        await page.keyboard.type(title)
+        await page.keyboard.press("Enter")
+        await page.keyboard.type("\n" + body)
+        return "type"
+    await page.keyboard.insert_text(title)
+    await page.keyboard.press("Enter")
+    if mode == "paste":
+        used = await page.evaluate(_PASTE_JS, [art.html, body])
+        if used != "none":
+            return used
+    await page.keyboard.insert_text(body)
+    return "insert_text"
 
-def send(o): sys.stdout.write(json.dumps(o, ensure_ascii=True) + "\n"); sys.stdout.flush()
-def respond(i, r): send({"jsonrpc":"2.0","id":i,"result":r})
-def respond_err(i, c, m): send({"jsonrpc":"2.0","id":i,"error":{"code":c,"message":m}})
-
-def _split_title_body(markdown: str):
-    lines = markdown.splitlines()
-    if lines and lines[0].lstrip().startswith("# "):
-        return (lines[0].lstrip()[2:].strip() or "Untitled", "\n".join(lines[1:]).lstrip())
-    for i, ln in enumerate(lines):
-        if ln.strip():
-            return (ln.strip().lstrip("# ").strip() or "Untitled", "\n".join(lines[i+1:]).lstrip())
-    return ("Untitled", markdown)
-
-def _load_markdown(folder: pathlib.Path) -> str:
-    md = folder / "draft.md"
-    if not md.exists(): raise FileNotFoundError(f"draft.md not found in {folder}")
-    return md.read_text(encoding="utf-8")
-
-def _open_medium_editor(context, wait_edit_ms=600000):
-    page = context.new_page()
-    page.goto("https://medium.com/new-story", wait_until="load", timeout=60000)
+async def _wait_saved(page, timeout_ms: int) -> bool:
     try:
-        page.wait_for_url("**/new-story**", timeout=15000)
-        page.wait_for_selector("div[contenteditable='true']", timeout=15000)
-        return page, True
-    except PWTimeout:
+        await page.wait_for_function(_SAVED_JS, timeout=timeout_ms, polling=250)
+        return True
+    except _playwright().TimeoutError:
+        return False
+
+async def _estimate_keystroke_ms(page, n_chars: int, probe_len: int = 200) -> float:
+    """Time keyboard.type() on a throwaway off-screen textarea and extrapolate."""
+    await page.evaluate("""() => { const t = document.createElement("textarea");
+        t.id = "__mcp_probe"; t.style.cssText = "position:fixed;left:-9999px;top:0";
+        document.body.appendChild(t); t.focus(); }""")
+    try:
+        t0 = time.perf_counter()
+        await page.keyboard.type("x" * probe_len)
+        per_char = (time.perf_counter() - t0) * 1000 / probe_len
+    finally:
+        await page.evaluate("""() => { const t = document.getElementById("__mcp_probe"); if (t) t.remove(); }""")
+    return per_char * n_chars
+
+async def _open_medium_editor(context, wait_edit_ms=600000):
+    page = await context.new_page()
+    return page, await _goto_editor(page, wait_edit_ms)
+
+async def _goto_editor(page, wait_edit_ms=600000) -> bool:
+    await page.goto("https://medium.com/new-story", wait_until="load", timeout=60000)
+    try:
+        await page.wait_for_url("**/new-story**", timeout=15000)
+        await page.wait_for_selector("div[contenteditable='true']", timeout=15000)
+        return True
+    except _playwright().TimeoutError:
         pass
-    # wait for login to complete
-    page.bring_to_front()
+    # session expired (or first run): wait for login to complete
+    await page.bring_to_front()
     print("[browser-mcp-python] Waiting for Medium editor (sign in if needed)...", file=sys.stderr)
     try:
-        page.wait_for_url("**/new-story**", timeout=wait_edit_ms)
-        page.wait_for_selector("div[contenteditable='true']", timeout=30000)
-        return page, True
-    except PWTimeout:
-        return page, False
-
-def _launch_chrome(playwright, user_data_dir: str):
-    ctx = playwright.chromium.launch_persistent_context(
+        await page.wait_for_url("**/new-story**", timeout=wait_edit_ms)
+        await page.wait_for_selector("div[contenteditable='true']", timeout=30000)
+        return True
+    except _playwright().TimeoutError:
+        return False
+
+async def _launch_chrome(playwright, user_data_dir: str):
+    ctx = await playwright.chromium.launch_persistent_context(
         user_data_dir=user_data_dir,
         headless=False,
         channel="chrome",
@@ -62,118 +149,470 @@ def _launch_chrome(playwright, user_data_dir: str):
               "--no-first-run","--no-default-browser-check"]
     )
     # reduce automation signals
-    ctx.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined});")
+    await ctx.add_init_script("Object.defineProperty(navigator,'webdriver',{get:()=>undefined});")
     return ctx
 
-def _attach_chrome(playwright, cdp_url="http://localhost:9222"):
-    browser = playwright.chromium.connect_over_cdp(cdp_url)
-    ctx = browser.contexts[0] if browser.contexts else browser.new_context()
+async def _attach_chrome(playwright, cdp_url="http://localhost:9222"):
+    browser = await playwright.chromium.connect_over_cdp(cdp_url)
+    ctx = browser.contexts[0] if browser.contexts else await browser.new_context()
     return browser, ctx
 
-def publish_from_folder(folder: str, pause_for_login: bool = True,
-                        attach_to_chrome: bool = False, cdp_url: Optional[str] = None,
-                        profile_dir: Optional[str] = None):
-    fp = pathlib.Path(folder).resolve()
-    if not fp.exists(): return {"ok": False, "error": f"folder not found: {fp}"}
+class BrowserSession:
+    """Warm browser context shared by every tool call.
+
+    Playwright objects live on a private event-loop thread; tool handlers call
+    run() from the stdin loop. The context is started lazily, health-checked
+    before reuse and relaunched if Chrome went away."""
 
-    markdown = _load_markdown(fp)
-    title, body = _split_title_body(markdown)
+    def __init__(self):
+        self._loop = None  # asyncio loop, created on the first tool call
+        self._pw = None
+        self._browser = None
+        self._context = None
+        self._key = None
 
-    with sync_playwright() as p:
+    def run(self, coro):
+        import asyncio
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="playwright", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def context(self, attach_to_chrome: bool = False, cdp_url: Optional[str] = None,
+                      profile_dir: Optional[str] = None):
         if attach_to_chrome:
-            browser, context = _attach_chrome(p, cdp_url or "http://localhost:9222")
+            key = ("cdp", cdp_url or "http://localhost:9222")
+        else:
+            key = ("profile", str(pathlib.Path(profile_dir or (HERE / ".browser_profile")).resolve()))
+        if self._context is not None and (key != self._key or not await self.healthy()):
+            await self.close()
+        if self._context is None:
+            await self._start(key)
+        return self._context
+
+    async def _start(self, key):
+        if self._pw is None:
+            self._pw = await _playwright().async_playwright().start()
+        mode, target = key
+        if mode == "cdp":
+            self._browser, self._context = await _attach_chrome(self._pw, target)
         else:
-            prof = pathlib.Path(profile_dir or (HERE / ".browser_profile")).resolve()
-            prof.mkdir(parents=True, exist_ok=True)
-            context = _launch_chrome(p, str(prof))
-            browser = context.browser
+            pathlib.Path(target).mkdir(parents=True, exist_ok=True)
+            self._context = await _launch_chrome(self._pw, target)
+            self._browser = None
+        self._key = key
+        self._context.on("close", self._on_context_close)
+        await self._restore_state()
+
+    def _on_context_close(self, ctx):
+        if ctx is self._context:  # Chrome crashed or the window was closed by hand
+            self._forget()
+
+    def _forget(self):
+        self._context = None; self._browser = None; self._key = None
+
+    async def healthy(self) -> bool:
+        import asyncio
+        if self._context is None:
+            return False
+        if self._browser is not None and not self._browser.is_connected():
+            return False
+        try:
+            # cheap round-trip to the browser; raises if the context/process is gone
+            await asyncio.wait_for(self._context.cookies("https://medium.com"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def _restore_state(self):
+        if not STATE_FILE.exists():
+            return
+        try:
+            state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            if state.get("cookies"):
+                await self._context.add_cookies(state["cookies"])
+        except Exception as e:
+            print(f"[browser-mcp-python] Ignoring saved session state: {e}", file=sys.stderr)
+
+    async def save_state(self):
+        if self._context is not None:
+            await self._context.storage_state(path=str(STATE_FILE))
+
+    async def close(self):
+        ctx, browser = self._context, self._browser
+        self._forget()
+        try:
+            if browser is not None:
+                await browser.close()   # disconnects from an attached Chrome, leaves it running
+            elif ctx is not None:
+                await ctx.close()
+        except Exception:
+            pass
+
+    async def shutdown(self):
+        await self.close()
+        if self._pw is not None:
+            await self._pw.stop()
+            self._pw = None
+
+    def stop(self):
+        if self._loop is not None:
+            self.run(self.shutdown())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+SESSION = BrowserSession()
+
+async def _publish(fp: pathlib.Path, art: "Rendered", pause_for_login: bool,
+                   attach_to_chrome: bool, cdp_url: Optional[str], profile_dir: Optional[str],
+                   insert_mode: str = "paste", compare_keystroke: bool = False,
+                   save_timeout_ms: int = 30000, tracer=None):
+    with span(tracer, "open_editor", "browser") as sp:
+        context = await SESSION.context(attach_to_chrome, cdp_url, profile_dir)
+        page, ready = await _open_medium_editor(context)
+        sp.set(ready=ready)
+    if not ready:
+        return {"ok": False, "error": "Editor not ready (likely not signed in). Sign in in the opened window and re-run."}
+    await SESSION.save_state()
+
+    if pause_for_login:
+        try:
+            await page.evaluate("""() => alert('Ready to paste your article. Click OK to paste into the editor.')""")
+        except Exception:
+            pass
 
-        page, ready = _open_medium_editor(context)
-        if not ready:
-            return {"ok": False, "error": "Editor not ready (likely not signed in). Sign in in the opened window and re-run."}
+    res = await _paste_into_editor(page, art, insert_mode, compare_keystroke, save_timeout_ms, tracer)
+    _record_draft(fp, res)
+    return res
 
-        if pause_for_login:
+async def _paste_into_editor(page, art: "Rendered", insert_mode: str,
+                             compare_keystroke: bool, save_timeout_ms: int, tracer=None):
+    timings: Dict[str, Any] = {"chars": len(art.title) + len(art.body)}
+    if compare_keystroke and insert_mode != "type":
+        timings["keystroke_estimate_ms"] = round(await _estimate_keystroke_ms(page, timings["chars"]), 1)
+
+    try:
+        await page.click("div[contenteditable='true']", timeout=10000)
+    except Exception:
+        await page.click("body", timeout=5000)
+
+    t0 = time.perf_counter()
+    timings["mode"] = await _insert_article(page, art, insert_mode)
+    t1 = time.perf_counter()
+    saved = await _wait_saved(page, save_timeout_ms)
+    t2 = time.perf_counter()
+
+    if tracer is not None:
+        tracer.add("insert", t0, t1, "browser", mode=timings["mode"], chars=timings["chars"])
+        tracer.add("save_wait", t1, t2, "browser", saved=saved)
+
+    timings["insert_ms"] = round((t1 - t0) * 1000, 1)
+    timings["save_wait_ms"] = round((t2 - t1) * 1000, 1)
+    if timings["mode"] == "type":
+        timings["keystroke_estimate_ms"] = timings["insert_ms"]
+    if timings.get("keystroke_estimate_ms") and timings["insert_ms"] > 0:
+        timings["speedup_vs_keystroke"] = round(timings["keystroke_estimate_ms"] / timings["insert_ms"], 1)
+
+    url = page.url
+    return {"ok": True, "url": url, "saved": saved, "story_url": bool(STORY_URL_RE.search(url)),
+            "timings": timings}
+
+def _record_draft(fp: pathlib.Path, res: dict):
+    # marks the folder as pasted so batch runs skip it next time
+    if res.get("ok") and res.get("story_url"):
+        (fp / DRAFT_URL_FILE).write_text(res["url"], encoding="utf-8")
+
+async def _publish_batch(folders: list, concurrency: int, retries: int,
+                         attach_to_chrome: bool, cdp_url: Optional[str], profile_dir: Optional[str],
+                         insert_mode: str, save_timeout_ms: int):
+    import asyncio
+    context = await SESSION.context(attach_to_chrome, cdp_url, profile_dir)
+    # check the session once: signed out, every tab would otherwise wait out the sign-in timeout
+    started = time.perf_counter()
+    first = await context.new_page()
+    try:
+        ready, error = await _goto_editor(first, BATCH_EDITOR_WAIT_MS), ""
+    except Exception as e:
+        ready, error = False, f"{type(e).__name__}: {e}"
+    if not ready:
+        await first.close()
+        error = error or "Editor not ready (likely not signed in). Sign in with medium_publish_from_folder and re-run."
+        seconds = round(time.perf_counter() - started, 2)
+        return [{"ok": False, "error": error, "folder": str(fp), "attempts": 0, "seconds": seconds} for fp in folders]
+    opened = [first]
+    pages: "asyncio.Queue[Any]" = asyncio.Queue()
+    pages.put_nowait(first)
+    for _ in range(concurrency - 1):
+        pages.put_nowait(None)  # the other tabs are opened on first use
+
+    async def one(fp: pathlib.Path):
+        started = time.perf_counter()
+        tracer = _tracer(fp)
+        res: Dict[str, Any] = {"ok": False, "error": "not attempted"}
+        attempts = 0
+        page = await pages.get()
+        try:
+            for attempts in range(1, retries + 2):
+                if page is None or page.is_closed():
+                    page = await context.new_page(); opened.append(page)
+                try:
+                    with span(tracer, "load_article", "browser"):
+                        art = _load_article(fp)
+                    with span(tracer, "open_editor", "browser", attempt=attempts):
+                        ready = await _goto_editor(page, BATCH_EDITOR_WAIT_MS)
+                    if not ready:
+                        res = {"ok": False, "error": "Editor not ready (likely not signed in)."}
+                        continue
+                    res = await _paste_into_editor(page, art, insert_mode, False, save_timeout_ms, tracer)
+                    _record_draft(fp, res)
+                    break
+                except FileNotFoundError as e:
+                    res = {"ok": False, "error": str(e)}
+                    break
+                except Exception as e:
+                    res = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            pages.put_nowait(page)
+        res.update(folder=str(fp), attempts=attempts, seconds=round(time.perf_counter() - started, 2))
+        if tracer is not None and fp.is_dir():
+            tracer.add("publish", started, time.perf_counter(), "rpc", ok=res["ok"], attempts=attempts)
+            tracer.write(fp, TRACE_FILE)
+        return res
+
+    try:
+        results = await asyncio.gather(*(one(fp) for fp in folders))
+    finally:
+        for page in opened:
             try:
-                page.evaluate("""() => alert('Ready to paste your article. Click OK to paste into the editor.')""")
+                await page.close()
             except Exception:
                 pass
+    await SESSION.save_state()
+    return results
 
-        try:
-            page.click("div[contenteditable='true']", timeout=10000)
-        except Exception:
-            page.click("body", timeout=5000)
+def publish_from_folder(folder: str, pause_for_login: bool = True,
+                        attach_to_chrome: bool = False, cdp_url: Optional[str] = None,
+                        profile_dir: Optional[str] = None, insert_mode: str = "paste",
+                        compare_keystroke: bool = False, save_timeout_ms: int = 30000):
+    fp = pathlib.Path(folder).resolve()
+    if not fp.exists(): return {"ok": False, "error": f"folder not found: {fp}"}
+    if insert_mode not in INSERT_MODES:
+        return {"ok": False, "error": f"insert_mode must be one of {', '.join(INSERT_MODES)}"}
 
-        page.keyboard.type(title)
-        page.keyboard.press("Enter")
-        page.keyboard.type("\n" + body)
-        page.wait_for_timeout(1500)
-        url = page.url
-        return {"ok": True, "url": url}
+    started = time.perf_counter()
+    tracer = _tracer(fp)
+    with span(tracer, "load_article", "browser"):
+        art = _load_article(fp)
+    res = SESSION.run(_publish(fp, art, pause_for_login, attach_to_chrome, cdp_url, profile_dir,
+                               insert_mode, compare_keystroke, save_timeout_ms, tracer))
+    if tracer is not None:
+        tracer.add("publish", started, time.perf_counter(), "rpc", ok=res.get("ok", False))
+        tracer.write(fp, TRACE_FILE)
+    return res
+
+def _batch_folders(folders: Optional[list], pattern: Optional[str], root: Optional[str]):
+    if root:
+        base = pathlib.Path(root).resolve()
+    else:
+        from src.config import get_config  # paths.local_output, same view as the runner
+        base = get_config().paths.local_output
+    out, seen = [], set()
+    for f in folders or []:
+        fp = pathlib.Path(str(f).strip())
+        out.append((fp if fp.is_absolute() else base / fp).resolve())
+    if pattern:
+        out += sorted(p.resolve() for p in base.glob(pattern) if p.is_dir())
+    uniq = []
+    for fp in out:
+        if fp not in seen:
+            seen.add(fp); uniq.append(fp)
+    return uniq
+
+def publish_batch(folders: Optional[list] = None, glob: Optional[str] = None, root: Optional[str] = None,
+                  concurrency: int = 3, retries: int = 1,
+                  attach_to_chrome: bool = False, cdp_url: Optional[str] = None,
+                  profile_dir: Optional[str] = None, insert_mode: str = "paste",
+                  save_timeout_ms: int = 30000):
+    if not folders and not glob:
+        return {"ok": False, "error": "give folders and/or glob"}
+    if insert_mode not in INSERT_MODES:
+        return {"ok": False, "error": f"insert_mode must be one of {', '.join(INSERT_MODES)}"}
+
+    started = time.perf_counter()
+    results, todo = [], []
+    for fp in _batch_folders(folders, glob, root):
+        marker = next((fp / n for n in ("published_url.txt", DRAFT_URL_FILE) if (fp / n).is_file()), None)
+        if not fp.is_dir():
+            results.append({"ok": False, "folder": str(fp), "error": "folder not found"})
+        elif marker is not None:
+            results.append({"ok": True, "folder": str(fp), "skipped": True,
+                            "url": marker.read_text(encoding="utf-8").strip()})
+        else:
+            todo.append(fp)
+
+    if todo:
+        results += SESSION.run(_publish_batch(todo, max(1, concurrency), max(0, retries),
+                                              attach_to_chrome, cdp_url, profile_dir,
+                                              insert_mode, save_timeout_ms))
+    published = sum(1 for r in results if r.get("ok") and not r.get("skipped"))
+    return {"ok": all(r.get("ok") for r in results), "published": published,
+            "skipped": sum(1 for r in results if r.get("skipped")),
+            "failed": sum(1 for r in results if not r.get("ok")),
+            "seconds": round(time.perf_counter() - started, 2), "results": results}
+
+def _tool_text(res: dict) -> dict:
+    return {"content":[{"type":"text","text":json.dumps(res, ensure_ascii=False)}], "isError": not res.get("ok",False)}
+
+def call_tool(name: str, args: dict) -> dict:
+    try:
+        if name == "medium_publish_from_folder":
+            return _tool_text(publish_from_folder(
+                folder=(args.get("folder") or "").strip(),
+                pause_for_login=bool(args.get("pause_for_login", True)),
+                attach_to_chrome=bool(args.get("attach_to_chrome", False)),
+                cdp_url=args.get("cdp_url"),
+                profile_dir=args.get("profile_dir"),
+                insert_mode=args.get("insert_mode") or "paste",
+                compare_keystroke=bool(args.get("compare_keystroke", False)),
+                save_timeout_ms=int(args.get("save_timeout_ms", 30000))
+            ))
+        if name == "medium_publish_batch":
+            return _tool_text(publish_batch(
+                folders=args.get("folders"),
+                glob=args.get("glob"),
+                root=args.get("root"),
+                concurrency=int(args.get("concurrency", 3)),
+                retries=int(args.get("retries", 1)),
+                attach_to_chrome=bool(args.get("attach_to_chrome", False)),
+                cdp_url=args.get("cdp_url"),
+                profile_dir=args.get("profile_dir"),
+                insert_mode=args.get("insert_mode") or "paste",
+                save_timeout_ms=int(args.get("save_timeout_ms", 30000))
+            ))
+        if name == "metrics":
+            return {"content":[{"type":"text","text":json.dumps(METRICS.snapshot(args.get("name")))}],"isError":False}
+    except Exception as e:
+        return _tool_text({"ok":False,"error":f"{type(e).__name__}: {e}"})
+    return _tool_text({"ok":False,"error":f"unknown tool: {name}"})
 
 def main():
-    for raw in sys.stdin:
-        raw = raw.strip()
-        if not raw: continue
-        try: msg = json.loads(raw)
+    _setup_stdio()
+    try:
+        _serve()
+    finally:
+        SESSION.stop()
+
+def _serve():
+    # bytes in: no decode or strip copy before parsing
+    for raw in sys.stdin.buffer:
+        received = time.perf_counter()
+        if raw.isspace(): continue
+        try: msg = jsonrpc.loads(raw)
         except Exception: continue
+        if isinstance(msg, list):
+            _handle_batch(msg, received)
+        else:
+            _handle(msg, received)
 
-        method = msg.get("method"); req_id = msg.get("id")
-
-        if method == "initialize":
-            respond(req_id, {
-                "protocolVersion": "2025-06-18",
-                "serverInfo": {"name": "browser-mcp-python", "version": "2.0"},
-                "capabilities": {"tools": {}}
-            })
-            send({"jsonrpc":"2.0","method":"notifications/ready","params":{"capabilities":{"tools":{}}}})
-            continue
-
-        if method == "prompts/list": respond(req_id, {"prompts":[]}); continue
-        if method == "resources/list": respond(req_id, {"resources":[]}); continue
-
-        if method == "tools/list":
-            respond(req_id, {"tools":[
-                {
-                    "name":"medium_publish_from_folder",
-                    "description":"Open Medium new story and paste draft.md. Can attach to a running Chrome (remote debugging) or launch Chrome with persistent profile.",
-                    "inputSchema":{
-                        "type":"object",
-                        "properties":{
-                            "folder":{"type":"string","minLength":3,"pattern":"^[^\\r\\n\\t]{3,}$"},
-                            "pause_for_login":{"type":"boolean"},
-                            "attach_to_chrome":{"type":"boolean"},
-                            "cdp_url":{"type":"string"},
-                            "profile_dir":{"type":"string"}
-                        },
-                        "required":["folder"],
-                        "additionalProperties":False
-                    }
-                }
-            ]})
-            continue
+def _handle_batch(items: list, received: float):
+    """A JSON-RPC batch: entries are handled in order and answered as one array."""
+    if not items:
+        respond_err(None, jsonrpc.INVALID_REQUEST, "empty batch"); return
+    batch = jsonrpc.Batch(sum(1 for m in items if jsonrpc.expects_reply(m)), send)
+    for item in items:
+        reply = batch if jsonrpc.expects_reply(item) else jsonrpc.NO_REPLY
+        if not isinstance(item, dict):
+            respond_err(None, jsonrpc.INVALID_REQUEST, "batch entries must be objects", reply); continue
+        _handle(item, received, reply)
 
-        if method == "tools/call":
-            p = msg.get("params") or {}
-            name = p.get("name"); args = p.get("arguments") or {}
-            if name == "medium_publish_from_folder":
-                try:
-                    res = publish_from_folder(
-                        folder=(args.get("folder") or "").strip(),
-                        pause_for_login=bool(args.get("pause_for_login", True)),
-                        attach_to_chrome=bool(args.get("attach_to_chrome", False)),
-                        cdp_url=args.get("cdp_url"),
-                        profile_dir=args.get("profile_dir")
-                    )
-                    respond(req_id, {"content":[{"type":"text","text":json.dumps(res)}], "isError": not res.get("ok",False)})
-                except Exception as e:
-                    respond(req_id, {"content":[{"type":"text","text":json.dumps({"ok":False,"error":f"{type(e).__name__}: {e}"})}], "isError":True})
-                continue
+def _handle(msg: dict, received: float, batch=None):
+    method = msg.get("method"); req_id = msg.get("id")
+
+    if method == "tools/call":
+        p = msg.get("params") or {}
+        name = p.get("name")
+        result = call_tool(name, p.get("arguments") or {})
+        respond(req_id, result, batch)
+        METRICS.observe(name if name in TOOL_NAMES else "unknown_tool", time.perf_counter() - received,
+                        ok=not result.get("isError"))
+        return
+
+    ok = _answer(method, req_id, batch)
+    if req_id is not None:
+        METRICS.observe(method if ok else "unknown_method", time.perf_counter() - received, ok=ok)
 
-            respond(req_id, {"content":[{"type":"text","text":json.dumps({"ok":False,"error":f"unknown tool: {name}"})}],"isError":True})
-            continue
+def _answer(method, req_id, batch=None) -> bool:
+    """Everything but tools/call; False for unknown methods."""
+    if method == "initialize":
+        respond(req_id, {
+            "protocolVersion": "2025-06-18",
+            "serverInfo": {"name": "browser-mcp-python", "version": "2.0"},
+            "capabilities": {"tools": {}}
+        }, batch)
+        send({"jsonrpc":"2.0","method":"notifications/ready","params":{"capabilities":{"tools":{}}}})
+        return True
+
+    if method == "prompts/list": respond(req_id, {"prompts":[]}, batch); return True
+    if method == "resources/list": respond(req_id, {"resources":[]}, batch); return True
+
+    if method == "tools/list":
+        respond(req_id, {"tools":[
+            {
+                "name":"medium_publish_from_folder",
+                "description":"Open Medium new story and paste draft.md. Can attach to a running Chrome (remote debugging) or launch Chrome with persistent profile.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{
+                        "folder":{"type":"string","minLength":3,"pattern":"^[^\\r\\n\\t]{3,}$"},
+                        "pause_for_login":{"type":"boolean"},
+                        "attach_to_chrome":{"type":"boolean"},
+                        "cdp_url":{"type":"string"},
+                        "profile_dir":{"type":"string"},
+                        "insert_mode":{"type":"string","enum":list(INSERT_MODES),
+                                       "description":"paste = one HTML paste (default), insert_text = one plain-text insert, type = per-key typing"},
+                        "compare_keystroke":{"type":"boolean",
+                                             "description":"Also time per-key typing on a probe and report the estimated keystroke cost"},
+                        "save_timeout_ms":{"type":"integer","minimum":0}
+                    },
+                    "required":["folder"],
+                    "additionalProperties":False
+                }
+            },
+            {
+                "name":"medium_publish_batch",
+                "description":"Publish many run folders (list and/or glob under the output root) through a pool of editor tabs in one browser session. Folders with published_url.txt or medium_draft_url.txt (written when a draft is saved) are skipped.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{
+                        "folders":{"type":"array","items":{"type":"string"}},
+                        "glob":{"type":"string","description":"e.g. '2025-10-*' relative to root"},
+                        "root":{"type":"string","description":"defaults to paths.local_output (run/outputs)"},
+                        "concurrency":{"type":"integer","minimum":1,"maximum":8},
+                        "retries":{"type":"integer","minimum":0,"maximum":5},
+                        "attach_to_chrome":{"type":"boolean"},
+                        "cdp_url":{"type":"string"},
+                        "profile_dir":{"type":"string"},
+                        "insert_mode":{"type":"string","enum":list(INSERT_MODES)},
+                        "save_timeout_ms":{"type":"integer","minimum":0}
+                    },
+                    "additionalProperties":False
+                }
+            },
+            {
+                "name":"metrics",
+                "description":"Request counts, errors and latency (p50/p95/p99, histogram) per tool and JSON-RPC method since the server started.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{"name":{"type":"string","description":"only this tool or method"}},
+                    "additionalProperties":False
+                }
+            }
+        ]}, batch)
+        return True
 
-        if req_id is not None:
-            respond_err(req_id, -32601, f"Method not found: {method}")
+    if req_id is not None:
+        respond_err(req_id, jsonrpc.METHOD_NOT_FOUND, f"Method not found: {method}", batch)
+    return False
 
 if __name__ == "__main__":
     main()
@@ -1,26 +1,54 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, sys, json, io, pathlib, re, yaml, datetime
+import os, sys, json, io, pathlib, datetime, queue, threading, time
 
 # ---- Encoding (Windows-safe)
-try:
-    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
-    sys.stderr.reconfigure(encoding="utf-8", errors="replace")
-except Exception:
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+def _setup_stdio():
+    try:
+        sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+        sys.stderr.reconfigure(encoding="utf-8", errors="replace")
+    except Exception:
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
+# ---- Cold start: config/yaml, sqlite and the src/ helpers are imported inside the tool code,
+# so initialize/tools/list answer before any of them load. The tool pool starts on the
+# first tools/call too.
 REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))  # shared helpers under src/
+from src.utils import jsonrpc  # line framing, batches; stdlib only until a large request
+from src.utils.tracing import Metrics  # stdlib only, cheap enough for cold start
 
-def send(o): 
-    sys.stdout.write(json.dumps(o, ensure_ascii=True) + "\n"); sys.stdout.flush()
-def respond(i, r): 
-    send({"jsonrpc": "2.0", "id": i, "result": r})
-def respond_err(i, code, msg): 
-    send({"jsonrpc":"2.0","id":i,"error":{"code":code,"message":msg}})
+# ---- Metrics: count and latency of every request, per method and per tool (see the metrics tool)
+METRICS = Metrics()
+TOOL_NAMES = ("save_post", "save_post_begin", "save_post_append", "save_post_commit", "metrics")
+
+# ---- Concurrency: tools/call runs on a bounded pool, one thread owns stdout
+MAX_WORKERS = max(1, int(os.environ.get("RUNNER_WORKERS", "4")))
+MAX_PENDING = MAX_WORKERS * 4  # stop reading stdin once this many calls are queued/running
+
+_out_q: "queue.Queue[bytes | None]" = queue.Queue()
+
+def _writer():
+    out = sys.stdout.buffer  # UTF-8 bytes from jsonrpc.frame, no text layer
+    while True:
+        line = _out_q.get()
+        if line is None:
+            break
+        out.write(line); out.flush()
+
+# batch: the jsonrpc.Batch a request belongs to; its response goes out with the rest of the batch
+def send(o, batch=None):
+    if batch is not None:
+        batch.add(o)
+    else:
+        _out_q.put(jsonrpc.frame(o))
+def respond(i, r, batch=None): 
+    send({"jsonrpc": "2.0", "id": i, "result": r}, batch)
+def respond_err(i, code, msg, batch=None): 
+    send({"jsonrpc":"2.0","id":i,"error":{"code":code,"message":msg}}, batch)
 
 # ---- Tiny utils
-LINK_RE = re.compile(r'\[([^\]]+)\]\((https?://[^\s)]+)\)')
 def today_slug():
     return datetime.datetime.now().strftime("%Y-%m-%d")
 
@@ -34,31 +62,51 @@ def slugify(text: str) -> str:
 def ensure_dir(p: pathlib.Path) -> pathlib.Path:
     p.mkdir(parents=True, exist_ok=True); return p
 
-def write_text(path: pathlib.Path, content: str):
-    ensure_dir(path.parent); path.write_text(content, encoding="utf-8")
-
-def extract_refs(markdown: str):
-    seen, out = set(), []
-    for m in LINK_RE.finditer(markdown or ""):
-        title = (m.group(1) or "").strip() or "Untitled"
-        url = (m.group(2) or "").strip()
-        key = (title.lower(), url)
-        if url.startswith("http") and key not in seen:
-            seen.add(key); out.append({"title": title, "url": url})
-    return out
+def config():
+    # cached by src.config; reparsed only when app.yaml or .env changes on disk
+    from src.config import get_config
+    return get_config()
 
 def output_root():
-    cfg = REPO_ROOT / "config" / "app.yaml"
-    if cfg.exists():
-        try:
-            conf = yaml.safe_load(cfg.read_text(encoding="utf-8"))
-            root = (REPO_ROOT / conf["paths"]["local_output"]).resolve()
-            return ensure_dir(root)
-        except Exception:
-            pass
-    return ensure_dir(REPO_ROOT / "run" / "outputs")
+    return ensure_dir(config().paths.local_output)
 
-def make_out_folder(topic: str):
+def state_root():
+    return ensure_dir(config().paths.state_root)
+
+# Catalog, blob store and duplicate guard are built once per config version
+_state_lock = threading.Lock()
+_state: dict = {}
+_state_cfg = None
+
+def _shared(name: str, build):
+    global _state_cfg
+    with _state_lock:
+        cfg = config()
+        if cfg != _state_cfg:
+            _state.clear()
+            _state_cfg = cfg
+        if name not in _state:
+            _state[name] = build(cfg)
+        return _state[name]
+
+def catalog() -> "Catalog":
+    from src.catalog import open_catalog
+    return _shared("catalog", open_catalog)
+
+def blob_store():
+    """BlobStore under paths.blob_root, or None when the config does not set one."""
+    from src.blobs import open_blobs
+    return _shared("blobs", open_blobs)
+
+def duplicate_guard() -> "DuplicateGuard":
+    from src.dedupe import open_guard
+    def build(cfg):
+        guard = open_guard(cfg)
+        guard.index.sync(ensure_dir(cfg.paths.local_output))  # incremental: only new/changed drafts are hashed
+        return guard
+    return _shared("guard", build)
+
+def out_folder_path(topic: str) -> pathlib.Path:
     root = output_root()
     folder = root / f"{today_slug()}_{slugify(topic)}"
     # shorten if necessary (Windows MAX_PATH)
@@ -66,111 +114,523 @@ def make_out_folder(topic: str):
         import hashlib
         h8 = hashlib.sha1(str(folder).encode("utf-8")).hexdigest()[:8]
         folder = root / f"{today_slug()}_{h8}"
-    return ensure_dir(folder)
+    return folder
+
+def make_out_folder(topic: str):
+    return ensure_dir(out_folder_path(topic))
 
 def save_post(topic: str, markdown: str, references: list | None):
+    from src.utils.catalog import content_hash
+    from src.utils.document import Citation, parse_markdown
+    from src.utils.io import RunBundle
+    from src.utils.similarity import describe
+    from src.utils.tracing import Tracer, span
+    started = time.perf_counter()
+    tracer = Tracer("save_post", topic=topic.strip()) if config().tracing.enabled else None
+    # Parse once: H1 check, reference links and the draft.json tree all come from here
+    with span(tracer, "parse") as sp:
+        doc, had_h1 = parse_markdown(markdown, title=topic.strip())
+        sp.set(sections=len(doc.sections))
+    if not had_h1:  # ensure H1 title at top for Medium
+        markdown = f"# {topic.strip()}\n\n" + (markdown or "")
+
+    # near-duplicate check before touching the filesystem (re-saving the same folder is fine);
+    # it sees the exact text that is indexed below, so the draft signature is computed once
+    with span(tracer, "duplicate_check", bytes=len(markdown)) as sp:
+        guard = duplicate_guard()
+        dups = guard.find(topic.strip(), markdown, exclude=[str(out_folder_path(topic).resolve())])
+        sp.set(matches=len(dups))
+    if dups and guard.action == "abort":
+        return {"ok": False, "error": describe(dups[0]), "similar": dups}
+
     out = make_out_folder(topic)
 
-    # Ensure H1 title at top for Medium
-    lines = (markdown or "").splitlines()
-    if not lines or not lines[0].lstrip().startswith("# "):
-        markdown = f"# {topic.strip()}\n\n" + (markdown or "")
+    # draft.md, references.txt, draft.json and RUNLOG.txt are published together (draft.md last)
+    acc = today_slug()
+    refs = references or doc.links()
+    doc.citations = [Citation(i + 1, r["title"], r["url"], acc) for i, r in enumerate(refs)]
+    digest = content_hash(markdown)
+    doc.source_hash = digest  # lets load_document() spot a later hand edit of draft.md
+    with span(tracer, "bundle") as sp:
+        with RunBundle(out, blobs=blob_store()) as bundle:
+            bundle.add("draft.md", markdown)
+            if refs:
+                bundle.add("references.txt", "\n".join(doc.reference_lines()) + "\n")
+            bundle.add("draft.json", doc.to_json())
+            bundle.add("RUNLOG.txt", "Saved via local-runner.save_post (Claude-provided content).\n")
+            files = bundle.commit()
+        if tracer is not None:
+            sp.set(files=len(files), references=len(refs), bytes=sum(f.stat().st_size for f in files))
+
+    with span(tracer, "index"):
+        _index_saved(out, topic.strip(), guard, digest, markdown)
+    if tracer is not None:
+        tracer.add("save_post", started, time.perf_counter(), cat="rpc", bytes=len(markdown),
+                   warnings=len(dups))
+        tracer.write(out)
+    return _saved(out, dups)
+
+def _index_saved(out: pathlib.Path, topic: str, guard, digest: str, markdown: str | None, draft_sig=None):
+    try:
+        catalog().record(out, topic=topic, date=today_slug(), status="saved", content_hash=digest)
+        guard.add(out, topic, markdown, draft_sig=draft_sig)
+    except Exception as e:  # the files are saved; an index hiccup must not fail the call
+        print(f"[local-runner] catalog/index update failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+def _saved(out: pathlib.Path, dups: list) -> dict:
+    from src.utils.similarity import describe
+    res = {"ok": True, "folder": str(out)}
+    if dups:
+        res["warnings"] = [describe(d) for d in dups]
+        res["similar"] = dups
+    return res
+
+# ---- Chunked uploads: save_post_begin / save_post_append / save_post_commit stream a large
+# draft into the run folder, so memory is bounded by the chunk size instead of the post size
+UPLOAD_TTL = 3600  # idle sessions and orphaned .upload-*.part files older than this are dropped
+MAX_UPLOADS = 16
+MAX_CHUNK_CHARS = int(os.environ.get("RUNNER_MAX_CHUNK", str(4 << 20)))
+
+class _Upload:
+    """One save_post_begin session. Chunks are appended to <run folder>/.upload-<id>.part,
+    which commit publishes as draft.md; references, the content hash and the similarity
+    signature are computed as chunks arrive instead of from the whole text at the end."""
+    def __init__(self, upload_id: str, topic: str, references: list, folder: pathlib.Path):
+        import hashlib
+        from src.utils.document import LinkCollector
+        from src.utils.similarity import DraftSignature
+        self.id, self.topic, self.references, self.folder = upload_id, topic, references, folder
+        self.part = folder / f".upload-{upload_id}.part"
+        self.file = open(self.part, "w", encoding="utf-8", newline="")
+        self.lock = threading.Lock()
+        self.closed = False
+        self.seq = 0          # next expected chunk number
+        self.chars = 0
+        self.nonblank = 0     # counted only up to the "markdown too short" limit
+        self.touched = time.monotonic()
+        self.head = ""        # leading text held back until we know whether it opens with an H1
+        self.had_h1 = None
+        self.links = LinkCollector()
+        self.sig = DraftSignature()
+        self.sha = hashlib.sha256()
+
+    def _write(self, text: str):
+        self.file.write(text)
+        self.sha.update(text.encode("utf-8"))
+        self.links.feed(text)
+        self.sig.feed(text)
+
+    def append(self, chunk: str):
+        self.seq += 1
+        self.chars += len(chunk)
+        self.touched = time.monotonic()
+        if self.nonblank < 30:
+            self.nonblank += len("".join(chunk.split()))
+        if self.had_h1 is not None:
+            self._write(chunk)
+            return
+        self.head += chunk
+        first = self.head.lstrip()
+        if len(first) >= 2:
+            self._decide(first.startswith("# "))
+
+    def _decide(self, had_h1: bool):
+        self.had_h1 = had_h1
+        head, self.head = self.head, ""
+        if not had_h1:  # ensure H1 title at top for Medium, like save_post
+            head = f"# {self.topic}\n\n" + head
+        self._write(head)
+
+    def finish(self):
+        """Close the part file; returns (citations, draft signature)."""
+        if self.had_h1 is None:
+            self._decide(self.head.lstrip().startswith("# "))
+        self.closed = True
+        self.file.close()
+        return self.links.finish(), self.sig.finish()
+
+    def discard(self):
+        self.closed = True
+        self.file.close()
+        self.part.unlink(missing_ok=True)
+
+_uploads: dict = {}
+_uploads_lock = threading.Lock()
+
+def _expire_uploads():
+    cutoff = time.monotonic() - UPLOAD_TTL
+    with _uploads_lock:
+        stale = [u for u in _uploads.values() if u.touched < cutoff]
+        for u in stale:
+            del _uploads[u.id]
+    for u in stale:
+        with u.lock:
+            u.discard()
+
+def _sweep_parts(folder: pathlib.Path):
+    # left behind by a runner that exited mid-upload
+    cutoff = time.time() - UPLOAD_TTL
+    for p in folder.glob(".upload-*.part"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+        except OSError:
+            pass
+
+def save_post_begin(topic: str, references: list | None):
+    from src.utils.similarity import describe
+    _expire_uploads()
+    # topic check up front, before megabytes of draft are sent; the draft is checked on commit
+    guard = duplicate_guard()
+    dups = guard.find(topic, exclude=[str(out_folder_path(topic).resolve())])
+    if dups and guard.action == "abort":
+        return {"ok": False, "error": describe(dups[0]), "similar": dups}
+    out = make_out_folder(topic)
+    _sweep_parts(out)
+    with _uploads_lock:
+        if len(_uploads) >= MAX_UPLOADS:
+            return {"ok": False, "error": f"too many open uploads (max {MAX_UPLOADS})"}
+        upload = _Upload(os.urandom(8).hex(), topic, references or [], out)
+        _uploads[upload.id] = upload
+    return {"ok": True, "upload_id": upload.id, "folder": str(out), "max_chunk_chars": MAX_CHUNK_CHARS}
+
+def save_post_append(upload_id: str, seq: int, chunk: str):
+    with _uploads_lock:
+        upload = _uploads.get(upload_id)
+    if upload is None:
+        return {"ok": False, "error": "unknown or expired upload_id"}
+    with upload.lock:
+        if upload.closed:
+            return {"ok": False, "error": "unknown or expired upload_id"}
+        if seq < upload.seq:  # a retried chunk that already arrived
+            return {"ok": True, "duplicate": True, "next_seq": upload.seq}
+        if seq != upload.seq:
+            return {"ok": False, "error": f"expected seq {upload.seq}, got {seq}", "next_seq": upload.seq}
+        upload.append(chunk)
+        return {"ok": True, "next_seq": upload.seq, "chars": upload.chars}
+
+def save_post_commit(upload_id: str, chunks: int | None, references: list | None):
+    from src.utils.document import Citation
+    from src.utils.io import RunBundle
+    from src.utils.similarity import describe
+    from src.utils.tracing import Tracer, span
+    started = time.perf_counter()
+    with _uploads_lock:
+        upload = _uploads.get(upload_id)
+    if upload is None:
+        return {"ok": False, "error": "unknown or expired upload_id"}
+    with upload.lock:
+        if upload.closed:
+            return {"ok": False, "error": "unknown or expired upload_id"}
+        if chunks is not None and chunks != upload.seq:  # the session stays open for the missing chunks
+            return {"ok": False, "error": f"received {upload.seq} chunk(s), expected {chunks}", "next_seq": upload.seq}
+        with _uploads_lock:
+            _uploads.pop(upload.id, None)
+        if upload.nonblank < 30:
+            upload.discard()
+            return {"ok": False, "error": "markdown too short"}
+        citations, draft_sig = upload.finish()
+
+    topic, out = upload.topic, upload.folder
+    tracer = Tracer("save_post_commit", topic=topic, chunks=upload.seq) if config().tracing.enabled else None
+    with span(tracer, "duplicate_check", bytes=upload.part.stat().st_size) as sp:
+        guard = duplicate_guard()
+        dups = guard.find(topic, draft_sig=draft_sig, exclude=[str(out.resolve())])
+        sp.set(matches=len(dups))
+    if dups and guard.action == "abort":
+        upload.discard()
+        try:
+            out.rmdir()  # created by save_post_begin; kept if anything else is in it
+        except OSError:
+            pass
+        return {"ok": False, "error": describe(dups[0]), "similar": dups}
+
+    acc = today_slug()
+    refs = references or upload.references or [{"title": c.title, "url": c.url} for c in citations]
+    lines = [Citation(i + 1, r["title"], r["url"], acc).reference_line() for i, r in enumerate(refs)]
+    # no draft.json: building the tree needs the whole draft in memory; the publisher parses
+    # draft.md instead (load_document). Drop one left by an earlier save_post of this topic.
+    (out / "draft.json").unlink(missing_ok=True)
+    with span(tracer, "bundle") as sp:
+        with RunBundle(out, blobs=blob_store()) as bundle:
+            bundle.adopt(upload.part, "draft.md")
+            if refs:
+                bundle.add("references.txt", "\n".join(lines) + "\n")
+            bundle.add("RUNLOG.txt", f"Saved via local-runner.save_post_commit ({upload.seq} chunk(s), "
+                                     "Claude-provided content).\n")
+            files = bundle.commit()
+        if tracer is not None:
+            sp.set(files=len(files), references=len(refs), bytes=sum(f.stat().st_size for f in files))
+
+    with span(tracer, "index"):
+        _index_saved(out, topic, guard, upload.sha.hexdigest(), None, draft_sig)
+    if tracer is not None:
+        tracer.add("save_post_commit", started, time.perf_counter(), cat="rpc", chars=upload.chars,
+                   warnings=len(dups))
+        tracer.write(out)
+    return _saved(out, dups)
+
+def tool_error(message: str):
+    return {"content":[{"type":"text","text":json.dumps({"ok":False,"error":message}, ensure_ascii=False)}],"isError":True}
+
+def _tool_result(fn, *args):
+    try:
+        res = fn(*args)
+        return {"content":[{"type":"text","text":json.dumps(res, ensure_ascii=False)}],"isError": not res.get("ok",False)}
+    except Exception as e:
+        return tool_error(f"{type(e).__name__}: {e}")
+
+def call_tool(name: str, args: dict):
+    if name == "save_post":
+        topic = (args.get("topic") or "").strip()
+        markdown = (args.get("markdown") or "")
+        references = args.get("references") or []
+        if not topic:
+            return tool_error("topic required")
+        if len(markdown.strip()) < 30:
+            return tool_error("markdown too short")
+        return _tool_result(save_post, topic, markdown, references)
+
+    if name == "save_post_begin":
+        topic = (args.get("topic") or "").strip()
+        if not topic:
+            return tool_error("topic required")
+        return _tool_result(save_post_begin, topic, args.get("references") or [])
+
+    if name == "save_post_append":
+        chunk = args.get("chunk")
+        if not isinstance(chunk, str):
+            return tool_error("chunk (string) required")
+        if len(chunk) > MAX_CHUNK_CHARS:
+            return tool_error(f"chunk larger than {MAX_CHUNK_CHARS} characters")
+        if not isinstance(args.get("seq"), int):
+            return tool_error("seq (integer) required")
+        return _tool_result(save_post_append, str(args.get("upload_id") or ""), args["seq"], chunk)
+
+    if name == "save_post_commit":
+        chunks = args.get("chunks")
+        return _tool_result(save_post_commit, str(args.get("upload_id") or ""),
+                            chunks if isinstance(chunks, int) else None, args.get("references") or [])
+
+    if name == "metrics":
+        return {"content":[{"type":"text","text":json.dumps(METRICS.snapshot(args.get("name")))}],"isError":False}
+
+    return tool_error(f"unknown tool: {name}")
 
-    # Write draft.md
-    write_text(out / "draft.md", markdown)
+class _InFlight:
+    __slots__ = ("future", "cancelled")
+    def __init__(self):
+        self.future = None
+        self.cancelled = False
 
-    # Write references.txt
-    refs = references or extract_refs(markdown)
-    if refs:
-        acc = today_slug()
-        lines = [f"[{i+1}] {r['title']} — {r['url']} (accessed: {acc})" for i, r in enumerate(refs)]
-        write_text(out / "references.txt", "\n".join(lines) + "\n")
+inflight: dict = {}
+inflight_lock = threading.Lock()
 
-    # Run log
-    write_text(out / "RUNLOG.txt", "Saved via local-runner.save_post (Claude-provided content).\n")
-    return {"ok": True, "folder": str(out)}
+def _run_call(req_id, call: _InFlight, name, args, received: float, batch=None):
+    try:
+        result = call_tool(name, args)
+    except Exception as e:
+        result = tool_error(f"{type(e).__name__}: {e}")
+    # latency as the client sees it: from reading the request, including time queued for a worker
+    METRICS.observe(name if name in TOOL_NAMES else "unknown_tool", time.perf_counter() - received,
+                    ok=not result.get("isError"))
+    with inflight_lock:
+        if inflight.get(req_id) is call:
+            del inflight[req_id]
+    if not call.cancelled:
+        respond(req_id, result, batch)
+    elif batch is not None:
+        batch.add(None)
+
+def _call_done(future, pending: threading.BoundedSemaphore, batch):
+    pending.release()
+    if batch is not None and future.cancelled():
+        batch.add(None)  # cancelled before it started: _run_call never answered
+
+_pool = None
+
+def _tool_pool():
+    global _pool
+    if _pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="tool")
+    return _pool
 
 def main():
-    for raw in sys.stdin:
-        raw = raw.strip()
-        if not raw: 
+    _setup_stdio()
+    writer = threading.Thread(target=_writer, name="stdout-writer", daemon=True)
+    writer.start()
+    pending = threading.BoundedSemaphore(MAX_PENDING)
+    try:
+        _serve(pending)
+    finally:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _out_q.put(None)
+        writer.join()
+
+def _serve(pending: threading.BoundedSemaphore):
+    # bytes in: no decode or strip copy of large payloads before parsing
+    for raw in sys.stdin.buffer:
+        received = time.perf_counter()
+        if raw.isspace():
             continue
         try:
-            msg = json.loads(raw)
+            msg = jsonrpc.loads(raw)
         except Exception:
             continue
+        if isinstance(msg, list):
+            _handle_batch(msg, pending, received)
+        else:
+            _handle(msg, pending, received)
 
-        method = msg.get("method"); req_id = msg.get("id")
-
-        if method == "initialize":
-            respond(req_id, {
-                "protocolVersion": "2025-06-18",
-                "serverInfo": {"name": "local-runner", "version": "2.0"},
-                "capabilities": {"tools": {}}
-            })
-            send({"jsonrpc":"2.0","method":"notifications/ready","params":{"capabilities":{"tools":{}}}})
+def _handle_batch(items: list, pending: threading.BoundedSemaphore, received: float):
+    """A JSON-RPC batch: requests run like single ones (tools/call concurrently on the
+    pool) and their responses are sent back as one array once all have answered."""
+    if not items:
+        respond_err(None, jsonrpc.INVALID_REQUEST, "empty batch")
+        return
+    batch = jsonrpc.Batch(sum(1 for m in items if jsonrpc.expects_reply(m)), send)
+    for item in items:
+        reply = batch if jsonrpc.expects_reply(item) else jsonrpc.NO_REPLY
+        if not isinstance(item, dict):
+            respond_err(None, jsonrpc.INVALID_REQUEST, "batch entries must be objects", reply)
             continue
+        _handle(item, pending, received, reply)
+
+def _handle(msg: dict, pending: threading.BoundedSemaphore, received: float, batch=None):
+    method = msg.get("method"); req_id = msg.get("id")
+
+    if method == "tools/call":
+        p = msg.get("params") or {}
+        if req_id is None:
+            return
+        pending.acquire()
+        call = _InFlight()
+        with inflight_lock:
+            inflight[req_id] = call
+        call.future = _tool_pool().submit(_run_call, req_id, call, p.get("name"), p.get("arguments") or {},
+                                           received, batch)
+        call.future.add_done_callback(lambda f: _call_done(f, pending, batch))
+        return
+
+    if method == "notifications/cancelled":
+        rid = (msg.get("params") or {}).get("requestId")
+        with inflight_lock:
+            call = inflight.pop(rid, None) if rid is not None else None
+        if call is not None:
+            # Not started yet -> never runs; already running -> finishes but stays silent.
+            call.cancelled = True
+            if call.future is not None:
+                call.future.cancel()
+        if batch is not None:
+            batch.add(None)  # sent with an id, it was counted as a request; never answered
+        return
+
+    ok = _answer(method, req_id, batch)
+    if req_id is not None:
+        METRICS.observe(method if ok else "unknown_method", time.perf_counter() - received, ok=ok)
 
-        if method == "prompts/list":
-            respond(req_id, {"prompts": []}); continue
-        if method == "resources/list":
-            respond(req_id, {"resources": []}); continue
-
-        if method == "tools/list":
-            respond(req_id, {"tools": [
-                {
-                    "name":"save_post",
-                    "description":"Save Claude-written markdown to run/outputs as draft.md (+references.txt).",
-                    "inputSchema":{
-                        "type":"object",
-                        "properties":{
-                            "topic":{"type":"string","minLength":3,"pattern":"^[^\\r\\n\\t]{3,}$"},
-                            "markdown":{"type":"string","minLength":30},
-                            "references":{
-                                "type":"array",
-                                "items":{
-                                    "type":"object",
-                                    "properties":{
-                                        "title":{"type":"string"},
-                                        "url":{"type":"string"},
-                                        "accessed":{"type":"string"}
-                                    },
-                                    "required":["title","url"],
-                                    "additionalProperties":True
-                                }
+def _answer(method, req_id, batch=None) -> bool:
+    """Requests answered inline on the reader thread; False for unknown methods."""
+    if method == "initialize":
+        respond(req_id, {
+            "protocolVersion": "2025-06-18",
+            "serverInfo": {"name": "local-runner", "version": "2.0"},
+            "capabilities": {"tools": {}}
+        }, batch)
+        send({"jsonrpc":"2.0","method":"notifications/ready","params":{"capabilities":{"tools":{}}}})
+        return True
+
+    if method == "prompts/list":
+        respond(req_id, {"prompts": []}, batch); return True
+    if method == "resources/list":
+        respond(req_id, {"resources": []}, batch); return True
+
+    if method == "tools/list":
+        respond(req_id, {"tools": [
+            {
+                "name":"save_post",
+                "description":"Save Claude-written markdown to run/outputs as draft.md (+references.txt).",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{
+                        "topic":{"type":"string","minLength":3,"pattern":"^[^\\r\\n\\t]{3,}$"},
+                        "markdown":{"type":"string","minLength":30},
+                        "references":{
+                            "type":"array",
+                            "items":{
+                                "type":"object",
+                                "properties":{
+                                    "title":{"type":"string"},
+                                    "url":{"type":"string"},
+                                    "accessed":{"type":"string"}
+                                },
+                                "required":["title","url"],
+                                "additionalProperties":True
                             }
-                        },
-                        "required":["topic","markdown"],
-                        "additionalProperties":False
-                    }
+                        }
+                    },
+                    "required":["topic","markdown"],
+                    "additionalProperties":False
                 }
-            ]})
-            continue
-
-        if method == "tools/call":
-            p = msg.get("params") or {}
-            name = p.get("name"); args = p.get("arguments") or {}
-
-            if name == "save_post":
-                topic = (args.get("topic") or "").strip()
-                markdown = (args.get("markdown") or "")
-                references = args.get("references") or []
-                if not topic:
-                    respond(req_id, {"content":[{"type":"text","text":json.dumps({"ok":False,"error":"topic required"})}],"isError":True}); continue
-                if len(markdown.strip()) < 30:
-                    respond(req_id, {"content":[{"type":"text","text":json.dumps({"ok":False,"error":"markdown too short"})}],"isError":True}); continue
-                try:
-                    res = save_post(topic, markdown, references)
-                    respond(req_id, {"content":[{"type":"text","text":json.dumps(res)}],"isError": not res.get("ok",False)})
-                except Exception as e:
-                    respond(req_id, {"content":[{"type":"text","text":json.dumps({"ok":False,"error":f"{type(e).__name__}: {e}"})}],"isError":True})
-                continue
-
-            respond(req_id, {"content":[{"type":"text","text":json.dumps({"ok":False,"error":f"unknown tool: {name}"})}],"isError":True})
-            continue
+            },
+            {
+                "name":"save_post_begin",
+                "description":"Start a chunked save_post for drafts too large for one call: returns an upload_id for save_post_append/save_post_commit.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{
+                        "topic":{"type":"string","minLength":3,"pattern":"^[^\\r\\n\\t]{3,}$"},
+                        "references":{"type":"array","items":{"type":"object","required":["title","url"]}}
+                    },
+                    "required":["topic"],
+                    "additionalProperties":False
+                }
+            },
+            {
+                "name":"save_post_append",
+                "description":"Append the next piece of markdown to an upload. seq starts at 0 and must increase by one per chunk; resending an earlier seq is ignored.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{
+                        "upload_id":{"type":"string"},
+                        "seq":{"type":"integer","minimum":0},
+                        "chunk":{"type":"string","maxLength":MAX_CHUNK_CHARS}
+                    },
+                    "required":["upload_id","seq","chunk"],
+                    "additionalProperties":False
+                }
+            },
+            {
+                "name":"save_post_commit",
+                "description":"Publish an upload as draft.md (+references.txt from the given references or the draft's inline links). Same result as save_post.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{
+                        "upload_id":{"type":"string"},
+                        "chunks":{"type":"integer","minimum":0,"description":"number of chunks sent; commit fails while any is missing"},
+                        "references":{"type":"array","items":{"type":"object","required":["title","url"]}}
+                    },
+                    "required":["upload_id"],
+                    "additionalProperties":False
+                }
+            },
+            {
+                "name":"metrics",
+                "description":"Request counts, errors and latency (p50/p95/p99, histogram) per tool and JSON-RPC method since the server started.",
+                "inputSchema":{
+                    "type":"object",
+                    "properties":{"name":{"type":"string","description":"only this tool or method"}},
+                    "additionalProperties":False
+                }
+            }
+        ]}, batch)
+        return True
 
-        if req_id is not None:
-            respond_err(req_id, -32601, f"Method not found: {method}")
+    if req_id is not None:
+        respond_err(req_id, jsonrpc.METHOD_NOT_FOUND, f"Method not found: {method}", batch)
+    return False
 
 if __name__ == "__main__":
     main()
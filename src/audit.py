@@ -0,0 +1,102 @@
+﻿"""Re-review every draft under the output root in parallel processes.
+
+    python -m src.audit                      # config local_output
+    python -m src.audit run/outputs run/PUBLISHED --workers 8 --jsonl findings.jsonl
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List
+from .config import get_config
+from .stages.review_stage import run as review_run, SEVERITIES
+
+CHUNK = 16  # drafts per task, to amortize IPC per file
+
+def iter_drafts(*roots: Path) -> Iterator[Path]:
+    """Yield <root>/<run>/draft.md lazily, without listing the whole tree up front."""
+    for root in roots:
+        try:
+            entries = os.scandir(root)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir() and not entry.name.startswith("."):
+                    draft = Path(entry.path) / "draft.md"
+                    if draft.is_file():
+                        yield draft
+
+def review_file(path: Path) -> dict:
+    try:
+        result = review_run(path.read_text(encoding="utf-8-sig", errors="replace"))
+    except Exception as e:
+        return {"folder": str(path.parent), "ok": False, "notes": f"{type(e).__name__}: {e}",
+                "findings": [], "metrics": {}}
+    return {"folder": str(path.parent), "ok": result.ok, "notes": result.notes,
+            "findings": [asdict(f) for f in result.findings], "metrics": result.metrics}
+
+def review_files(paths: List[Path]) -> List[dict]:
+    return [review_file(p) for p in paths]
+
+def review_all(pool: ProcessPoolExecutor, paths: Iterable[Path], window: int) -> Iterator[dict]:
+    """Results in input order, with at most `window` chunks submitted ahead of the one being
+    read, so paths are pulled from the iterator as the pool catches up, not all up front."""
+    paths = iter(paths)
+    pending: deque = deque()
+    while True:
+        while len(pending) < window:
+            chunk = list(islice(paths, CHUNK))
+            if not chunk:
+                break
+            pending.append(pool.submit(review_files, chunk))
+        if not pending:
+            return
+        yield from pending.popleft().result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Review every draft.md under one or more output roots")
+    parser.add_argument("roots", nargs="*", help="defaults to paths.local_output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--min-severity", choices=SEVERITIES, default="warning",
+                        help="lowest severity to print per file")
+    parser.add_argument("--jsonl", help="also write one JSON result per draft to this file")
+    args = parser.parse_args()
+
+    roots = [Path(r).resolve() for r in args.roots] or [get_config().paths.local_output]
+    floor = SEVERITIES.index(args.min_severity)
+    out = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+    counts = {s: 0 for s in SEVERITIES}
+    files = failed = 0
+    started = time.perf_counter()
+    try:
+        workers = max(1, args.workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for res in review_all(pool, iter_drafts(*roots), window=2 * workers):
+                files += 1
+                failed += not res["ok"]
+                for f in res["findings"]:
+                    counts[f["severity"]] += 1
+                shown = [f for f in res["findings"] if SEVERITIES.index(f["severity"]) >= floor]
+                if shown or not res["ok"]:
+                    print(f"{'FAIL' if not res['ok'] else 'WARN'}  {res['folder']}")
+                    for f in shown:
+                        where = f":{f['line']}" if f["line"] else ""
+                        print(f"      {f['severity']:7} {f['rule']}{where}  {f['message']}")
+                if out:
+                    out.write(json.dumps(res, ensure_ascii=False) + "\n")
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f"\nReviewed {files} draft(s) in {elapsed:.2f}s: {failed} failing, "
+          f"{counts['error']} error(s), {counts['warning']} warning(s), {counts['info']} info")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+﻿import argparse
+import json
+from .config import AppConfig, get_config
+from .utils.blobs import BlobStore
+
+ARTIFACTS = ("research.md", "outline.md", "draft.md", "draft.json", "references.txt", "RUNLOG.txt")
+
+def open_blobs(cfg: AppConfig) -> BlobStore | None:
+    return BlobStore(cfg.paths.blob_root) if cfg.paths.blob_root else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed blob store for run artifacts")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="Blob count, size and how many are unreferenced")
+    p = sub.add_parser("gc", help="Delete blobs no run or published folder links to")
+    p.add_argument("--dry-run", action="store_true")
+    sub.add_parser("ingest", help="Move files of existing run/published folders into the store")
+    args = parser.parse_args()
+
+    cfg = get_config()
+    blobs = open_blobs(cfg)
+    if blobs is None:
+        print("paths.blob_root is not set in config/app.yaml")
+        return 1
+
+    if args.cmd == "stats":
+        print(json.dumps(blobs.stats(), indent=2))
+    elif args.cmd == "gc":
+        res = blobs.gc(dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        print(f"{verb} {res['removed']} blob(s), {res['bytes']} bytes")
+    else:
+        folders = 0
+        for root in cfg.output_roots:
+            for folder in sorted(root.glob("*/")) if root.is_dir() else []:
+                blobs.ingest_folder(folder, ARTIFACTS)
+                folders += 1
+        print(f"Ingested {folders} folder(s); {json.dumps(blobs.stats())}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+﻿import argparse
+import json
+from pathlib import Path
+from .config import AppConfig, get_config
+from .utils.catalog import Catalog, STATUSES
+
+def open_catalog(cfg: AppConfig) -> Catalog:
+    return Catalog(cfg.paths.state_root / "catalog.sqlite")
+
+def _print_rows(rows, as_json: bool):
+    if as_json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return
+    for r in rows:
+        url = f"  {r['published_url']}" if r.get("published_url") else ""
+        print(f"{r.get('date') or '----------'}  {r.get('status') or '?':13}  {r.get('topic') or r.get('slug')}{url}")
+        print(f"            {r['folder']}")
+    print(f"({len(rows)} run(s))")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the run catalog")
+    parser.add_argument("--json", action="store_true")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild", help="Re-index every folder under local_output and published_root")
+    p = sub.add_parser("lookup", help="Have we written about this topic?")
+    p.add_argument("topic")
+    p = sub.add_parser("list", help="Filter runs by status/date")
+    p.add_argument("--status", choices=STATUSES)
+    p.add_argument("--unpublished", action="store_true")
+    p.add_argument("--since", help="YYYY-MM-DD")
+    p.add_argument("--until", help="YYYY-MM-DD")
+    p.add_argument("--limit", type=int, default=100)
+    p = sub.add_parser("show", help="Catalog entry for one run folder")
+    p.add_argument("folder")
+    args = parser.parse_args()
+
+    cfg = get_config()
+    catalog = open_catalog(cfg)
+
+    if args.cmd == "rebuild":
+        n = catalog.rebuild(*cfg.output_roots)
+        print(f"Indexed {n} run folder(s) into {catalog.path}")
+        return 0
+    if args.cmd == "lookup":
+        rows = catalog.lookup(args.topic)
+        _print_rows(rows, args.json)
+        return 0 if rows else 1
+    if args.cmd == "list":
+        _print_rows(catalog.query(status=args.status, since=args.since, until=args.until,
+                                  unpublished=args.unpublished, limit=args.limit), args.json)
+        return 0
+    row = catalog.get(Path(args.folder))
+    if row is None:
+        print(f"Not in catalog: {args.folder}")
+        return 1
+    _print_rows([row], args.json)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,188 @@
 ﻿import os
+import json
+import time
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
 from typing import Optional, Dict, Any, List
 
+DEFAULT_BASE_URL = "https://api.anthropic.com"
+DEFAULT_MODEL = "claude-sonnet-4-5"
+API_VERSION = "2023-06-01"
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+
+class ClaudeError(RuntimeError):
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+class TokenBucket:
+    """Client-side rate limiter shared by every thread using the client."""
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+@dataclass
+class CallStats:
+    latency_ms: float
+    status: int
+    attempts: int
+    input_tokens: int = 0
+    output_tokens: int = 0
+
 class ClaudeClient:
-    """Very small wrapper.
-    If ANTHROPIC_API_KEY is absent, returns None so stages use fallback data."""
-    def __init__(self):
-        self.api_key = os.environ.get('ANTHROPIC_API_KEY')
+    """Thin Messages API client meant to be created once per process (see get_client()).
+
+    Keeps HTTP connections alive, retries 429/5xx with jittered exponential backoff,
+    rate-limits through a shared token bucket and records latency/token usage per call.
+    If ANTHROPIC_API_KEY is absent, available() is False and stages use fallback data.
+    Point ANTHROPIC_BASE_URL at src/clients/stub_server.py for offline tests/benchmarks."""
+    def __init__(self, api_key: str | None = None, base_url: str | None = None, model: str | None = None,
+                 max_retries: int = 4, timeout: float = 60.0, limiter: TokenBucket | None = None):
+        self.api_key = api_key or os.environ.get('ANTHROPIC_API_KEY')
+        self.base_url = (base_url or os.environ.get('ANTHROPIC_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.model = model or os.environ.get('ANTHROPIC_MODEL') or DEFAULT_MODEL
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = limiter or TokenBucket(
+            float(os.environ.get('ANTHROPIC_RATE_PER_SEC', '2')),
+            float(os.environ.get('ANTHROPIC_BURST', '5')),
+        )
+        self.calls: deque[CallStats] = deque(maxlen=1000)
+        self._session = None
+        self._session_lock = threading.Lock()
 
     def available(self) -> bool:
         return bool(self.api_key)
 
-    def research(self, topic: str) -> Dict[str, Any]:
-        # NOTE: keep it simple — real call removed to avoid dependency issues.
-        # If API available, you could integrate Anthropic SDK here.
-        # For now we return None to force fallback in research_stage when not configured.
-        return None
+    def _http(self):
+        # requests is imported lazily so offline runs work without it installed
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    s = requests.Session()
+                    s.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=32))
+                    s.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=32))
+                    s.headers.update({
+                        'x-api-key': self.api_key or '',
+                        'anthropic-version': API_VERSION,
+                        'content-type': 'application/json',
+                    })
+                    self._session = s
+        return self._session
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after:
+            try:
+                return min(60.0, float(retry_after))
+            except ValueError:
+                pass
+        return min(30.0, 0.5 * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def messages(self, prompt: str, system: str | None = None, max_tokens: int = 1024) -> Dict[str, Any]:
+        if not self.available():
+            raise ClaudeError('ANTHROPIC_API_KEY is not set')
+        payload: Dict[str, Any] = {
+            'model': self.model,
+            'max_tokens': max_tokens,
+            'messages': [{'role': 'user', 'content': prompt}],
+        }
+        if system:
+            payload['system'] = system
+
+        started = time.perf_counter()
+        status, last_error = 0, ''
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                resp = self._http().post(f'{self.base_url}/v1/messages', json=payload, timeout=self.timeout)
+                status = resp.status_code
+                if status == 200:
+                    data = resp.json()
+                    usage = data.get('usage') or {}
+                    self.calls.append(CallStats(
+                        latency_ms=(time.perf_counter() - started) * 1000, status=status, attempts=attempt + 1,
+                        input_tokens=int(usage.get('input_tokens', 0)), output_tokens=int(usage.get('output_tokens', 0)),
+                    ))
+                    return data
+                last_error = resp.text[:300]
+                if status not in RETRY_STATUSES:
+                    break
+                retry_after = resp.headers.get('retry-after')
+            except (OSError, ValueError) as e:  # requests' ConnectionError/Timeout derive from OSError
+                status, last_error = 0, f'{type(e).__name__}: {e}'
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+
+        self.calls.append(CallStats(latency_ms=(time.perf_counter() - started) * 1000, status=status,
+                                    attempts=attempt + 1))
+        raise ClaudeError(f'Messages API call failed ({status}): {last_error}', status=status)
+
+    def research(self, topic: str, queries: List[str] | None = None) -> Optional[Dict[str, Any]]:
+        """Ask for candidate sources. Returns {'sources': [...]} or None to force fallback."""
+        if not self.available():
+            return None
+        prompt = (
+            f"Find 3-6 authoritative sources for a technical blog post about: {topic}\n"
+            + (f"Search angles: {'; '.join(queries)}\n" if queries else "")
+            + 'Reply with JSON only: {"sources": [{"title": str, "url": str, "published": str, "notes": [str]}]}'
+        )
+        try:
+            data = self.messages(prompt, max_tokens=1500)
+        except ClaudeError:
+            return None
+        text = ''.join(b.get('text', '') for b in data.get('content', []) if b.get('type') == 'text')
+        start, end = text.find('{'), text.rfind('}')
+        if start < 0 or end <= start:
+            return None
+        try:
+            parsed = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        sources = [s for s in parsed.get('sources') or [] if isinstance(s, dict) and s.get('url')]
+        return {'sources': sources} if sources else None
+
+    def usage_summary(self) -> Dict[str, Any]:
+        calls = list(self.calls)
+        lat = sorted(c.latency_ms for c in calls)
+        return {
+            'calls': len(calls),
+            'errors': sum(1 for c in calls if c.status != 200),
+            'input_tokens': sum(c.input_tokens for c in calls),
+            'output_tokens': sum(c.output_tokens for c in calls),
+            'p50_ms': round(lat[len(lat) // 2], 1) if lat else 0.0,
+            'max_ms': round(lat[-1], 1) if lat else 0.0,
+        }
+
+_client: ClaudeClient | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> ClaudeClient:
+    """Process-wide client so connections, the rate limiter and stats are shared."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ClaudeClient()
+    return _client
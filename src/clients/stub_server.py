@@ -0,0 +1,85 @@
+﻿"""Local stand-in for the Messages API, for tests and benchmarks.
+
+    python -m src.clients.stub_server --port 8765 --latency-ms 50 --fail-rate 0.1
+    ANTHROPIC_API_KEY=stub ANTHROPIC_BASE_URL=http://127.0.0.1:8765 python -m src.orchestrator "..."
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _canned_sources(prompt: str) -> dict:
+    topic = prompt.split(":", 1)[-1].split("\n", 1)[0].strip() or "topic"
+    slug = "-".join(topic.lower().split())[:60]
+    return {"sources": [
+        {"title": f"{topic}: an overview", "url": f"https://example.com/{slug}/overview",
+         "published": "2025-01-01", "notes": ["Definitions", "Architecture"]},
+        {"title": f"Benchmarking {topic}", "url": f"https://example.com/{slug}/benchmarks",
+         "published": "2025-03-01", "notes": ["Latency", "Cost"]},
+        {"title": f"{topic} in production", "url": f"https://example.com/{slug}/production",
+         "published": "2025-06-01", "notes": ["Failure modes", "Monitoring"]},
+    ]}
+
+def make_handler(latency_ms: float = 0.0, fail_rate: float = 0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: dict, headers: dict | None = None):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            length = int(self.headers.get("content-length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/v1/messages":
+                return self._reply(404, {"type": "error", "error": {"type": "not_found_error"}})
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            if fail_rate and random.random() < fail_rate:
+                return self._reply(529, {"type": "error", "error": {"type": "overloaded_error"}},
+                                   {"retry-after": "0"})
+            prompt = "".join(m.get("content", "") for m in payload.get("messages", [])
+                             if isinstance(m.get("content"), str))
+            text = json.dumps(_canned_sources(prompt))
+            self._reply(200, {
+                "id": "msg_stub", "type": "message", "role": "assistant", "model": payload.get("model"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": max(1, len(prompt) // 4), "output_tokens": max(1, len(text) // 4)},
+            })
+    return Handler
+
+def serve(port: int = 0, latency_ms: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; port=0 picks a free port (see server.server_port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms, fail_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="claude-stub", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency_ms, args.fail_rate))
+    print(f"Claude stub listening on http://127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
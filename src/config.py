@@ -0,0 +1,236 @@
+﻿"""Shared application config: config/app.yaml merged with environment overrides.
+
+    from src.config import get_config
+    cfg = get_config()
+    cfg.paths.local_output, cfg.similarity.threshold, cfg.publish.medium_tags_default
+
+The YAML is parsed once into frozen dataclasses and cached. get_config() re-checks the
+mtimes of app.yaml and .env (one stat each) and reparses only when either changed, so
+long-lived processes such as the runner pick up edits without paying for a parse on
+every request. Precedence: process environment > .env > app.yaml > defaults. Relative
+paths resolve against the repo root, not the working directory.
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+CONFIG_PATH = REPO_ROOT / "config" / "app.yaml"
+DOTENV_PATH = REPO_ROOT / ".env"
+
+# env var -> (section, key) in app.yaml
+ENV_OVERRIDES = {
+    "LOCAL_OUTPUT_DIR": ("paths", "local_output"),
+    "PUBLISHED_DIR": ("paths", "published_root"),
+    "STATE_DIR": ("paths", "state_root"),
+    "BLOB_DIR": ("paths", "blob_root"),
+    "GOOGLE_DRIVE_ROOT": ("paths", "drive_root"),
+    "AUTO_POST_MEDIUM": ("auto_post", "medium"),
+    "AUTO_POST_LINKEDIN": ("auto_post", "linkedin"),
+    "AUTO_POST_X": ("auto_post", "x"),
+    "MEDIUM_TAGS_DEFAULT": ("publish", "medium_tags_default"),
+    "CANVA_TEMPLATE_NAME": ("publish", "canva_template"),
+    "SIMILARITY_THRESHOLD": ("similarity", "threshold"),
+    "SIMILARITY_ACTION": ("similarity", "action"),
+    "IO_FSYNC": ("io", "fsync"),
+    "IO_BUNDLE_ARCHIVE": ("io", "bundle_archive"),
+    "TRACING": ("tracing", "enabled"),
+    "LINK_CHECK": ("links", "check_in_review"),
+    "DAEMON_HOST": ("daemon", "host"),
+    "DAEMON_PORT": ("daemon", "port"),
+    "DAEMON_SOCKET": ("daemon", "socket"),
+    "DAEMON_WORKERS": ("daemon", "workers"),
+    "DAEMON_MAX_QUEUED": ("daemon", "max_queued"),
+}
+
+@dataclass(frozen=True)
+class PathsConfig:
+    local_output: Path
+    published_root: Path
+    state_root: Path
+    blob_root: Optional[Path] = None
+    drive_root: str = ""  # remote (Drive) path, not resolved locally
+
+@dataclass(frozen=True)
+class AutoPostConfig:
+    medium: bool = True
+    linkedin: bool = False
+    x: bool = False
+
+@dataclass(frozen=True)
+class PublishConfig:
+    medium_tags_default: Tuple[str, ...] = ()
+    canva_template: str = ""
+
+@dataclass(frozen=True)
+class ResearchCacheConfig:
+    ttl_hours: float = 168.0
+    max_entries: int = 2000
+
+@dataclass(frozen=True)
+class SimilarityConfig:
+    threshold: float = 0.8
+    action: str = "warn"  # warn | abort | off
+
+@dataclass(frozen=True)
+class IOConfig:
+    fsync: bool = True
+    bundle_archive: Optional[str] = None  # tar.gz | zip
+
+@dataclass(frozen=True)
+class TracingConfig:
+    enabled: bool = False  # write trace.json spans next to each run's artifacts
+
+@dataclass(frozen=True)
+class LinksConfig:
+    check_in_review: bool = False  # dead citation links fail review (needs network)
+    ttl_hours: float = 72.0        # live/dead results are reused this long; errors are always rechecked
+    concurrency: int = 16
+    per_host: int = 2
+    timeout_s: float = 10.0
+
+@dataclass(frozen=True)
+class DaemonConfig:
+    host: str = "127.0.0.1"
+    port: int = 8766
+    socket: str = ""       # Unix socket path; used instead of host/port when set
+    workers: int = 4
+    max_queued: int = 100  # submits beyond this get 429 until workers catch up
+
+@dataclass(frozen=True)
+class AppConfig:
+    paths: PathsConfig
+    auto_post: AutoPostConfig = field(default_factory=AutoPostConfig)
+    publish: PublishConfig = field(default_factory=PublishConfig)
+    research_cache: ResearchCacheConfig = field(default_factory=ResearchCacheConfig)
+    similarity: SimilarityConfig = field(default_factory=SimilarityConfig)
+    io: IOConfig = field(default_factory=IOConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    links: LinksConfig = field(default_factory=LinksConfig)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
+
+    @property
+    def output_roots(self) -> Tuple[Path, Path]:
+        """Every folder tree that holds run folders (local output, then published)."""
+        return (self.paths.local_output, self.paths.published_root)
+
+def _bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+def _path(value: Any, default: str) -> Path:
+    p = Path(os.path.expanduser(str(value or default)))
+    return (p if p.is_absolute() else REPO_ROOT / p).resolve()
+
+def _tags(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(str(t).strip() for t in value or [] if str(t).strip())
+
+def read_dotenv(path: Path) -> Dict[str, str]:
+    """KEY=VALUE lines. Uses python-dotenv when installed, else a minimal parser
+    (comments, `export`, single/double quotes)."""
+    if not path.exists():
+        return {}
+    try:
+        from dotenv import dotenv_values
+    except ImportError:
+        values = {}
+        for line in path.read_text(encoding="utf-8-sig").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, val = line.removeprefix("export ").partition("=")
+            val = val.strip()
+            if len(val) >= 2 and val[0] == val[-1] and val[0] in "'\"":
+                val = val[1:-1]
+            elif " #" in val:
+                val = val.split(" #", 1)[0].rstrip()
+            values[key.strip()] = val
+        return values
+    return {k: v for k, v in dotenv_values(path).items() if v is not None}
+
+def parse_config(raw: Mapping[str, Any], env: Mapping[str, str]) -> AppConfig:
+    data = {k: dict(v or {}) for k, v in (raw or {}).items() if isinstance(v, dict) or v is None}
+    data.setdefault("cache", {})
+    research = dict(data["cache"].get("research") or {})
+    for var, (section, key) in ENV_OVERRIDES.items():
+        if env.get(var) not in (None, ""):
+            data.setdefault(section, {})[key] = env[var]
+
+    paths = data.get("paths") or {}
+    auto = data.get("auto_post") or {}
+    publish = data.get("publish") or {}
+    sim = data.get("similarity") or {}
+    io_opts = data.get("io") or {}
+    tracing = data.get("tracing") or {}
+    links = data.get("links") or {}
+    daemon = data.get("daemon") or {}
+    return AppConfig(
+        paths=PathsConfig(
+            local_output=_path(paths.get("local_output"), "./run/outputs"),
+            published_root=_path(paths.get("published_root"), "./run/PUBLISHED"),
+            state_root=_path(paths.get("state_root"), "./run/state"),
+            blob_root=_path(paths["blob_root"], "") if paths.get("blob_root") else None,
+            drive_root=str(paths.get("drive_root") or ""),
+        ),
+        auto_post=AutoPostConfig(**{k: _bool(auto[k]) for k in ("medium", "linkedin", "x") if k in auto}),
+        publish=PublishConfig(medium_tags_default=_tags(publish.get("medium_tags_default")),
+                              canva_template=str(publish.get("canva_template") or "")),
+        research_cache=ResearchCacheConfig(ttl_hours=float(research.get("ttl_hours", 168)),
+                                           max_entries=int(research.get("max_entries", 2000))),
+        similarity=SimilarityConfig(threshold=float(sim.get("threshold", 0.8)),
+                                    action=str(sim.get("action") or "warn")),
+        io=IOConfig(fsync=_bool(io_opts.get("fsync", True)),
+                    bundle_archive=str(io_opts["bundle_archive"]) if io_opts.get("bundle_archive") else None),
+        tracing=TracingConfig(enabled=_bool(tracing.get("enabled", False))),
+        links=LinksConfig(check_in_review=_bool(links.get("check_in_review", False)),
+                          ttl_hours=float(links.get("ttl_hours", 72)), concurrency=int(links.get("concurrency", 16)),
+                          per_host=int(links.get("per_host", 2)), timeout_s=float(links.get("timeout_s", 10))),
+        daemon=DaemonConfig(host=str(daemon.get("host") or "127.0.0.1"), port=int(daemon.get("port", 8766)),
+                            socket=str(daemon.get("socket") or ""), workers=int(daemon.get("workers", 4)),
+                            max_queued=int(daemon.get("max_queued", 100))),
+    )
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+_lock = threading.Lock()
+_cached: Optional[AppConfig] = None
+_stamp: Optional[tuple] = None
+_from_dotenv: Dict[str, str] = {}  # os.environ entries that came from .env (updated on reload)
+
+def _apply_dotenv(values: Mapping[str, str]):
+    for k in [k for k in _from_dotenv if k not in values]:  # removed from .env since last load
+        if os.environ.get(k) == _from_dotenv.pop(k):
+            del os.environ[k]
+    for k, v in values.items():
+        if k not in os.environ or _from_dotenv.get(k) == os.environ[k]:
+            os.environ[k] = v
+            _from_dotenv[k] = v
+
+def load_config(path: Path = CONFIG_PATH, dotenv: Path = DOTENV_PATH) -> AppConfig:
+    """Parse without caching. .env values also become process environment defaults
+    (never overriding real environment variables), so ANTHROPIC_* in .env reach the
+    Claude client."""
+    _apply_dotenv(read_dotenv(dotenv))
+    raw = yaml.safe_load(path.read_text(encoding="utf-8")) if path.exists() else {}
+    return parse_config(raw or {}, os.environ)
+
+def get_config() -> AppConfig:
+    """Cached config; reparsed only when app.yaml or .env changed on disk."""
+    global _cached, _stamp
+    stamp = (_mtime(CONFIG_PATH), _mtime(DOTENV_PATH))
+    if _cached is not None and stamp == _stamp:
+        return _cached
+    with _lock:
+        if _cached is None or stamp != _stamp:
+            _cached, _stamp = load_config(), stamp
+        return _cached
@@ -0,0 +1,433 @@
+﻿"""Long-lived generation daemon. Jobs go into a SQLite queue (run/state/jobs.sqlite) and run
+on a fixed pool of worker threads that share one warm setup: modules, config, the Claude
+client and its connections, the research cache, catalog and similarity index are loaded
+once instead of once per `python -m src.orchestrator` process.
+
+    python -m src.daemon serve [--port 8766 | --socket run/daemon.sock] [--workers 4]
+    python -m src.daemon submit "Topic" [--tone ...] [--wait]     (or --topics-file)
+    python -m src.daemon status [JOB_ID]
+
+HTTP API (JSON, localhost or a Unix socket):
+    POST   /jobs              {"topic", "tone", "options"} -> 202 {"id", ...}; 429 when the queue is full
+    GET    /jobs              ?status=queued|running|done|failed|cancelled&limit=100
+    GET    /jobs/<id>         status, queue position while queued
+    GET    /jobs/<id>/result  200 once finished, 202 while queued or running
+    DELETE /jobs/<id>         cancel a job that has not started
+    GET    /health            queue counts, busy workers, research cache and API usage
+"""
+import argparse
+import dataclasses
+import http.client
+import json
+import signal
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+from .config import AppConfig, get_config
+from .orchestrator import CHECKPOINTED_STAGES, RunOptions, PipelineResult, _read_topics_file, _research_cache, \
+    forced_stages, run_pipeline
+from .catalog import open_catalog
+from .dedupe import open_guard
+from .blobs import open_blobs
+from .linkcheck import open_link_checker
+from .clients.claude_client import get_client
+from .utils.io import ARCHIVE_FORMATS
+from .utils.jobs import JOB_STATUSES, FINISHED, JobQueue, QueueFull
+from .utils.similarity import DuplicateGuard
+
+JOB_OPTIONS = {"refresh": bool, "stream": bool, "force": bool, "from_stage": str, "allow_duplicates": bool,
+               "bundle": str, "trace": bool, "check_links": bool}
+MAX_BODY = 64 * 1024
+POLL_SECONDS = 1.0      # idle workers also re-check the queue this often (jobs from another process)
+RETRY_AFTER_SECONDS = 5
+
+def open_jobs(cfg: AppConfig) -> JobQueue:
+    return JobQueue(cfg.paths.state_root / "jobs.sqlite")
+
+def check_options(options: Any) -> Dict[str, Any]:
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object")
+    for key, value in options.items():
+        if key not in JOB_OPTIONS:
+            raise ValueError(f"unknown option {key!r} (one of {', '.join(JOB_OPTIONS)})")
+        if value is not None and not isinstance(value, JOB_OPTIONS[key]):
+            raise ValueError(f"option {key!r} must be {JOB_OPTIONS[key].__name__}")
+    if options.get("from_stage") and options["from_stage"] not in CHECKPOINTED_STAGES:
+        raise ValueError(f"from_stage must be one of {', '.join(CHECKPOINTED_STAGES)}")
+    if options.get("bundle") and options["bundle"] not in ARCHIVE_FORMATS:
+        raise ValueError(f"bundle must be one of {', '.join(ARCHIVE_FORMATS)}")
+    return options
+
+def _result(r: PipelineResult) -> Dict[str, Any]:
+    out = dataclasses.asdict(r)
+    out["folder"] = str(r.folder)
+    return out
+
+class Generator:
+    """Run options shared by every job: cache, catalog, similarity index, blob store and link
+    checker are opened once per config version (app.yaml/.env edits are picked up between jobs)."""
+
+    def __init__(self, use_cache: bool = True):
+        self.use_cache = use_cache
+        self._lock = threading.Lock()
+        self._cfg: Optional[AppConfig] = None
+        self._base = RunOptions()
+        self._links = None
+
+    def _warm(self) -> tuple[AppConfig, RunOptions, Any]:
+        cfg = get_config()
+        with self._lock:
+            if cfg is not self._cfg:
+                dedupe = open_guard(cfg)
+                dedupe.index.sync(cfg.paths.local_output)  # pick up drafts written by other tools
+                self._links = open_link_checker(cfg)
+                self._base = RunOptions(cache=_research_cache(cfg) if self.use_cache else None,
+                                        catalog=open_catalog(cfg), dedupe=dedupe, fsync=cfg.io.fsync,
+                                        bundle_archive=cfg.io.bundle_archive, blobs=open_blobs(cfg),
+                                        trace=cfg.tracing.enabled,
+                                        link_checker=self._links if cfg.links.check_in_review else None)
+                self._cfg = cfg
+            return self._cfg, self._base, self._links
+
+    def run(self, topic: str, tone: Optional[str], options: Dict[str, Any]) -> PipelineResult:
+        cfg, base, links = self._warm()
+        dedupe = base.dedupe
+        if options.get("allow_duplicates"):  # same index, no check
+            dedupe = DuplicateGuard(dedupe.index, dedupe.threshold, action="off")
+        opts = dataclasses.replace(
+            base, refresh=bool(options.get("refresh")), stream=bool(options.get("stream")),
+            force=forced_stages(bool(options.get("force")), options.get("from_stage")), dedupe=dedupe,
+            bundle_archive=options.get("bundle") or base.bundle_archive, trace=bool(options.get("trace")) or base.trace,
+            link_checker=links if options.get("check_links") else base.link_checker)
+        return run_pipeline(topic, tone, cfg.paths.local_output, opts)
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self._base.cache
+        return {"research_cache": cache.stats() if cache else None, "claude_api": get_client().usage_summary()}
+
+class Daemon:
+    """Fixed pool of worker threads draining the job queue. Submits beyond `max_queued`
+    raise QueueFull (HTTP 429); stop() lets running jobs finish and leaves queued ones for
+    the next start."""
+
+    def __init__(self, jobs: JobQueue, generator: Generator, workers: int = 4, max_queued: int = 100):
+        self.jobs = jobs
+        self.generator = generator
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.started = time.time()
+        self.busy = 0
+        self.completed = 0
+        self._cond = threading.Condition()
+        self._signalled = False
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> int:
+        """Start the workers; returns the number of interrupted jobs put back in the queue."""
+        recovered = self.jobs.recover()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return recovered
+
+    def submit(self, topic: str, tone: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = self.jobs.submit(topic, tone, options, max_queued=self.max_queued)
+        with self._cond:
+            self._signalled = True
+            self._cond.notify()
+        return self.jobs.get(job_id)
+
+    def _work(self):
+        while not self._stop.is_set():
+            job = self.jobs.claim()
+            if job is None:
+                with self._cond:
+                    if not self._signalled:
+                        self._cond.wait(POLL_SECONDS)
+                    self._signalled = False
+                continue
+            with self._cond:
+                self.busy += 1
+            try:
+                result = self.generator.run(job["topic"], job["tone"], job["options"])
+            except Exception as e:
+                self.jobs.fail(job["id"], f"{type(e).__name__}: {e}")
+            else:
+                self.jobs.finish(job["id"], _result(result))
+            with self._cond:
+                self.busy -= 1
+                self.completed += 1
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    def health(self) -> Dict[str, Any]:
+        uptime = time.time() - self.started
+        return {"ok": True, "jobs": self.jobs.counts(), "workers": self.workers, "busy": self.busy,
+                "max_queued": self.max_queued, "completed": self.completed, "uptime_s": round(uptime, 1),
+                "jobs_per_min": round(self.completed / uptime * 60, 2) if uptime > 0 else 0.0,
+                **self.generator.stats()}
+
+def make_handler(daemon: Daemon):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: Any, headers: dict | None = None):
+            raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _error(self, status: int, message: str, headers: dict | None = None):
+            self._reply(status, {"ok": False, "error": message}, headers)
+
+        def _job_id(self, part: str) -> Optional[int]:
+            return int(part) if part.isdigit() else None
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if parts == ["health"]:
+                return self._reply(200, daemon.health())
+            if parts == ["jobs"]:
+                q = parse_qs(url.query)
+                status = (q.get("status") or [None])[0]
+                if status and status not in JOB_STATUSES:
+                    return self._error(400, f"status must be one of {', '.join(JOB_STATUSES)}")
+                limit = (q.get("limit") or ["100"])[0]
+                return self._reply(200, {"jobs": daemon.jobs.list(status, int(limit) if limit.isdigit() else 100)})
+            if len(parts) in (2, 3) and parts[0] == "jobs" and parts[2:] in ([], ["result"]):
+                job = daemon.jobs.get(self._job_id(parts[1]) or 0)
+                if job is None:
+                    return self._error(404, f"no job {parts[1]}")
+                if len(parts) == 3 and job["status"] not in FINISHED:
+                    return self._reply(202, job, {"retry-after": "1"})
+                return self._reply(200, job)
+            self._error(404, f"no route for GET {url.path}")
+
+        def do_POST(self):
+            if urlsplit(self.path).path.rstrip("/") != "/jobs":
+                return self._error(404, f"no route for POST {self.path}")
+            length = int(self.headers.get("content-length") or 0)
+            if length > MAX_BODY:
+                self.close_connection = True
+                return self._error(413, f"request body over {MAX_BODY} bytes")
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                topic = str(payload.get("topic") or "").strip()
+                if not topic:
+                    raise ValueError("topic required")
+                options = check_options(payload.get("options") or {})
+            except (ValueError, AttributeError) as e:
+                return self._error(400, str(e))
+            try:
+                job = daemon.submit(topic, payload.get("tone") or None, options)
+            except QueueFull as e:
+                return self._error(429, str(e), {"retry-after": str(RETRY_AFTER_SECONDS)})
+            self._reply(202, job, {"location": f"/jobs/{job['id']}"})
+
+        def do_DELETE(self):
+            parts = [p for p in urlsplit(self.path).path.split("/") if p]
+            if len(parts) != 2 or parts[0] != "jobs":
+                return self._error(404, f"no route for DELETE {self.path}")
+            job_id = self._job_id(parts[1])
+            if job_id is None or daemon.jobs.get(job_id) is None:
+                return self._error(404, f"no job {parts[1]}")
+            if not daemon.jobs.cancel(job_id):
+                return self._error(409, "job already started or finished")
+            self._reply(200, daemon.jobs.get(job_id))
+    return Handler
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    address_family = getattr(socket, "AF_UNIX", socket.AF_INET)  # serve refuses --socket where it is missing
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)  # HTTPServer's version expects (host, port)
+        self.server_name, self.server_port = "localhost", 0
+
+def _serve(args, cfg: AppConfig) -> int:
+    workers = args.workers or cfg.daemon.workers
+    max_queued = args.max_queued if args.max_queued is not None else cfg.daemon.max_queued
+    daemon = Daemon(open_jobs(cfg), Generator(use_cache=not args.no_cache), workers, max_queued)
+    sock_path = args.socket if args.socket is not None else cfg.daemon.socket
+    if sock_path:
+        if not hasattr(socket, "AF_UNIX"):
+            print("Unix sockets are not available on this platform; use --host/--port")
+            return 2
+        Path(sock_path).unlink(missing_ok=True)  # left over from a daemon that did not exit cleanly
+        server = UnixHTTPServer(sock_path, make_handler(daemon))
+        where = f"unix:{sock_path}"
+    else:
+        server = ThreadingHTTPServer((args.host or cfg.daemon.host, args.port or cfg.daemon.port), make_handler(daemon))
+        where = f"http://{server.server_address[0]}:{server.server_port}"
+    server.daemon_threads = True
+    recovered = daemon.start()
+    print(f"Generation daemon on {where}: {workers} worker(s), up to {max_queued} queued job(s)"
+          + (f", {recovered} interrupted job(s) requeued" if recovered else ""), flush=True)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Stopping: waiting for running jobs (queued jobs stay queued)...", flush=True)
+        daemon.stop()
+        if sock_path:
+            Path(sock_path).unlink(missing_ok=True)
+    return 0
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+def request(cfg: AppConfig, method: str, path: str, body: Any = None, socket_path: Optional[str] = None,
+            timeout: float = 30.0) -> tuple[int, Any]:
+    """One call to a running daemon; returns (status, decoded JSON)."""
+    sock_path = socket_path if socket_path is not None else cfg.daemon.socket
+    conn = (_UnixConnection(sock_path, timeout) if sock_path
+            else http.client.HTTPConnection(cfg.daemon.host, cfg.daemon.port, timeout=timeout))
+    try:
+        raw = json.dumps(body).encode("utf-8") if body is not None else None
+        conn.request(method, path, body=raw, headers={"content-type": "application/json"} if raw else {})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read() or b"null")
+    finally:
+        conn.close()
+
+def _print_job(job: Dict[str, Any]):
+    where = f"  (position {job['position']})" if job.get("position") is not None else ""
+    print(f"#{job['id']:<5} {job['status']:9}  {job['topic']}{where}")
+    result = job.get("result") or {}
+    if job.get("error"):
+        print(f"       {job['error']}")
+    elif result:
+        print(f"       {result['folder'] if result.get('ok') else result.get('notes')}")
+        for w in result.get("warnings") or []:
+            print(f"       warning: {w}")
+
+def _submit(args, cfg: AppConfig) -> int:
+    jobs = _read_topics_file(Path(args.topics_file), args.tone) if args.topics_file else [(args.topic, args.tone)]
+    options = {k: v for k, v in {"refresh": args.refresh, "stream": args.stream, "force": args.force,
+                                 "from_stage": args.from_stage, "allow_duplicates": args.allow_duplicates,
+                                 "bundle": args.bundle, "trace": args.trace, "check_links": args.check_links}.items() if v}
+    ids = []
+    for topic, tone in jobs:
+        while True:
+            status, body = request(cfg, "POST", "/jobs", {"topic": topic, "tone": tone, "options": options},
+                                   args.socket)
+            if status != 429:  # queue full: wait for the workers rather than dropping topics
+                break
+            time.sleep(RETRY_AFTER_SECONDS)
+        if status != 202:
+            print(f"FAIL {topic}: {body.get('error') if isinstance(body, dict) else body}")
+            return 1
+        ids.append(body["id"])
+        _print_job(body)
+    if not args.wait:
+        return 0
+    failed = 0
+    for job_id in ids:
+        while True:
+            status, job = request(cfg, "GET", f"/jobs/{job_id}/result", socket_path=args.socket)
+            if status != 202:
+                break
+            time.sleep(1.0)
+        _print_job(job)
+        failed += not (job.get("result") or {}).get("ok")
+    return 1 if failed else 0
+
+def _status(args, cfg: AppConfig) -> int:
+    if args.job_id is not None:
+        status, body = request(cfg, "GET", f"/jobs/{args.job_id}", socket_path=args.socket)
+        rows = [body] if status == 200 else []
+    else:
+        status, body = request(cfg, "GET", f"/jobs?limit={args.limit}" + (f"&status={args.status}" if args.status else ""),
+                               socket_path=args.socket)
+        rows = body.get("jobs", []) if status == 200 else []
+    if status != 200:
+        print(body.get("error") if isinstance(body, dict) else body)
+        return 1
+    if args.json:
+        print(json.dumps(rows if args.job_id is None else rows[0], indent=2, ensure_ascii=False))
+        return 0
+    for job in rows:
+        _print_job(job)
+    if args.job_id is None:
+        print(f"({len(rows)} job(s))")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Generation daemon: queued jobs on warm workers")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="Run the daemon (defaults from the daemon: section of app.yaml)")
+    p.add_argument("--host", default=None)
+    p.add_argument("--port", type=int, default=None)
+    p.add_argument("--socket", default=None, help="Listen on this Unix socket instead of host/port")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--max-queued", type=int, default=None)
+    p.add_argument("--no-cache", action="store_true", help="Bypass the research cache entirely")
+    p = sub.add_parser("submit", help="Queue a topic (or every topic in a file) on a running daemon")
+    p.add_argument("topic", nargs="?")
+    p.add_argument("--tone", default=None)
+    p.add_argument("--topics-file", default=None, help="Plain text (one topic per line) or JSONL with topic/tone")
+    p.add_argument("--refresh", action="store_true")
+    p.add_argument("--stream", action="store_true")
+    p.add_argument("--force", action="store_true")
+    p.add_argument("--from-stage", choices=CHECKPOINTED_STAGES, default=None)
+    p.add_argument("--allow-duplicates", action="store_true")
+    p.add_argument("--bundle", choices=ARCHIVE_FORMATS, default=None)
+    p.add_argument("--trace", action="store_true")
+    p.add_argument("--check-links", action="store_true", help="Fail review on dead citation URLs")
+    p.add_argument("--wait", action="store_true", help="Wait for the jobs and print their results")
+    p = sub.add_parser("status", help="Recent jobs, or one job")
+    p.add_argument("job_id", type=int, nargs="?")
+    p.add_argument("--status", choices=JOB_STATUSES, default=None)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--json", action="store_true")
+    for name in ("submit", "status"):
+        sub.choices[name].add_argument("--socket", default=None, help="Daemon's Unix socket (default: daemon.socket)")
+    args = parser.parse_args()
+
+    cfg = get_config()
+    if args.cmd == "serve":
+        return _serve(args, cfg)
+    try:
+        if args.cmd == "submit":
+            if bool(args.topic) == bool(args.topics_file):
+                parser.error("give either a topic or --topics-file")
+            return _submit(args, cfg)
+        return _status(args, cfg)
+    except OSError as e:
+        print(f"Cannot reach the daemon ({type(e).__name__}: {e}); start it with: python -m src.daemon serve")
+        return 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,43 @@
+﻿import argparse
+import json
+from pathlib import Path
+from .config import AppConfig, get_config
+from .utils.similarity import SimilarityIndex, DuplicateGuard, describe
+
+def open_guard(cfg: AppConfig, action: str | None = None) -> DuplicateGuard:
+    return DuplicateGuard(SimilarityIndex(cfg.paths.state_root / "similarity.sqlite"),
+                          threshold=cfg.similarity.threshold,
+                          action=action or cfg.similarity.action)
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate topic/draft detection")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("sync", help="Index new or changed drafts under local_output and published_root")
+    p = sub.add_parser("check", help="List existing runs similar to a topic (and optionally a draft)")
+    p.add_argument("topic")
+    p.add_argument("--draft", help="Path to a markdown draft to compare as well")
+    p.add_argument("--threshold", type=float, default=None)
+    p.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    cfg = get_config()
+    guard = open_guard(cfg, action="warn")
+    if args.cmd == "sync":
+        n = guard.index.sync(*cfg.output_roots)
+        print(f"Indexed {n} new or changed draft(s) into {guard.index.path}")
+        return 0
+
+    if args.threshold is not None:
+        guard.threshold = args.threshold
+    markdown = Path(args.draft).read_text(encoding="utf-8-sig") if args.draft else None
+    dups = guard.find(args.topic, markdown)
+    if args.json:
+        print(json.dumps(dups, indent=2))
+    else:
+        for d in dups:
+            print(describe(d))
+        print(f"({len(dups)} match(es) at threshold {guard.threshold})")
+    return 1 if dups else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+﻿import argparse
+import json
+from pathlib import Path
+from typing import Dict, List
+from .config import AppConfig, get_config
+from .utils.cache import SqliteCache
+from .utils.links import DEAD, OK, SKIPPED, UNREACHABLE, LinkChecker, urls_in
+
+def open_link_checker(cfg: AppConfig) -> LinkChecker:
+    links = cfg.links
+    cache = SqliteCache(cfg.paths.state_root / "link_cache.sqlite", ttl_seconds=links.ttl_hours * 3600,
+                        max_entries=50000)
+    return LinkChecker(cache, concurrency=links.concurrency, per_host=links.per_host, timeout=links.timeout_s)
+
+def _run_folders(paths: List[Path]) -> List[Path]:
+    """Run folders (those with references.txt) given directly or found under the given roots."""
+    out = []
+    for p in paths:
+        if (p / "references.txt").exists():
+            out.append(p)
+        elif p.is_dir():
+            out += sorted(f.parent for f in p.glob("*/references.txt") if not f.parent.name.startswith("."))
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that citation URLs in references.txt still resolve")
+    parser.add_argument("paths", nargs="*", help="Run folders or roots (default: local_output and published_root)")
+    parser.add_argument("--url", action="append", default=[], help="Check this URL (repeatable) instead of folders")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached results and check everything again")
+    parser.add_argument("--all", action="store_true", help="List every link, not only dead/unreachable ones")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    cfg = get_config()
+    checker = open_link_checker(cfg)
+    if args.url:
+        by_folder: Dict[str, List[str]] = {"(command line)": args.url}
+    else:
+        folders = _run_folders([Path(p) for p in args.paths] or [Path(r) for r in cfg.output_roots])
+        by_folder = {str(f): urls_in((f / "references.txt").read_text(encoding="utf-8-sig", errors="replace"))
+                     for f in folders}
+    # one check over the whole archive: shared URLs are fetched once, per-host limits apply across posts
+    results = checker.check([u for urls in by_folder.values() for u in urls], refresh=args.refresh)
+
+    counts = {OK: 0, DEAD: 0, UNREACHABLE: 0, SKIPPED: 0}
+    for st in results.values():
+        counts[st.state] += 1
+    cached = sum(1 for st in results.values() if st.cached)
+    if args.json:
+        print(json.dumps({folder: [vars(results[u]) for u in urls] for folder, urls in by_folder.items()},
+                         indent=2, ensure_ascii=False))
+    else:
+        for folder, urls in by_folder.items():
+            shown = [results[u] for u in urls if args.all or results[u].state in (DEAD, UNREACHABLE)]
+            if not shown:
+                continue
+            print(folder)
+            for st in shown:
+                detail = f"HTTP {st.status}" if st.status else st.error
+                print(f"  {st.state:11}  {st.url}" + (f"  ({detail})" if detail and st.state != OK else ""))
+        print(f"{len(results)} link(s) in {len(by_folder)} folder(s): {counts[OK]} ok, {counts[DEAD]} dead, "
+              f"{counts[UNREACHABLE]} unreachable, {counts[SKIPPED]} skipped ({cached} from cache)")
+    return 1 if counts[DEAD] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,37 @@
-﻿import yaml
+﻿import os
+import json
+import time
 import argparse
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .stages import research_stage, outline_stage, draft_stage
 from .stages.input_stage import run as input_run
-from .stages.research_stage import run as research_run
-from .stages.outline_stage import run as outline_run
-from .stages.draft_stage import run as draft_run
+from .stages.research_stage import run as research_run, Research
+from .stages.outline_stage import run as outline_run, Outline
+from .stages.draft_stage import run as draft_run, stream as draft_stream, Draft
 from .stages.review_stage import run as review_run
 from .stages.archive_stage import run as archive_run
-from .utils.io import run_folder
+from .utils.io import ARCHIVE_FORMATS, RunBundle, run_folder
+from .utils.blobs import BlobStore
+from .utils.cache import SqliteCache
+from .utils.dag import Task, run_dag, format_plan
+from .utils.checkpoints import Checkpoints, code_version, input_hash
+from .utils.intents import default_classifier
+from .utils.catalog import Catalog, content_hash
+from .utils.similarity import DuplicateGuard, describe
+from .utils.links import LinkChecker
+from .utils.slugify import slugify
+from .utils.timestamps import today_slug
+from .utils.tracing import Tracer, span
+from .catalog import open_catalog
+from .config import AppConfig, get_config
+from .dedupe import open_guard
+from .blobs import open_blobs
+from .linkcheck import open_link_checker
+from .clients.claude_client import get_client
 
-def _save_research_file(out_folder: Path, research):
+def _save_research_file(bundle: RunBundle, research):
     lines = ["# Research Notes", "", "## Queries"]
     lines += [f"- {q}" for q in research.queries]
     lines += ["", "## Candidate Sources"]
@@ -18,66 +40,348 @@ def _save_research_file(out_folder: Path, research):
         if s.get("notes"):
             for n in s["notes"]:
                 lines.append(f"  - {n}")
-    (out_folder / "research.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return bundle.add("research.md", "\n".join(lines) + "\n")
 
-def _save_outline_file(outline_folder: Path, outline):
+def _save_outline_file(bundle: RunBundle, outline):
     lines = [f"# {outline.title}", f"*{outline.standfirst}*", "", outline.hook, ""]
     for sec in outline.sections:
         lines.append(f"## {sec['h2']}")
         for b in sec.get("bullets", []):
             lines.append(f"- {b}")
         lines.append("")
-    (outline_folder / "outline.md").write_text("\n".join(lines), encoding="utf-8")
+    return bundle.add("outline.md", "\n".join(lines))
+
+@dataclass
+class PipelineResult:
+    topic: str
+    ok: bool
+    folder: Path
+    notes: str
+    seconds: float
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    critical_path: list[str] = field(default_factory=list)
+    critical_path_seconds: float = 0.0
+    reused: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    skipped: bool = False
+
+@dataclass
+class RunOptions:
+    """Per-invocation knobs shared by every topic in a run (picklable for process pools)."""
+    cache: SqliteCache | None = None
+    refresh: bool = False
+    stream: bool = False
+    force: frozenset[str] = frozenset()
+    catalog: Catalog | None = None
+    dedupe: DuplicateGuard | None = None
+    fsync: bool = True
+    bundle_archive: str | None = None  # also write bundle.tar.gz / bundle.zip into the run folder
+    blobs: BlobStore | None = None
+    trace: bool = False  # write trace.json (per-stage spans) into the run folder
+    link_checker: LinkChecker | None = None  # set: dead citation URLs fail review
+
+def _research_cache(cfg: AppConfig) -> SqliteCache:
+    return SqliteCache(
+        cfg.paths.state_root / "research_cache.sqlite",
+        ttl_seconds=cfg.research_cache.ttl_hours * 3600,
+        max_entries=cfg.research_cache.max_entries,
+    )
+
+def _research(ctx, cache, refresh, checkpoints: Checkpoints):
+    key = input_hash(ctx.topic, code_version(research_stage), default_classifier().version)
+    return checkpoints.cached("research", key, Research,
+                              lambda: research_run(ctx.topic, cache=cache, refresh=refresh))
+
+def _outline(ctx, checkpoints: Checkpoints):
+    key = input_hash(ctx.topic, code_version(outline_stage), default_classifier().version)
+    return checkpoints.cached("outline", key, Outline, lambda: outline_run(ctx.topic, []))
+
+def _draft(ctx, outline, research, out_folder: Path, stream: bool, checkpoints: Checkpoints):
+    args = (outline.title, outline.standfirst, outline.hook, outline.sections, research.sources)
+    key = input_hash(outline, research.sources, ctx.tone, code_version(draft_stage))
+    def compute():
+        if stream:  # --stream writes draft.md.part section by section
+            return draft_stream(out_folder / "draft.md.part", *args, tone=ctx.tone)
+        return draft_run(*args, tone=ctx.tone)
+    return checkpoints.cached("draft", key, Draft, compute)
+
+def _archive(out_folder: Path, bundle: RunBundle, draft, review, stream: bool, research_file=None, outline_file=None):
+    # research_file/outline_file are only inputs so the commit waits for those staged writes
+    partial = out_folder / "draft.md.part" if stream else None
+    if not review.ok:
+        return archive_run(bundle, draft.markdown, [f"DRAFT FAILED REVIEW: {review.notes}"],
+                           partial=partial, document=draft.document)
+    return archive_run(bundle, draft.markdown, draft.document.reference_lines(),
+                       partial=partial, document=draft.document)
+
+def _check_links(research, link_checker: LinkChecker | None):
+    # citations are the research sources, so this overlaps with outline and draft
+    if link_checker is None:
+        return None
+    return link_checker.check([s["url"] for s in research.sources])
+
+def _record(ctx, archived, draft, review, catalog: Catalog | None):
+    if catalog is None:
+        return
+    catalog.record(archived.folder, topic=ctx.topic, date=ctx.date_slug,
+                   status="drafted" if review.ok else "failed_review",
+                   review_notes=review.notes, content_hash=content_hash(draft.markdown))
+
+def _index(ctx, archived, draft, dedupe: DuplicateGuard | None):
+    if dedupe is not None:
+        dedupe.add(archived.folder, ctx.topic, draft.markdown)
+
+def _file_size(path: Path) -> dict:
+    return {"bytes": path.stat().st_size}
+
+def _archived_size(archived) -> dict:
+    return {"files": len(archived.files), "bytes": sum(f.stat().st_size for f in archived.files)}
+
+def _draft_size(draft) -> dict:
+    return {"bytes": len(draft.markdown.encode("utf-8")), "sections": len(draft.document.sections),
+            "citations": len(draft.citations)}
+
+# initial values every pipeline run is seeded with
+PIPELINE_INPUTS = ("topic", "tone", "outputs_root", "cache", "refresh", "stream", "force", "catalog", "dedupe",
+                   "fsync", "bundle_archive", "blobs", "link_checker")
+
+# stages with checkpoints, in pipeline order (for --from-stage)
+CHECKPOINTED_STAGES = ("research", "outline", "draft")
+
+def build_pipeline() -> list[Task]:
+    """Stages and file writes as a DAG; independent steps run concurrently."""
+    return [
+        # 1) Input + run folder
+        Task("input", lambda topic, tone: input_run(topic, tone), ("topic", "tone"), ("ctx",)),
+        Task("folder", lambda ctx, outputs_root: run_folder(outputs_root, ctx.date_slug, ctx.topic_slug),
+             ("ctx", "outputs_root"), ("out_folder",)),
+        # stage outputs from earlier runs of this folder are reused when their inputs match
+        Task("checkpoints", lambda out_folder, force: Checkpoints(out_folder, force),
+             ("out_folder", "force"), ("checkpoints",)),
+        # research.md, outline.md and the archive files are staged here and published together
+        Task("bundle", lambda out_folder, fsync, bundle_archive, blobs:
+             RunBundle(out_folder, fsync=fsync, archive=bundle_archive, blobs=blobs),
+             ("out_folder", "fsync", "bundle_archive", "blobs"), ("bundle",)),
+        # 2) Research (saved to research.md)
+        Task("research", _research, ("ctx", "cache", "refresh", "checkpoints"), ("research",),
+             describe=lambda r: {"sources": len(r.sources), "queries": len(r.queries)}),
+        Task("save_research", _save_research_file, ("bundle", "research"), ("research_file",), describe=_file_size),
+        # 3) Outline (saved to outline.md). outline_stage does not use research sources
+        #    yet, so it runs alongside research; add "research" to its inputs once it does.
+        Task("outline", _outline, ("ctx", "checkpoints"), ("outline",),
+             describe=lambda o: {"sections": len(o.sections)}),
+        Task("save_outline", _save_outline_file, ("bundle", "outline"), ("outline_file",), describe=_file_size),
+        # 4) Draft (long-form markdown)
+        Task("draft", _draft, ("ctx", "outline", "research", "out_folder", "stream", "checkpoints"), ("draft",),
+             describe=_draft_size),
+        # 5) Review (citation links are checked as soon as research is done, when enabled)
+        Task("link_check", _check_links, ("research", "link_checker"), ("links",),
+             describe=lambda links: {"links": len(links or {})}),
+        Task("review", lambda draft, links: review_run(draft.markdown, links=links), ("draft", "links"), ("review",),
+             describe=lambda r: {"ok": r.ok, "findings": len(r.findings)}),
+        # 6) Archive (stages draft.md, draft.json + references.txt, then commits the bundle)
+        Task("archive", _archive,
+             ("out_folder", "bundle", "draft", "review", "stream", "research_file", "outline_file"), ("archived",),
+             describe=_archived_size),
+        Task("catalog", _record, ("ctx", "archived", "draft", "review", "catalog")),
+        Task("similarity_index", _index, ("ctx", "archived", "draft", "dedupe")),
+    ]
+
+def run_pipeline(topic: str, tone: str | None, outputs_root: Path,
+                 opts: RunOptions | None = None) -> PipelineResult:
+    opts = opts or RunOptions()
+    tracer = Tracer("pipeline", topic=topic) if opts.trace else None
+    warnings = []
+    if opts.dedupe is not None:
+        # checked before any stage runs; the run's own folder (a rerun) never counts
+        ctx = input_run(topic, tone)
+        own = (outputs_root / f"{ctx.date_slug}_{ctx.topic_slug}").resolve()
+        with span(tracer, "duplicate_check") as sp:
+            dups = opts.dedupe.find(topic, exclude=[str(own)])
+            sp.set(matches=len(dups))
+        if dups and opts.dedupe.action == "abort":
+            return PipelineResult(topic, False, own, f"Skipped, {describe(dups[0])}", 0.0, skipped=True)
+        warnings += [describe(d) for d in dups]
+    force = opts.force
+    if opts.refresh:  # --refresh means fresh research, not a checkpointed copy of the cached one
+        force = force | {"research"}
+    initial = dict(topic=topic, tone=tone, outputs_root=outputs_root, cache=opts.cache, refresh=opts.refresh,
+                   stream=opts.stream, force=force, catalog=opts.catalog, dedupe=opts.dedupe,
+                   fsync=opts.fsync, bundle_archive=opts.bundle_archive, blobs=opts.blobs,
+                   link_checker=opts.link_checker)
+    dag = run_dag(build_pipeline(), initial, tracer=tracer)
+    ctx, review = dag.values["ctx"], dag.values["review"]
+    if tracer is not None:
+        tracer.meta.update(reused=list(dag.values["checkpoints"].reused), critical_path=dag.critical_path)
+        tracer.write(dag.values["out_folder"])
+    return PipelineResult(ctx.topic, review.ok, dag.values["out_folder"], review.notes, dag.wall_seconds,
+                          stage_seconds={k: t.seconds for k, t in dag.timings.items()},
+                          critical_path=dag.critical_path, critical_path_seconds=dag.critical_path_seconds,
+                          reused=list(dag.values["checkpoints"].reused), warnings=warnings)
+
+def forced_stages(force: bool, from_stage: str | None) -> frozenset[str]:
+    if force:
+        return frozenset(CHECKPOINTED_STAGES)
+    if from_stage:
+        return frozenset(CHECKPOINTED_STAGES[CHECKPOINTED_STAGES.index(from_stage):])
+    return frozenset()
+
+def _read_topics_file(path: Path, default_tone: str | None) -> list[tuple[str, str | None]]:
+    """Plain text (one topic per line, '#' comments) or JSONL with {"topic", "tone"}."""
+    jobs = []
+    for n, raw in enumerate(path.read_text(encoding="utf-8-sig").splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{n}: invalid JSON line ({e})") from e
+            topic = str(item.get("topic") or "").strip()
+            if not topic:
+                raise ValueError(f"{path}:{n}: missing 'topic'")
+            jobs.append((topic, item.get("tone") or default_tone))
+        else:
+            jobs.append((line, default_tone))
+    return jobs
+
+def _run_pipeline_safe(topic: str, tone: str | None, outputs_root: Path, opts: RunOptions) -> PipelineResult:
+    # Keep one bad topic from taking down the whole batch.
+    started = time.perf_counter()
+    try:
+        return run_pipeline(topic, tone, outputs_root, opts)
+    except Exception as e:
+        return PipelineResult(topic, False, outputs_root, f"{type(e).__name__}: {e}", time.perf_counter() - started)
+
+def run_batch(jobs: list[tuple[str, str | None]], outputs_root: Path,
+              workers: int = 4, executor: str = "thread",
+              opts: RunOptions | None = None) -> list[PipelineResult]:
+    """One result per job, in order. Jobs that land in the same run folder (same topic slug on
+    the same day) would race on its checkpoints and bundle, so only the first of them runs;
+    the others repeat its result, marked skipped."""
+    opts = opts or RunOptions()
+    date = today_slug()
+    folders = [f"{date}_{slugify(topic)}" for topic, _ in jobs]
+    first: dict[str, int] = {}
+    for i, name in enumerate(folders):
+        first.setdefault(name, i)
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_cls(max_workers=max(1, workers)) as pool:
+        futures = {i: pool.submit(_run_pipeline_safe, jobs[i][0], jobs[i][1], outputs_root, opts)
+                   for i in first.values()}
+        done = {i: f.result() for i, f in futures.items()}
+    results = []
+    for i, (topic, _) in enumerate(jobs):
+        j = first[folders[i]]
+        results.append(done[i] if i == j else replace(
+            done[j], topic=topic, seconds=0.0, skipped=True,
+            notes=f"Skipped, same run folder as '{jobs[j][0]}' earlier in this batch"))
+    return results
+
+def _main_batch(args, outputs_root: Path, opts: RunOptions) -> int:
+    jobs = _read_topics_file(Path(args.topics_file), args.tone)
+    if not jobs:
+        print(f"No topics found in {args.topics_file}")
+        return 1
+
+    started = time.perf_counter()
+    results = run_batch(jobs, outputs_root, workers=args.workers, executor=args.executor, opts=opts)
+    elapsed = time.perf_counter() - started
+
+    for r in results:
+        status = "SKIP" if r.skipped else "OK  " if r.ok else "FAIL"
+        reused = f"  (reused: {', '.join(r.reused)})" if r.reused else ""
+        print(f"{status} {r.seconds:6.2f}s  {r.topic}{reused}")
+        print(f"     {r.folder}" if r.ok and not r.skipped else f"     {r.notes}")
+        for w in r.warnings:
+            print(f"     warning: {w}")
+    ok = sum(r.ok for r in results)
+    generated = sum(r.ok and not r.skipped for r in results)
+    skipped = sum(r.skipped for r in results)
+    print(f"\n{generated}/{len(results)} posts generated" + (f" ({skipped} skipped)" if skipped else "")
+          + f" in {elapsed:.2f}s ({len(results) / elapsed if elapsed > 0 else 0.0:.2f} posts/s, "
+          f"{args.workers} {args.executor} workers)")
+    return 0 if ok == len(results) else 1
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("topic", type=str)
+    parser.add_argument("topic", type=str, nargs="?")
     parser.add_argument("--tone", type=str, default=None)
+    parser.add_argument("--topics-file", type=str, default=None,
+                        help="Batch mode: plain text (one topic per line) or JSONL with topic/tone")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the research cache entirely")
+    parser.add_argument("--refresh", action="store_true", help="Redo research and overwrite cached entries")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write the draft to draft.md.part section by section, renamed to draft.md at the end")
+    parser.add_argument("--force", action="store_true", help="Ignore stage checkpoints and rerun everything")
+    parser.add_argument("--from-stage", choices=CHECKPOINTED_STAGES, default=None,
+                        help="Rerun this stage and every checkpointed stage after it")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="Skip the near-duplicate topic check (new drafts are still indexed)")
+    parser.add_argument("--bundle", choices=ARCHIVE_FORMATS, default=None,
+                        help="Also write the run's files as one compressed bundle in the run folder")
+    parser.add_argument("--trace", action="store_true",
+                        help="Write per-stage spans to trace.json in each run folder (also tracing.enabled)")
+    parser.add_argument("--check-links", action="store_true",
+                        help="Fail review on dead citation URLs (also links.check_in_review; needs network)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the stage execution plan and exit")
     args = parser.parse_args()
+    if args.dry_run:
+        print(format_plan(build_pipeline(), set(PIPELINE_INPUTS)))
+        return 0
+    if bool(args.topic) == bool(args.topics_file):
+        parser.error("give either a topic or --topics-file")
 
-    cfg_path = Path(__file__).resolve().parents[1] / "config" / "app.yaml"
-    cfg = yaml.safe_load(cfg_path.read_text(encoding="utf-8"))
-    outputs_root = Path(cfg["paths"]["local_output"]).resolve()
-
-    # 1) Input
-    ctx = input_run(args.topic, args.tone)
-    out_folder = run_folder(outputs_root, ctx.date_slug, ctx.topic_slug)
-
-    # 2) Research (saved to research.md)
-    research = research_run(ctx.topic)
-    _save_research_file(out_folder, research)
-
-    # 3) Outline (saved to outline.md)
-    outline = outline_run(ctx.topic, research.sources)
-    _save_outline_file(out_folder, outline)
-
-    # 4) Draft (long-form markdown)
-    draft = draft_run(
-        outline.title,
-        outline.standfirst,
-        outline.hook,
-        outline.sections,
-        research.sources,
-        tone=ctx.tone
-    )
+    cfg = get_config()
+    outputs_root = cfg.paths.local_output
+    cache = None if args.no_cache else _research_cache(cfg)
+    before = cache.stats() if cache else None
+    dedupe = open_guard(cfg, action="off" if args.allow_duplicates else None)
+    dedupe.index.sync(outputs_root)  # pick up drafts written by other tools since last time
+    opts = RunOptions(cache=cache, refresh=args.refresh, stream=args.stream,
+                      force=forced_stages(args.force, args.from_stage), catalog=open_catalog(cfg),
+                      dedupe=dedupe, fsync=cfg.io.fsync,
+                      bundle_archive=args.bundle or cfg.io.bundle_archive,
+                      blobs=open_blobs(cfg), trace=args.trace or cfg.tracing.enabled,
+                      link_checker=open_link_checker(cfg) if args.check_links or cfg.links.check_in_review else None)
 
-    # 5) Review
-    review = review_run(draft.markdown)
-    if not review.ok:
-        archive_run(out_folder, draft.markdown, [f"DRAFT FAILED REVIEW: {review.notes}"])
-        print(f"Review failed: {review.notes}")
-        return 1
+    try:
+        if args.topics_file:
+            return _main_batch(args, outputs_root, opts)
+        return _main_single(args, outputs_root, opts)
+    finally:
+        if cache:
+            after = cache.stats()
+            print(f"Research cache: {after['hits'] - before['hits']} hit(s), "
+                  f"{after['misses'] - before['misses']} miss(es), {after['entries']} entries")
+        usage = get_client().usage_summary()
+        if usage["calls"]:
+            print(f"Claude API: {usage['calls']} call(s), {usage['errors']} error(s), "
+                  f"{usage['input_tokens']}+{usage['output_tokens']} tokens, p50 {usage['p50_ms']} ms")
 
-    # 6) Archive (writes draft.md + references.txt)
-    refs_list = [
-        f"[{c['n']}] {c['title']} — {c['url']} (accessed: {c['accessed_at']})"
-        for c in draft.citations
-    ]
-    archive_run(out_folder, draft.markdown, refs_list)
+def _main_single(args, outputs_root: Path, opts: RunOptions) -> int:
+    result = run_pipeline(args.topic, args.tone, outputs_root, opts)
+    for w in result.warnings:
+        print(f"Warning: {w}")
+    if result.skipped:
+        print(result.notes)
+        return 1
+    if not result.ok:
+        print(f"Review failed: {result.notes}")
+        return 1
 
     print("The research, outline, and draft have been created and saved to:")
-    print(str(out_folder))
-    print("The folder contains:\n- research.md\n- outline.md\n- draft.md\n- references.txt")
+    print(str(result.folder))
+    print("The folder contains:\n- research.md\n- outline.md\n- draft.md\n- draft.json\n- references.txt"
+          + ("\n- trace.json" if opts.trace else ""))
+    if result.reused:
+        print(f"Reused checkpoints: {', '.join(result.reused)}")
+    print("Stage timings: " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in result.stage_seconds.items()))
+    print(f"Critical path: {' -> '.join(result.critical_path)} ({result.critical_path_seconds * 1000:.1f}ms, "
+          f"wall {result.seconds * 1000:.1f}ms)")
     return 0
 
 if __name__ == "__main__":
@@ -1,12 +1,25 @@
 ﻿from pathlib import Path
-from dataclasses import dataclass
-from ..utils.io import write_text, write_lines
+from dataclasses import dataclass, replace
+from ..utils.catalog import content_hash
+from ..utils.document import Document
+from ..utils.io import RunBundle
 
 @dataclass
 class ArchiveResult:
     folder: Path
+    files: list[Path]
 
-def run(output_folder: Path, markdown: str, references_lines: list[str]) -> ArchiveResult:
-    write_text(output_folder / 'draft.md', markdown)
-    write_lines(output_folder / 'references.txt', references_lines)
-    return ArchiveResult(folder=output_folder)
+def run(bundle: RunBundle, markdown: str, references_lines: list[str], partial: Path | None = None,
+        document: Document | None = None) -> ArchiveResult:
+    """Stage draft.md, references.txt and draft.json next to whatever the run already staged
+    (research.md, outline.md) and publish the whole bundle at once."""
+    if partial is not None and partial.exists():
+        # streamed draft already on disk: move it into the bundle instead of rewriting it
+        bundle.adopt(partial, 'draft.md')
+    else:
+        bundle.add('draft.md', markdown)
+    bundle.add('references.txt', '\n'.join(references_lines))
+    if document is not None:
+        # the streamed part file holds exactly `markdown`, so the hash matches draft.md either way
+        bundle.add('draft.json', replace(document, source_hash=content_hash(markdown)).to_json())
+    return ArchiveResult(folder=bundle.folder, files=bundle.commit())
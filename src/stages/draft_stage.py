@@ -1,28 +1,19 @@
-﻿from dataclasses import dataclass
+﻿import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import List, Dict
+from ..utils.document import Block, Citation, Document, Section
 from ..utils.timestamps import today_slug
 
-TEMPLATE = """# {title}
-*{standfirst}*
-
-{hook}
-
-{body}
-
-## Key Takeaways
-{takeaways}
-
-## What’s Next
-{whats_next}
-
-## References
-{references}
-"""
-
 @dataclass
 class Draft:
     markdown: str
     citations: List[Dict]
+    document: Document | None = None  # saved as draft.json; publisher/runner read this, not the markdown
+
+    def __post_init__(self):
+        if isinstance(self.document, dict):  # loaded from a checkpoint
+            self.document = Document.from_dict(self.document)
 
 def _bullets_to_paragraph(bullets: List[str]) -> str:
     # Convert list of notes into 2–4 natural sentences
@@ -40,46 +31,55 @@ def _bullets_to_paragraph(bullets: List[str]) -> str:
     # Ensure reasonable line breaks for Medium readability
     return para
 
-def _sections_to_body(sections: List[Dict]) -> str:
-    blocks = []
-    for sec in sections:
-        h2 = sec.get("h2", "Section")
-        bullets = sec.get("bullets", [])
-        para = _bullets_to_paragraph(bullets)
-        blocks.append(f"## {h2}\n{para}\n")
-    return "\n".join(blocks).strip()
+def _generic_takeaways(topic: str) -> List[str]:
+    return [
+        f"Start simple for {topic.lower()}; add complexity only when metrics demand it.",
+        "Measure quality and latency with small, representative tests.",
+        "Prefer changes that reduce operational risk and cognitive load.",
+    ]
 
-def _generic_takeaways(topic: str) -> str:
-    lines = [
-        f"- Start simple for {topic.lower()}; add complexity only when metrics demand it.",
-        "- Measure quality and latency with small, representative tests.",
-        "- Prefer changes that reduce operational risk and cognitive load.",
+def _generic_next(topic: str) -> List[str]:
+    return [
+        "Instrument your baseline (quality, latency, cost).",
+        f"Identify one upgrade for {topic.lower()} that could yield a clear lift; test it behind a flag.",
+        "Keep a rollback path and write down what you learned.",
     ]
-    return "\n".join(lines)
 
-def _generic_next(topic: str) -> str:
-    lines = [
-        "- Instrument your baseline (quality, latency, cost).",
-        f"- Identify one upgrade for {topic.lower()} that could yield a clear lift; test it behind a flag.",
-        "- Keep a rollback path and write down what you learned.",
+def _citations(sources: List[Dict]) -> List[Citation]:
+    today = today_slug()
+    return [Citation(i, s["title"], s["url"], today) for i, s in enumerate(sources, start=1)]
+
+def build_document(title: str, standfirst: str, hook: str, sections: List[Dict], sources: List[Dict]) -> Document:
+    """The article as a tree: intro, one section per outline H2, then the closing blocks."""
+    body = [Section("", [Block("p", hook)])]
+    body += [Section(sec.get("h2", "Section"), [Block("p", _bullets_to_paragraph(sec.get("bullets", [])))])
+             for sec in sections]
+    body += [
+        Section("Key Takeaways", [Block("ul", items=_generic_takeaways(title))]),
+        Section("What’s Next", [Block("ul", items=_generic_next(title))]),
+        Section("References", [Block("refs")]),
     ]
-    return "\n".join(lines)
+    return Document(title=title, standfirst=standfirst, sections=body, citations=_citations(sources))
+
+def _draft(doc: Document, markdown: str) -> Draft:
+    return Draft(markdown=markdown, citations=[asdict(c) for c in doc.citations], document=doc)
 
 def run(title: str, standfirst: str, hook: str, sections: List[Dict], sources: List[Dict], tone: str | None = None) -> Draft:
-    body = _sections_to_body(sections)
+    doc = build_document(title, standfirst, hook, sections, sources)
+    return _draft(doc, doc.to_markdown())
 
-    refs_lines, citations = [], []
-    for i, s in enumerate(sources, start=1):
-        refs_lines.append(f"[{i}] {s['title']} — {s['url']} (accessed: {today_slug()})")
-        citations.append({"n": i, "title": s["title"], "url": s["url"], "accessed_at": today_slug()})
+def stream(part_path: Path, title: str, standfirst: str, hook: str, sections: List[Dict], sources: List[Dict],
+           tone: str | None = None) -> Draft:
+    """Like run(), but appends each chunk to part_path (e.g. draft.md.part) as it is produced.
 
-    md = TEMPLATE.format(
-        title=title,
-        standfirst=standfirst,
-        hook=hook,
-        body=body,
-        takeaways=_generic_takeaways(title),
-        whats_next=_generic_next(title),
-        references="\n".join(refs_lines) if refs_lines else "—",
-    )
-    return Draft(markdown=md, citations=citations)
+    archive_stage.run moves the part file into the run bundle, which publishes it as draft.md."""
+    doc = build_document(title, standfirst, hook, sections, sources)
+    chunks = []
+    part_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(part_path, "w", encoding="utf-8", newline="") as f:
+        for chunk in doc.iter_markdown():
+            f.write(chunk)
+            f.flush()  # make progress visible to anyone tailing the file
+            chunks.append(chunk)
+        os.fsync(f.fileno())
+    return _draft(doc, "".join(chunks))
@@ -1,18 +1,29 @@
 ﻿from pathlib import Path
 from dataclasses import dataclass
 from shutil import copy2
+from ..utils.blobs import BlobStore
+from ..utils.catalog import Catalog
+
+FILES = ('draft.md', 'draft.json', 'references.txt')
 
 @dataclass
 class FinalizeResult:
     published_folder: Path
 
-def run(src_folder: Path, dst_folder: Path, medium_url: str | None = None) -> FinalizeResult:
+def run(src_folder: Path, dst_folder: Path, medium_url: str | None = None,
+        catalog: Catalog | None = None, blobs: BlobStore | None = None) -> FinalizeResult:
     dst_folder.mkdir(parents=True, exist_ok=True)
-    # copy the two main files if present
-    for name in ('draft.md','references.txt'):
-        p = src_folder / name
-        if p.exists():
-            copy2(p, dst_folder / name)
+    if blobs is not None:
+        # hardlinks to the blobs the run folder already points at: no bytes are copied
+        blobs.link_folder(src_folder, dst_folder, FILES)
+    else:
+        # copy the main files if present
+        for name in FILES:
+            p = src_folder / name
+            if p.exists():
+                copy2(p, dst_folder / name)
     if medium_url:
         (dst_folder / 'published_url.txt').write_text(medium_url, encoding='utf-8')
+    if catalog is not None:
+        catalog.record(src_folder, status='published' if medium_url else None, published_url=medium_url)
     return FinalizeResult(published_folder=dst_folder)
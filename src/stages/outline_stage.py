@@ -1,5 +1,6 @@
 ﻿from dataclasses import dataclass
 from typing import List, Dict, Any
+from ..utils.intents import apply_outline, classify
 
 @dataclass
 class Outline:
@@ -24,8 +25,6 @@ def _hook(topic: str) -> str:
     )
 
 def _intent_sections(topic: str) -> List[Dict[str, Any]]:
-    low = topic.lower()
-
     # Baseline sections that work for most technical topics
     sections: List[Dict[str, Any]] = [
         {
@@ -62,29 +61,9 @@ def _intent_sections(topic: str) -> List[Dict[str, Any]]:
         },
     ]
 
-    # Intent-specific tweaks
-    if " vs " in low or " versus " in low:
-        sections[0]["h2"] = "What Are We Comparing?"
-        sections.insert(1, {
-            "h2": "Dimensions to Compare",
-            "bullets": ["Accuracy/quality", "Latency/throughput", "Cost/ops", "Complexity/risk"],
-        })
-
-    if any(k in low for k in ["how to", "guide", "quickstart", "setup", "install"]):
-        sections[0]["h2"] = "What You’ll Build"
-        sections[1]["h2"] = "Step-by-Step Quickstart"
-
-    if any(k in low for k in ["interview", "questions", "prep"]):
-        sections[0]["h2"] = "Role Expectations & Scope"
-        sections[1]["h2"] = "Core Topics to Master"
-        sections[2]["h2"] = "Common Pitfalls in Interviews"
-        sections[3]["h2"] = "Practice Plan & Resources"
-
-    if any(k in low for k in ["rag", "retrieval"]):
-        sections[1]["bullets"] += [
-            "Explain lexical vs. dense retrieval in plain terms.",
-            "Discuss hybrid strategies and when they help."
-        ]
+    # Intent-specific tweaks (config/intents.yaml)
+    for intent in classify(topic):
+        apply_outline(intent, sections)
 
     return sections
 
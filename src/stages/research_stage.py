@@ -1,6 +1,9 @@
-﻿from dataclasses import dataclass
-from typing import List, Dict, Any
-from ..clients.claude_client import ClaudeClient
+﻿import hashlib
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Optional
+from ..clients.claude_client import get_client
+from ..utils.cache import SqliteCache, normalize_text
+from ..utils.intents import classify
 from ..utils.timestamps import today_slug
 
 @dataclass
@@ -19,16 +22,9 @@ def _expand_queries(topic: str) -> List[str]:
         f"{t} benchmarks",
         f"{t} examples",
     ]
-    # Heuristics based on topic pattern
-    low = t.lower()
-    if " vs " in low or " versus " in low:
-        base += [f"{t} comparison", f"{t} trade-offs", f"{t} decision guide"]
-    if any(k in low for k in ["how to", "guide", "quickstart", "setup", "install"]):
-        base += [f"{t} step by step", f"{t} quickstart 2025"]
-    if any(k in low for k in ["interview", "questions", "prep"]):
-        base += [f"{t} common questions", f"{t} interview checklist"]
-    if any(k in low for k in ["rag", "retrieval"]):
-        base += [f"{t} bm25", f"{t} hybrid retrieval", f"{t} vector db alternatives"]
+    # Intent-specific angles (config/intents.yaml)
+    for intent in classify(t):
+        base += [q.format(t=t) for q in intent.queries]
     return sorted(set(base), key=str.lower)
 
 def _seed_sources(topic: str) -> List[Dict[str, Any]]:
@@ -54,9 +50,37 @@ def _seed_sources(topic: str) -> List[Dict[str, Any]]:
         },
     ]
 
-def run(topic: str) -> Research:
-    client = ClaudeClient()
-    # If you later implement client.research(topic) it can return real sources.
+def _normalize_sources(raw: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    today = today_slug()
+    return [
+        {
+            "n": i,
+            "title": str(s.get("title") or s["url"]),
+            "url": str(s["url"]),
+            "published": str(s.get("published") or "n/a"),
+            "notes": [str(n) for n in s.get("notes") or []],
+            "accessed": today,
+        }
+        for i, s in enumerate(raw, start=1)
+    ]
+
+def cache_key(topic: str, queries: List[str]) -> str:
+    # Normalized topic + normalized query set, so case/punctuation variants share an entry.
+    parts = [normalize_text(topic)] + sorted({normalize_text(q) for q in queries})
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def run(topic: str, cache: Optional[SqliteCache] = None, refresh: bool = False) -> Research:
     queries = _expand_queries(topic)
-    sources = _seed_sources(topic)
-    return Research(queries=queries, sources=sources)
+    key = cache_key(topic, queries) if cache is not None else None
+    if cache is not None and not refresh:
+        hit = cache.get(key)
+        if hit is not None:
+            return Research(**hit)
+
+    client = get_client()
+    found = client.research(topic, queries) if client.available() else None
+    sources = _normalize_sources(found["sources"]) if found else _seed_sources(topic)
+    research = Research(queries=queries, sources=sources)
+    if cache is not None:
+        cache.put(key, asdict(research))
+    return research
@@ -1,14 +1,197 @@
-﻿from dataclasses import dataclass
+﻿import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from ..utils.links import DEAD, SKIPPED, UNREACHABLE
+
+SEVERITIES = ("info", "warning", "error")
+
+@dataclass
+class Finding:
+    rule: str
+    severity: str  # 'info' | 'warning' | 'error'
+    message: str
+    line: Optional[int] = None
 
 @dataclass
 class ReviewResult:
     ok: bool
     notes: str
+    findings: List[Finding] = field(default_factory=list)
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class ReviewRules:
+    min_chars: int = 400
+    max_section_words: int = 700
+    min_duplicate_words: int = 8      # shorter paragraphs may legitimately repeat
+    min_reading_ease: float = 30.0    # Flesch reading ease; lower is harder
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_REF_ENTRY_RE = re.compile(r"^\s*(?:[-*]\s*)?\[(\d+)\]")
+_MARKER_RE = re.compile(r"\[(\d+)\](?!\()")
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'’-]*")
+_SENTENCE_END_RE = re.compile(r"[.!?]+(?:\s|$)")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+
+def _syllables(word: str) -> int:
+    w = word.lower()
+    n = len(_VOWEL_GROUP_RE.findall(w))
+    if w.endswith("e") and n > 1 and not w.endswith("le"):
+        n -= 1
+    return max(1, n)
+
+class _Section:
+    __slots__ = ("title", "line", "words")
+    def __init__(self, title: str, line: int):
+        self.title, self.line, self.words = title, line, 0
+
+def run(markdown: str, rules: ReviewRules | None = None, links: Dict[str, Any] | None = None) -> ReviewResult:
+    """Review a markdown draft in a single pass over its lines. `links` (URL -> LinkStatus
+    from utils.links, optional) turns dead citation URLs into errors."""
+    rules = rules or ReviewRules()
+    findings: List[Finding] = []
+    headings: List[tuple] = []          # (level, text, line)
+    sections: List[_Section] = []
+    markers: Dict[int, int] = {}        # citation number -> first line used
+    ref_entries: Dict[int, int] = {}    # reference number -> line
+    paragraphs: Dict[str, int] = {}     # paragraph hash -> first line
+    has_links = False
+    in_code = in_refs = False
+    words = sentences = syllables = 0
+    para: List[str] = []
+    para_line = 0
+
+    def end_paragraph():
+        nonlocal words, sentences, syllables
+        if not para:
+            return
+        text = " ".join(para)
+        para.clear()
+        tokens = _WORD_RE.findall(text)
+        if not tokens:
+            return
+        words += len(tokens)
+        sentences += max(1, len(_SENTENCE_END_RE.findall(text)))
+        syllables += sum(_syllables(t) for t in tokens)
+        if sections:
+            sections[-1].words += len(tokens)
+        if len(tokens) >= rules.min_duplicate_words:
+            key = hashlib.blake2b(" ".join(tokens).lower().encode("utf-8"), digest_size=12).digest()
+            first = paragraphs.setdefault(key, para_line)
+            if first != para_line:
+                findings.append(Finding("duplicate-paragraph", "warning",
+                                        f"Paragraph repeats the one at line {first}.", para_line))
+
+    for n, raw in enumerate(markdown.splitlines(), start=1):
+        line = raw.strip()
+        if line.startswith("```"):
+            end_paragraph()
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        if not has_links and "http" in line:
+            has_links = True
+        m = _HEADING_RE.match(line)
+        if m:
+            end_paragraph()
+            level, text = len(m.group(1)), m.group(2)
+            if headings and level > headings[-1][0] + 1:
+                findings.append(Finding("heading-skip", "warning",
+                                        f"Heading jumps from H{headings[-1][0]} to H{level}: '{text}'.", n))
+            headings.append((level, text, n))
+            in_refs = level <= 2 and text.lower().startswith("references")
+            if level == 2 and not in_refs:
+                sections.append(_Section(text, n))
+            continue
+        if not line:
+            end_paragraph()
+            continue
+        if in_refs:
+            r = _REF_ENTRY_RE.match(line)
+            if r:
+                ref_entries.setdefault(int(r.group(1)), n)
+            continue
+        for c in _MARKER_RE.finditer(line):
+            markers.setdefault(int(c.group(1)), n)
+        if not para:
+            para_line = n
+        para.append(line)
+    end_paragraph()
+
+    # --- structure
+    h1 = [h for h in headings if h[0] == 1]
+    if not h1:
+        findings.append(Finding("missing-title", "warning", "No H1 title.", None))
+    elif len(h1) > 1:
+        findings.append(Finding("multiple-titles", "warning", f"{len(h1)} H1 headings; Medium uses only the first.", h1[1][2]))
+    seen_titles: Dict[str, int] = {}
+    for level, text, n in headings:
+        first = seen_titles.setdefault(text.lower(), n)
+        if first != n:
+            findings.append(Finding("duplicate-heading", "warning", f"Heading '{text}' repeats line {first}.", n))
+    for sec in sections:
+        if sec.words > rules.max_section_words:
+            findings.append(Finding("long-section", "warning",
+                                    f"Section '{sec.title}' has {sec.words} words (max {rules.max_section_words}).", sec.line))
+
+    # --- citations
+    has_refs_section = any(h[1].lower().startswith("references") for h in headings)
+    if has_links and not has_refs_section:
+        findings.append(Finding("links-without-references", "error", "Contains links but no References section.", None))
+    for num, n in sorted(markers.items()):
+        if ref_entries and num not in ref_entries:
+            findings.append(Finding("unknown-citation", "error", f"Citation [{num}] has no References entry.", n))
+    unused = sorted(set(ref_entries) - set(markers))
+    if ref_entries and not markers:
+        findings.append(Finding("no-inline-citations", "warning",
+                                f"{len(ref_entries)} references but no inline [n] markers in the text.", None))
+    elif unused:
+        findings.append(Finding("unused-reference", "info",
+                                f"References never cited: {', '.join(f'[{u}]' for u in unused)}.", ref_entries[unused[0]]))
+
+    # --- citation links (only when checked)
+    if links is not None:
+        first_line: Dict[str, int] = {}
+        for n, raw in enumerate(markdown.splitlines(), start=1):
+            if "http" in raw:
+                for url in links:
+                    if url in raw:
+                        first_line.setdefault(url, n)
+        for url, st in links.items():
+            if st.state == DEAD:
+                why = f"HTTP {st.status}" if st.status else st.error
+                findings.append(Finding("dead-link", "error", f"Dead link ({why}): {url}", first_line.get(url)))
+            elif st.state == UNREACHABLE:
+                findings.append(Finding("unreachable-link", "warning", f"Could not verify {url}: "
+                                        + (f"HTTP {st.status}" if st.status else st.error), first_line.get(url)))
+
+    # --- length & readability
+    if len(markdown) < rules.min_chars:
+        findings.append(Finding("too-short", "error", "Draft is too short to be useful.", None))
+    reading_ease = None
+    if words and sentences:
+        reading_ease = round(206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / words), 1)
+        if words >= 100 and reading_ease < rules.min_reading_ease:  # too noisy on tiny drafts
+            findings.append(Finding("hard-to-read", "warning",
+                                    f"Flesch reading ease {reading_ease} is below {rules.min_reading_ease}.", None))
 
-def run(markdown: str) -> ReviewResult:
-    # Minimal checks; expand as needed.
-    if 'http' in markdown and 'References' not in markdown:
-        return ReviewResult(ok=False, notes='Contains links but no References section.')
-    if len(markdown) < 400:
-        return ReviewResult(ok=False, notes='Draft is too short to be useful.')
-    return ReviewResult(ok=True, notes='Ready to publish.')
+    metrics = {
+        "chars": len(markdown),
+        "words": words,
+        "sentences": sentences,
+        "avg_sentence_words": round(words / sentences, 1) if sentences else 0.0,
+        "reading_ease": reading_ease,
+        "headings": len(headings),
+        "sections": len(sections),
+        "citations_used": len(markers),
+        "references": len(ref_entries),
+        "citation_coverage": round(len(set(markers) & set(ref_entries)) / len(ref_entries), 2) if ref_entries else None,
+    }
+    if links is not None:
+        metrics["links_checked"] = sum(1 for st in links.values() if st.state != SKIPPED)
+        metrics["dead_links"] = sum(1 for st in links.values() if st.state == DEAD)
+    errors = [f for f in findings if f.severity == "error"]
+    notes = " ".join(f.message for f in errors) if errors else "Ready to publish."
+    return ReviewResult(ok=not errors, notes=notes, findings=findings, metrics=metrics)
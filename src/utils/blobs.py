@@ -0,0 +1,142 @@
+﻿import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from .io import ensure_dir, write_text
+
+MANIFEST = ".blobs.json"  # {file name: sha256} for the files of one run/published folder
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+def read_manifest(folder: Path) -> Dict[str, str]:
+    try:
+        return json.loads((Path(folder) / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+class BlobStore:
+    """sha256-keyed object store (<root>/<ab>/<digest>) whose objects are hardlinked into
+    run and published folders, so identical bytes exist once on disk.
+
+    Linking falls back to a copy when the folder is on another filesystem (or the
+    filesystem has no hardlinks). Every writer in this repo replaces files with
+    os.replace instead of editing them in place, which is what keeps shared inodes
+    safe: an edited draft gets a new inode and the blob keeps its original bytes.
+    A blob whose link count has dropped to 1 is referenced by nothing and gc() removes it."""
+
+    def __init__(self, root: Path):
+        self.root = ensure_dir(Path(root))
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, src: Path, digest: Optional[str] = None) -> str:
+        """Store src's bytes (hardlinking src itself when possible) and return the digest."""
+        digest = digest or file_digest(src)
+        blob = self.path(digest)
+        if not blob.exists():
+            ensure_dir(blob.parent)
+            tmp = blob.with_name(f".{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+            os.replace(tmp, blob)  # concurrent puts of the same bytes are harmless
+        return digest
+
+    def link(self, digest: str, dst: Path) -> bool:
+        """Atomically place blob `digest` at dst. True if hardlinked, False if copied."""
+        blob = self.path(digest)
+        ensure_dir(dst.parent)
+        tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(blob, tmp)
+            linked = True
+        except OSError:
+            shutil.copy2(blob, tmp)
+            linked = False
+        os.replace(tmp, dst)
+        return linked
+
+    def ingest(self, path: Path, digest: Optional[str] = None) -> str:
+        """Move path's bytes into the store and turn path into a link to the blob
+        (deduplicating it against identical content already stored)."""
+        digest = self.put(path, digest)
+        blob = self.path(digest)
+        if not _same_file(path, blob) and path.stat().st_dev == blob.stat().st_dev:
+            self.link(digest, path)
+        return digest
+
+    def ingest_folder(self, folder: Path, names: Iterable[str]) -> Dict[str, str]:
+        folder = Path(folder)
+        manifest = read_manifest(folder)
+        for name in names:
+            if (folder / name).is_file():
+                manifest[name] = self.ingest(folder / name)
+        write_text(folder / MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+        return manifest
+
+    def link_folder(self, src: Path, dst: Path, names: Iterable[str]) -> Dict[str, int]:
+        """Give dst the same files as src by linking blobs; files whose manifest entry
+        still points at their blob are not re-read, so this is metadata-only."""
+        src, dst = Path(src), Path(dst)
+        manifest, out = read_manifest(src), read_manifest(dst)
+        stats = {"linked": 0, "copied": 0, "hashed": 0}
+        for name in names:
+            p = src / name
+            if not p.is_file():
+                continue
+            digest = manifest.get(name)
+            if not digest or not _same_file(p, self.path(digest)):
+                digest = self.ingest(p)  # never ingested, edited since, or blob collected
+                manifest[name] = digest
+                stats["hashed"] += 1
+            stats["linked" if self.link(digest, dst / name) else "copied"] += 1
+            out[name] = digest
+        write_text(src / MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+        write_text(dst / MANIFEST, json.dumps(out, indent=2, sort_keys=True))
+        return stats
+
+    def stats(self) -> Dict[str, int]:
+        blobs = size = unreferenced = 0
+        for blob in self._iter_blobs():
+            st = blob.stat()
+            blobs += 1
+            size += st.st_size
+            unreferenced += st.st_nlink <= 1
+        return {"blobs": blobs, "bytes": size, "unreferenced": unreferenced}
+
+    def gc(self, dry_run: bool = False) -> Dict[str, int]:
+        """Remove blobs no folder links to any more (link count 1: only the store)."""
+        removed = freed = 0
+        for blob in self._iter_blobs():
+            try:
+                st = blob.stat()
+                if st.st_nlink > 1:
+                    continue
+                if not dry_run:
+                    blob.unlink()
+                removed += 1
+                freed += st.st_size
+            except FileNotFoundError:
+                continue
+        return {"removed": removed, "bytes": freed}
+
+    def _iter_blobs(self):
+        for shard in self.root.iterdir():
+            if shard.is_dir() and len(shard.name) == 2:
+                yield from (p for p in shard.iterdir() if not p.name.startswith("."))
@@ -0,0 +1,82 @@
+﻿import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional
+from .io import ensure_dir
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so near-repeats share a key."""
+    text = re.sub(r"[^a-z0-9]+", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+class SqliteCache:
+    """Small on-disk key/value cache with a TTL and size-bounded LRU eviction.
+
+    Values are JSON. A connection is opened per operation so one instance can be
+    shared by threads and pickled into worker processes."""
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int = 1000):
+        self.path = Path(path)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        ensure_dir(self.path.parent)
+        with closing(self._connect()) as db, db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                       "created_at REAL NOT NULL, last_used REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+            db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _count(self, db: sqlite3.Connection, name: str):
+        db.execute("INSERT INTO stats(name, value) VALUES(?, 1) "
+                   "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            row = db.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count(db, "misses")
+                return None
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self._count(db, "hits")
+            return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO entries(key, value, created_at, last_used) VALUES(?, ?, ?, ?)",
+                       (key, json.dumps(value, ensure_ascii=False), now, now))
+            (n,) = db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if n > self.max_entries:
+                db.execute("DELETE FROM entries WHERE key IN "
+                           "(SELECT key FROM entries ORDER BY last_used ASC LIMIT ?)", (n - self.max_entries,))
+
+    def stats(self) -> Dict[str, int]:
+        """Lifetime counters persisted in the cache file (shared across processes)."""
+        with closing(self._connect()) as db:
+            out = dict(db.execute("SELECT name, value FROM stats").fetchall())
+            (entries,) = db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return {"hits": out.get("hits", 0), "misses": out.get("misses", 0), "entries": entries}
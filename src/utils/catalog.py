@@ -0,0 +1,134 @@
+﻿import hashlib
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from .cache import normalize_text
+from .io import ensure_dir
+
+STATUSES = ("drafted", "failed_review", "saved", "published")
+
+_FOLDER_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})_(.+)$")
+_HASH_SUFFIX_RE = re.compile(r"-[0-9a-f]{8}$")
+
+FIELDS = ("topic", "slug", "base_slug", "date", "status", "review_notes", "content_hash", "published_url")
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def parse_folder_name(name: str) -> Dict[str, Optional[str]]:
+    """'{date}_{slug}' (the runner appends '-<sha1[:8]>' to the slug)."""
+    m = _FOLDER_RE.match(name)
+    date, slug = (m.group(1), m.group(2)) if m else (None, name)
+    return {"date": date, "slug": slug, "base_slug": _HASH_SUFFIX_RE.sub("", slug)}
+
+class Catalog:
+    """Index of every run folder, kept in SQLite so lookups by topic, slug, status or
+    date use B-tree indexes instead of walking run/outputs."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        ensure_dir(self.path.parent)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS runs (
+                folder TEXT PRIMARY KEY, topic TEXT, topic_norm TEXT, slug TEXT, base_slug TEXT, date TEXT,
+                status TEXT, review_notes TEXT, content_hash TEXT, published_url TEXT, updated_at REAL)""")
+            for col in ("topic_norm", "base_slug", "date", "status", "content_hash"):
+                db.execute(f"CREATE INDEX IF NOT EXISTS runs_{col} ON runs({col})")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def record(self, folder: Path, **fields: Any):
+        """Insert or update the row for folder; only the given fields change."""
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"unknown catalog fields: {sorted(unknown)}")
+        folder = Path(folder)
+        row = {k: v for k, v in parse_folder_name(folder.name).items() if k not in fields or fields[k] is None}
+        row.update({k: v for k, v in fields.items() if v is not None})
+        if "topic" in row:
+            row["topic_norm"] = normalize_text(row["topic"])
+        row["updated_at"] = time.time()
+        cols = ["folder"] + list(row)
+        sets = ", ".join(f"{c} = excluded.{c}" for c in row)
+        with closing(self._connect()) as db, db:
+            db.execute(f"INSERT INTO runs ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                       f"ON CONFLICT(folder) DO UPDATE SET {sets}",
+                       [str(folder.resolve())] + list(row.values()))
+
+    def get(self, folder: Path) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM runs WHERE folder = ?", (str(Path(folder).resolve()),)).fetchone()
+        return dict(row) if row else None
+
+    def lookup(self, topic: str) -> List[Dict[str, Any]]:
+        """Runs with the same normalized topic or the same base slug ('have we written about this?')."""
+        norm = normalize_text(topic)
+        base = norm.replace(" ", "-")
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT * FROM runs WHERE topic_norm = ? UNION "
+                              "SELECT * FROM runs WHERE base_slug = ? ORDER BY date DESC", (norm, base)).fetchall()
+        return [dict(r) for r in rows]
+
+    def query(self, status: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+              unpublished: bool = False, limit: int = 100) -> List[Dict[str, Any]]:
+        where, args = [], []
+        if status:
+            where.append("status = ?"); args.append(status)
+        if unpublished:
+            where.append("published_url IS NULL AND status IN ('drafted', 'saved')")
+        if since:
+            where.append("date >= ?"); args.append(since)
+        if until:
+            where.append("date <= ?"); args.append(until)
+        sql = "SELECT * FROM runs" + (" WHERE " + " AND ".join(where) if where else "")
+        sql += " ORDER BY date DESC, folder LIMIT ?"
+        with closing(self._connect()) as db:
+            return [dict(r) for r in db.execute(sql, args + [limit]).fetchall()]
+
+    def rebuild(self, *roots: Path) -> int:
+        """One-off (re)indexing of existing run folders; returns the number of folders seen."""
+        n = 0
+        for root in roots:
+            if not Path(root).is_dir():
+                continue
+            for folder in sorted(p for p in Path(root).iterdir() if p.is_dir() and not p.name.startswith(".")):
+                fields = scan_folder(folder)
+                if fields:
+                    self.record(folder, **fields)
+                    n += 1
+        return n
+
+def _first_heading(path: Path) -> Optional[str]:
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            if line.strip():
+                return line.strip().lstrip("#").strip() or None
+    return None
+
+def scan_folder(folder: Path) -> Optional[Dict[str, Any]]:
+    """Derive catalog fields from the files in an existing run folder."""
+    draft = folder / "draft.md"
+    if not draft.exists():
+        return None
+    refs = folder / "references.txt"
+    refs_text = refs.read_text(encoding="utf-8", errors="replace") if refs.exists() else ""
+    published = folder / "published_url.txt"
+    fields: Dict[str, Any] = {
+        "topic": _first_heading(draft),
+        "content_hash": content_hash(draft.read_text(encoding="utf-8", errors="replace")),
+        "status": "saved" if (folder / "RUNLOG.txt").exists() else "drafted",
+    }
+    if refs_text.startswith("DRAFT FAILED REVIEW:"):
+        fields["status"] = "failed_review"
+        fields["review_notes"] = refs_text.split(":", 1)[1].strip()
+    if published.exists():
+        fields["status"] = "published"
+        fields["published_url"] = published.read_text(encoding="utf-8").strip() or None
+    return fields
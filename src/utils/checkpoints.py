@@ -0,0 +1,65 @@
+﻿import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, is_dataclass
+from functools import lru_cache
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional
+from .io import ensure_dir
+
+@lru_cache(maxsize=None)
+def _file_digest(path: str) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def code_version(module: ModuleType) -> str:
+    """Hash of a stage module's source, so editing a stage invalidates its checkpoints."""
+    return _file_digest(module.__file__)[:16]
+
+def input_hash(*parts: Any) -> str:
+    def default(o):
+        return asdict(o) if is_dataclass(o) else str(o)
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=default)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class Checkpoints:
+    """Per-run stage outputs stored as <run folder>/.checkpoints/<stage>.json,
+    each tagged with the hash of the inputs that produced it."""
+
+    def __init__(self, run_folder: Path, force: frozenset[str] = frozenset()):
+        self.dir = Path(run_folder) / ".checkpoints"
+        self.force = force
+        self.reused: list[str] = []
+        self._lock = threading.Lock()
+
+    def load(self, stage: str, key: str) -> Optional[dict]:
+        if stage in self.force:
+            return None
+        path = self.dir / f"{stage}.json"
+        try:
+            saved = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if saved.get("key") != key:
+            return None
+        with self._lock:
+            self.reused.append(stage)
+        return saved["data"]
+
+    def save(self, stage: str, key: str, data: Any):
+        ensure_dir(self.dir)
+        path = self.dir / f"{stage}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        payload = {"stage": stage, "key": key, "data": asdict(data) if is_dataclass(data) else data}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)  # a crash never leaves a half-written checkpoint behind
+
+    def cached(self, stage: str, key: str, cls, compute):
+        """Return cls(**saved) when the checkpoint matches key, else compute() and save it."""
+        data = self.load(stage, key)
+        if data is not None:
+            return cls(**data)
+        result = compute()
+        self.save(stage, key, result)
+        return result
@@ -0,0 +1,136 @@
+﻿import time
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+@dataclass
+class Task:
+    """One pipeline step. fn is called with the named inputs as keyword arguments and
+    returns a single value (one output), a tuple (several outputs) or None (no outputs).
+    describe, if set, turns the result into span args (sizes, counts) when tracing."""
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    describe: Optional[Callable[[Any], Dict[str, Any]]] = None
+
+@dataclass
+class TaskTiming:
+    name: str
+    start: float  # seconds since the DAG started
+    end: float
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+@dataclass
+class DagRun:
+    values: Dict[str, Any]
+    timings: Dict[str, TaskTiming] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_seconds: float = 0.0
+
+def _producers(tasks: List[Task], initial: Dict[str, Any] | set) -> Dict[str, str]:
+    producers: Dict[str, str] = {}
+    names = set()
+    for t in tasks:
+        if t.name in names:
+            raise ValueError(f"duplicate task name: {t.name}")
+        names.add(t.name)
+        for out in t.outputs:
+            if out in producers or out in initial:
+                raise ValueError(f"'{out}' is produced twice (by {t.name})")
+            producers[out] = t.name
+    for t in tasks:
+        for inp in t.inputs:
+            if inp not in producers and inp not in initial:
+                raise ValueError(f"task {t.name} needs '{inp}', which nothing produces")
+    return producers
+
+def plan(tasks: List[Task], initial: Dict[str, Any] | set) -> List[List[str]]:
+    """Group tasks into levels; tasks in the same level can run concurrently."""
+    producers = _producers(tasks, initial)
+    deps = {t.name: {producers[i] for i in t.inputs if i in producers} for t in tasks}
+    levels, done = [], set()
+    while len(done) < len(tasks):
+        level = [t.name for t in tasks if t.name not in done and deps[t.name] <= done]
+        if not level:
+            raise ValueError(f"dependency cycle among: {sorted(set(deps) - done)}")
+        levels.append(level)
+        done.update(level)
+    return levels
+
+def format_plan(tasks: List[Task], initial: Dict[str, Any] | set) -> str:
+    by_name = {t.name: t for t in tasks}
+    lines = []
+    for n, level in enumerate(plan(tasks, initial), start=1):
+        lines.append(f"Step {n}:" + (" (concurrent)" if len(level) > 1 else ""))
+        for name in level:
+            t = by_name[name]
+            lines.append(f"  {name}: {', '.join(t.inputs) or '-'} -> {', '.join(t.outputs) or '-'}")
+    return "\n".join(lines)
+
+def _critical_path(tasks: List[Task], producers: Dict[str, str], timings: Dict[str, TaskTiming]):
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    by_name = {t.name: t for t in tasks}
+    def longest(name: str) -> Tuple[float, List[str]]:
+        if name not in best:
+            prev = max((longest(producers[i]) for i in by_name[name].inputs if i in producers),
+                       key=lambda x: x[0], default=(0.0, []))
+            best[name] = (prev[0] + timings[name].seconds, prev[1] + [name])
+        return best[name]
+    return max((longest(t.name) for t in tasks), key=lambda x: x[0], default=(0.0, []))
+
+def run_dag(tasks: List[Task], initial: Dict[str, Any], max_workers: int = 4, tracer=None) -> DagRun:
+    """Run every task as soon as its inputs exist. The first failure cancels what has
+    not started yet and is re-raised once running tasks have finished. With a tracer
+    (utils.tracing.Tracer), each task call is recorded as a span."""
+    producers = _producers(tasks, initial)
+    plan(tasks, initial)  # reject cycles before starting anything
+    values = dict(initial)
+    timings: Dict[str, TaskTiming] = {}
+    pending = list(tasks)
+    t0 = time.perf_counter()
+
+    def call(task: Task):
+        start = time.perf_counter() - t0
+        if tracer is None:
+            result = task.fn(**{i: values[i] for i in task.inputs})
+        else:
+            with tracer.span(task.name) as span:
+                result = task.fn(**{i: values[i] for i in task.inputs})
+                if task.describe is not None:
+                    span.set(**task.describe(result))
+        return result, TaskTiming(task.name, start, time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stage") as pool:
+        running = {}
+        error = None
+        while pending or running:
+            if error is None:
+                for task in [t for t in pending if all(i in values for i in t.inputs)]:
+                    pending.remove(task)
+                    running[pool.submit(call, task)] = task
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                task = running.pop(fut)
+                try:
+                    result, timing = fut.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                timings[task.name] = timing
+                if len(task.outputs) == 1:
+                    values[task.outputs[0]] = result
+                elif task.outputs:
+                    values.update(zip(task.outputs, result))
+        if error is not None:
+            raise error
+
+    length, path = _critical_path(tasks, producers, timings)
+    return DagRun(values=values, timings=timings, wall_seconds=time.perf_counter() - t0,
+                  critical_path=path, critical_path_seconds=length)
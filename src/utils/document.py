@@ -0,0 +1,390 @@
+﻿"""Typed article tree shared by the draft stage, the runner and the Medium publisher.
+
+The draft stage builds a Document once and saves it as draft.json next to draft.md.
+Everything downstream (title/body split, HTML for the paste event, reference links)
+reads the tree instead of re-parsing markdown. Markdown from other sources (the
+runner's save_post) goes through parse_markdown() once, at save time. Blocks the tree
+does not model (quotes, tables, nested lists) are kept as verbatim "raw" markdown, so
+rendering the tree never loses what the author wrote.
+"""
+import hashlib
+import html
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+BLOCK_KINDS = ("p", "ul", "ol", "h3", "code", "hr", "refs", "raw")
+STALE_SLACK = 2.0  # seconds draft.md may postdate a draft.json without a source hash (bundle order)
+
+@dataclass
+class Block:
+    kind: str                  # one of BLOCK_KINDS; "refs" renders the document's citations
+    text: str = ""             # "raw": markdown emitted exactly as parsed
+    items: List[str] = field(default_factory=list)
+    lang: str = ""             # "code": the fence's info string
+
+@dataclass
+class Section:
+    heading: str               # "" for the intro before the first H2
+    blocks: List[Block] = field(default_factory=list)
+
+@dataclass
+class Citation:
+    n: int
+    title: str
+    url: str
+    accessed_at: str = ""
+
+    def reference_line(self) -> str:
+        return f"[{self.n}] {self.title} — {self.url} (accessed: {self.accessed_at})"
+
+@dataclass
+class Rendered:
+    markdown: str
+    title: str
+    body: str                  # markdown without the H1, what gets typed into the editor
+    html: str                  # body as HTML for the paste event
+
+@dataclass
+class Document:
+    title: str
+    standfirst: str = ""
+    sections: List[Section] = field(default_factory=list)
+    citations: List[Citation] = field(default_factory=list)
+    source_hash: str = ""      # sha256 of the draft.md saved with this tree; see load_document()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Document":
+        return cls(
+            title=data.get("title") or "Untitled",
+            standfirst=data.get("standfirst") or "",
+            sections=[Section(s.get("heading", ""), [Block(**b) for b in s.get("blocks") or []])
+                      for s in data.get("sections") or []],
+            citations=[Citation(**c) for c in data.get("citations") or []],
+            source_hash=data.get("source_hash") or "",
+        )
+
+    def links(self) -> List[Dict[str, str]]:
+        return [{"title": c.title, "url": c.url} for c in self.citations]
+
+    def reference_lines(self) -> List[str]:
+        return [c.reference_line() for c in self.citations]
+
+    def _walk(self, html_out: List[str]) -> Iterator[str]:
+        """Yield markdown chunks (header, then one per section) and append HTML as it goes."""
+        head = f"# {self.title}\n"
+        if self.standfirst:
+            head += f"*{self.standfirst}*\n"
+            html_out.append(f"<p><em>{inline_html(self.standfirst)}</em></p>")
+        yield head
+        for sec in self.sections:
+            md = ["\n"]
+            if sec.heading:
+                md.append(f"## {sec.heading}\n")
+                html_out.append(f"<h3>{inline_html(sec.heading)}</h3>")
+            for j, block in enumerate(sec.blocks):
+                if j:
+                    md.append("\n")
+                _render_block(block, self.citations, md, html_out)
+            yield "".join(md)
+
+    def iter_markdown(self) -> Iterator[str]:
+        return self._walk([])
+
+    def render(self) -> Rendered:
+        """Markdown, title/body and HTML from a single walk over the tree."""
+        out: List[str] = []
+        chunks = list(self._walk(out))
+        return Rendered(markdown="".join(chunks), title=self.title,
+                        body="".join(chunks)[len(f"# {self.title}\n"):].lstrip(), html="\n".join(out))
+
+    def to_markdown(self) -> str:
+        return "".join(self.iter_markdown())
+
+def _render_block(block: Block, citations: List[Citation], md: List[str], out: List[str]):
+    kind = block.kind
+    if kind == "p":
+        md.append(f"{block.text}\n")
+        m = _IMAGE_RE.fullmatch(block.text.strip())
+        if m:
+            out.append(f"<figure>{_img(m.group(1), m.group(2))}</figure>")
+        elif block.text.strip():
+            out.append(f"<p>{inline_html(' '.join(block.text.split(chr(10))))}</p>")
+    elif kind in ("ul", "ol"):
+        md.extend((f"{n}. " if kind == "ol" else "- ") + item + "\n" for n, item in enumerate(block.items, 1))
+        out.append(f"<{kind}>" + "".join(f"<li>{inline_html(i)}</li>" for i in block.items) + f"</{kind}>")
+    elif kind == "h3":
+        md.append(f"### {block.text}\n")
+        out.append(f"<h4>{inline_html(block.text)}</h4>")  # Medium only has two heading sizes
+    elif kind == "code":
+        # a fence longer than any backtick line inside, so the block closes where it did
+        inner = [len(ln.strip()) for ln in block.text.split("\n") if ln.strip() and not ln.strip().strip("`")]
+        fence = "`" * max([3] + [n + 1 for n in inner])
+        md.append(f"{fence}{block.lang}\n{block.text}\n{fence}\n")
+        out.append("<pre>" + html.escape(block.text, quote=False) + "</pre>")
+    elif kind == "hr":
+        md.append("---\n")
+        out.append("<hr>")
+    elif kind == "refs":
+        lines = [c.reference_line() for c in citations]
+        md.append(("\n".join(lines) if lines else "—") + "\n")
+        out.extend(f"<p>{inline_html(line)}</p>" for line in lines or ["—"])
+    elif kind == "raw":
+        md.append(f"{block.text}\n")
+        out.append(raw_html(block.text))
+    else:
+        raise ValueError(f"unknown block kind: {kind!r}")
+
+_INLINE_RE = re.compile(r"!\[([^\]]*)\]\(([^\s)]+)\)|\[([^\]]+)\]\((https?://[^\s)]+)\)"
+                        r"|\*\*(.+?)\*\*|\*(.+?)\*|`([^`]+)`")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(([^\s)]+)\)")
+
+def _img(alt: str, src: str) -> str:
+    return f'<img src="{html.escape(src)}" alt="{html.escape(alt)}">'
+
+def inline_html(text: str) -> str:
+    out, pos = [], 0
+    for m in _INLINE_RE.finditer(text):
+        out.append(html.escape(text[pos:m.start()], quote=False))
+        if m.group(2):
+            out.append(_img(m.group(1), m.group(2)))
+        elif m.group(4):
+            out.append(f'<a href="{html.escape(m.group(4))}">{html.escape(m.group(3), quote=False)}</a>')
+        elif m.group(5):
+            out.append(f"<strong>{html.escape(m.group(5), quote=False)}</strong>")
+        elif m.group(6):
+            out.append(f"<em>{html.escape(m.group(6), quote=False)}</em>")
+        else:
+            out.append(f"<code>{html.escape(m.group(7), quote=False)}</code>")
+        pos = m.end()
+    out.append(html.escape(text[pos:], quote=False))
+    return "".join(out)
+
+def raw_html(text: str) -> str:
+    """HTML for a raw block. Medium has no tables, so those are pasted as preformatted text."""
+    lines = text.split("\n")
+    first = lines[0].lstrip()
+    if first.startswith(">"):
+        paras: List[List[str]] = [[]]
+        for ln in lines:
+            body = re.sub(r"^\s*>\s?", "", ln).strip()  # lazy continuation lines have no ">"
+            if body:
+                paras[-1].append(body)
+            elif paras[-1]:
+                paras.append([])
+        return "<blockquote>" + "".join(f"<p>{inline_html(' '.join(p))}</p>" for p in paras if p) + "</blockquote>"
+    if first.startswith("|"):
+        return "<pre>" + html.escape(text, quote=False) + "</pre>"
+    if _ITEM_RE.match(first):
+        return _list_html(lines)
+    return "<p>" + "<br>".join(inline_html(ln.strip()) for ln in lines) + "</p>"
+
+def _list_html(lines: List[str]) -> str:
+    """Nested <ul>/<ol> from indented list lines; other lines continue the item above."""
+    out: List[str] = []
+    stack: List[tuple] = []  # (indent, tag) per open list
+    for ln in lines:
+        m = _ITEM_RE.match(ln.strip())
+        if not m:
+            if ln.strip() and out and out[-1].startswith("<li>"):
+                out[-1] += " " + inline_html(ln.strip())
+            continue
+        indent = len(ln) - len(ln.lstrip())
+        while stack and indent < stack[-1][0]:
+            out.append(f"</li></{stack.pop()[1]}>")
+        if stack and indent == stack[-1][0]:
+            out.append("</li>")
+        else:
+            tag = "ol" if m.group(1) else "ul"
+            out.append(f"<{tag}>")
+            stack.append((indent, tag))
+        out.append(f"<li>{inline_html(m.group(2))}")
+    while stack:
+        out.append(f"</li></{stack.pop()[1]}>")
+    return "".join(out)
+
+LINK_RE = re.compile(r"(?<!!)\[([^\]]+)\]\((https?://[^\s)]+)\)")  # not images
+_HEADING_RE = re.compile(r"(#{1,6})\s+(.*)")
+_ITEM_RE = re.compile(r"(?:[-*+]|(\d+)[.)])\s+(.*)")
+_FENCE_RE = re.compile(r"(`{3,}|~{3,})(.*)")
+_STANDFIRST_RE = re.compile(r"\*([^*].*?)\*")
+
+def parse_markdown(markdown: str, title: Optional[str] = None) -> tuple[Document, bool]:
+    """One pass over markdown from outside the pipeline. Returns (document, had_h1).
+
+    The title is the leading H1. Without one, `title` is used and the first line stays
+    content; with no `title` either, the first non-blank line becomes the title (what the
+    publisher always did). Inline links become citations, de-duplicated by (title, url).
+    Quotes, tables and nested lists become "raw" blocks holding their lines unchanged."""
+    doc = Document(title=title or "Untitled")
+    lines = (markdown or "").splitlines()
+    start, had_h1 = 0, False
+    for i, ln in enumerate(lines):
+        if ln.strip():
+            had_h1 = ln.lstrip().startswith("# ")
+            if had_h1 or title is None:
+                doc.title = ln.strip().lstrip("# ").strip() or doc.title
+                start = i + 1
+            else:
+                start = i
+            break
+    if had_h1 and start < len(lines):
+        m = _STANDFIRST_RE.fullmatch(lines[start].strip())
+        if m and not lines[start].strip().startswith("**"):
+            doc.standfirst = m.group(1)
+            start += 1
+
+    section = Section("")
+    para: List[str] = []
+    lst: Optional[Block] = None
+    lst_lines: List[str] = []      # the current list as written, in case it turns out nested
+    raw: Optional[List[str]] = None
+    code: Optional[List[str]] = None
+    fence, lang = "", ""
+    seen = set()
+
+    def flush():
+        nonlocal lst, raw
+        if para:
+            section.blocks.append(Block("p", "\n".join(para)))
+            para.clear()
+        if lst is not None:
+            section.blocks.append(lst)
+            lst = None
+        lst_lines.clear()
+        if raw is not None:
+            section.blocks.append(Block("raw", "\n".join(raw)))
+            raw = None
+
+    for ln in lines[start:]:
+        for m in LINK_RE.finditer(ln):
+            title, url = m.group(1).strip() or "Untitled", m.group(2).strip()
+            if (title.lower(), url) not in seen:
+                seen.add((title.lower(), url))
+                doc.citations.append(Citation(len(doc.citations) + 1, title, url))
+        if code is not None:
+            st = ln.strip()
+            if len(st) >= len(fence) and not st.strip(fence[0]):
+                section.blocks.append(Block("code", "\n".join(code), lang=lang))
+                code = None
+            else:
+                code.append(ln)
+            continue
+        st = ln.strip()
+        m = _FENCE_RE.match(st)
+        if m:
+            flush(); code = []
+            fence, lang = m.group(1), m.group(2).strip()
+            continue
+        if not st:
+            flush()
+            continue
+        if raw is not None and not _HEADING_RE.match(st):
+            raw.append(ln)  # a raw block runs to the next blank line
+            continue
+        if st.startswith((">", "|")):
+            flush(); raw = [ln]
+            continue
+        if lst is not None and ln[:1] in (" ", "\t"):
+            raw = lst_lines + [ln]  # nested or continued list: keep it as written
+            lst = None
+            lst_lines.clear()
+            continue
+        if re.fullmatch(r"(-{3,}|\*{3,}|_{3,})", st):
+            flush(); section.blocks.append(Block("hr"))
+            continue
+        m = _HEADING_RE.match(st)
+        if m:
+            flush()
+            if len(m.group(1)) <= 2:
+                if section.heading or section.blocks:
+                    doc.sections.append(section)
+                section = Section(m.group(2).strip())
+            else:
+                section.blocks.append(Block("h3", m.group(2).strip()))
+            continue
+        m = _ITEM_RE.match(st)
+        if m:
+            kind = "ol" if m.group(1) else "ul"
+            if para or (lst is not None and lst.kind != kind):
+                flush()
+            if lst is None:
+                lst = Block(kind)
+            lst.items.append(m.group(2))
+            lst_lines.append(ln)
+            continue
+        if lst is not None:
+            flush()
+        para.append(st)
+    if code is not None:
+        section.blocks.append(Block("code", "\n".join(code), lang=lang))
+    flush()
+    if section.heading or section.blocks:
+        doc.sections.append(section)
+    return doc, had_h1
+
+class LinkCollector:
+    """Inline links from markdown fed in chunks (the runner's chunked uploads), as citations
+    de-duplicated like parse_markdown() does. Holds at most the unfinished line, and of a
+    very long line (an embedded data: URI) only its last MAX_LINK characters."""
+
+    MAX_LINK = 4096  # a link longer than this is not treated as a reference
+
+    def __init__(self):
+        self.citations: List[Citation] = []
+        self._seen = set()
+        self._tail = ""
+
+    def feed(self, text: str):
+        tail = self._tail + text
+        nl = tail.rfind("\n")
+        if nl >= 0:
+            self._scan(tail[:nl])
+            tail = tail[nl + 1:]
+        if len(tail) > self.MAX_LINK:
+            # links that already closed cannot change as the line grows; keep only what may be the start of one
+            end = self._scan(tail)
+            tail = tail[max(end, len(tail) - self.MAX_LINK):]
+        self._tail = tail
+
+    def finish(self) -> List[Citation]:
+        self._scan(self._tail)
+        self._tail = ""
+        return self.citations
+
+    def _scan(self, text: str) -> int:
+        end = 0
+        for m in LINK_RE.finditer(text):
+            title, url = m.group(1).strip() or "Untitled", m.group(2).strip()
+            if (title.lower(), url) not in self._seen:
+                self._seen.add((title.lower(), url))
+                self.citations.append(Citation(len(self.citations) + 1, title, url))
+            end = m.end()
+        return end
+
+def load_document(folder: Path) -> Document:
+    """draft.json while it still matches draft.md, else draft.md parsed once (older runs, or a
+    draft.md edited by hand after the run). The match is by source_hash; trees saved before it
+    existed fall back to mtimes."""
+    ir, md = Path(folder) / "draft.json", Path(folder) / "draft.md"
+    if not md.exists():
+        if ir.exists():
+            return Document.from_dict(json.loads(ir.read_text(encoding="utf-8")))
+        raise FileNotFoundError(f"draft.md not found in {folder}")
+    raw = md.read_bytes()
+    if ir.exists():
+        doc = Document.from_dict(json.loads(ir.read_text(encoding="utf-8")))
+        if doc.source_hash:
+            if doc.source_hash == hashlib.sha256(raw).hexdigest():
+                return doc
+        elif md.stat().st_mtime <= ir.stat().st_mtime + STALE_SLACK:
+            return doc
+    return parse_markdown(raw.decode("utf-8"))[0]
@@ -0,0 +1,76 @@
+﻿import hashlib
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import yaml
+
+DEFAULT_RULES = Path(__file__).resolve().parents[2] / "config" / "intents.yaml"
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    keywords: Tuple[str, ...]
+    queries: Tuple[str, ...] = ()
+    outline: Dict[str, Any] = field(default_factory=dict, hash=False, compare=False)
+
+class IntentClassifier:
+    """All intent keywords compiled into one regex, scanned once per topic.
+
+    The pattern is a zero-width lookahead over an alternation, so every keyword
+    occurrence is found at every position (same semantics as the old per-keyword
+    `k in topic` checks, including overlapping matches). Results are memoized."""
+
+    def __init__(self, intents: List[Intent], version: str = "", cache_size: int = 131072):
+        self.intents = tuple(intents)
+        self.version = version  # hash of the rules file, part of stage checkpoint keys
+        owners: Dict[str, set] = {}
+        for i, intent in enumerate(self.intents):
+            for kw in intent.keywords:
+                owners.setdefault(kw.lower(), set()).add(i)
+        # longest first so a keyword that is a prefix of another does not shadow it;
+        # the shadowed prefix is credited through `implied` below
+        keywords = sorted(owners, key=len, reverse=True)
+        self._owners = {kw: frozenset().union(*(owners[k] for k in keywords if kw.startswith(k)))
+                        for kw in keywords}
+        self._pattern = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))") if keywords else None
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, topic: str) -> Tuple[Intent, ...]:
+        if self._pattern is None:
+            return ()
+        hit = set()
+        for m in self._pattern.finditer(topic.lower()):
+            hit |= self._owners[m.group(1)]
+        return tuple(self.intents[i] for i in sorted(hit))
+
+def load_rules(path: Path) -> IntentClassifier:
+    text = Path(path).read_text(encoding="utf-8")
+    data = yaml.safe_load(text) or {}
+    intents = []
+    for raw in data.get("intents") or []:
+        intents.append(Intent(
+            name=str(raw["name"]),
+            keywords=tuple(str(k).lower() for k in raw.get("keywords") or []),
+            queries=tuple(str(q) for q in raw.get("queries") or []),
+            outline=dict(raw.get("outline") or {}),
+        ))
+    return IntentClassifier(intents, version=hashlib.sha256(text.encode("utf-8")).hexdigest()[:16])
+
+@lru_cache(maxsize=None)
+def default_classifier() -> IntentClassifier:
+    return load_rules(DEFAULT_RULES)
+
+def classify(topic: str) -> Tuple[Intent, ...]:
+    return default_classifier().classify(topic)
+
+def apply_outline(intent: Intent, sections: List[Dict[str, Any]]):
+    """Apply an intent's outline ops to the section list in place."""
+    ops = intent.outline
+    for idx, h2 in (ops.get("rename") or {}).items():
+        sections[int(idx)]["h2"] = h2
+    for ins in ops.get("insert") or []:
+        sections.insert(int(ins["at"]), {"h2": ins["h2"], "bullets": list(ins.get("bullets") or [])})
+    for idx, bullets in (ops.get("add_bullets") or {}).items():
+        sections[int(idx)]["bullets"] += list(bullets)
@@ -1,18 +1,166 @@
-﻿from pathlib import Path
+﻿import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
 from typing import Dict, Any, Tuple
 
+ARCHIVE_FORMATS = ("tar.gz", "zip")
+
 def ensure_dir(p: Path) -> Path:
     p.mkdir(parents=True, exist_ok=True)
     return p
 
-def write_text(path: Path, content: str) -> Path:
+def _fsync_dir(path: Path):
+    if os.name == 'nt':  # directories cannot be opened for fsync on Windows
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_text(path: Path, content: str, fsync: bool = False) -> Path:
+    """Write via a temp file in the same directory and os.replace, so readers never see
+    a half-written file."""
     ensure_dir(path.parent)
-    path.write_text(content, encoding='utf-8')
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
     return path
 
 def write_lines(path: Path, lines: list[str]) -> Path:
     return write_text(path, '\n'.join(lines))
 
+class RunBundle:
+    """Stages a run's artifacts in a temp directory inside the run folder and publishes
+    them together on commit(): every staged file is fsynced in one batch, renamed into
+    place, then the folder itself is fsynced once.
+
+    `marker` (draft.md by default) is renamed last. Everything downstream (catalog,
+    similarity sync, audit, publisher) keys off draft.md, so a folder that has it has the
+    rest of the bundle too, and a crash before commit leaves the previous files untouched.
+    Pass archive="tar.gz" or "zip" to also write the bundle as one compressed file, and a
+    BlobStore (utils.blobs) as `blobs` to hardlink the published files into it."""
+
+    STALE_SECONDS = 3600  # staging dirs older than this are leftovers from a crashed run
+
+    def __init__(self, folder: Path, fsync: bool = True, archive: str | None = None, marker: str = 'draft.md',
+                 blobs=None):
+        if archive and archive not in ARCHIVE_FORMATS:
+            raise ValueError(f"archive must be one of {', '.join(ARCHIVE_FORMATS)}")
+        self.folder = ensure_dir(Path(folder))
+        self.fsync = fsync
+        self.archive = archive
+        self.marker = marker
+        self.blobs = blobs
+        self._sweep()
+        self.staging = Path(tempfile.mkdtemp(prefix='.bundle-', dir=self.folder))
+        self._names: list[str] = []
+        self._lock = threading.Lock()
+        self.committed = False
+
+    def _sweep(self):
+        cutoff = time.time() - self.STALE_SECONDS
+        for p in self.folder.glob('.bundle-*'):
+            try:
+                if p.is_dir() and p.stat().st_mtime < cutoff:
+                    shutil.rmtree(p, ignore_errors=True)
+            except OSError:
+                pass
+
+    def _stage(self, name: str) -> Path:
+        if Path(name).name != name:
+            raise ValueError(f"bundle entries are plain file names, got {name!r}")
+        with self._lock:
+            if self.committed:
+                raise RuntimeError("bundle already committed")
+            if name not in self._names:
+                self._names.append(name)
+        return self.staging / name
+
+    def add(self, name: str, content: str) -> Path:
+        """Stage a text file (UTF-8, newlines written as given)."""
+        path = self._stage(name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        return path
+
+    def adopt(self, src: Path, name: str) -> Path:
+        """Move an existing file (e.g. a streamed draft.md.part) into the bundle."""
+        path = self._stage(name)
+        os.replace(src, path)
+        return path
+
+    def commit(self) -> list[Path]:
+        with self._lock:
+            if self.committed:
+                raise RuntimeError("bundle already committed")
+            self.committed = True
+            names = [n for n in self._names if n != self.marker]
+            names += [n for n in self._names if n == self.marker]
+        if self.fsync:
+            for name in names:
+                with open(self.staging / name, 'rb+') as f:
+                    os.fsync(f.fileno())
+        published = []
+        for name in names:
+            dst = self.folder / name
+            os.replace(self.staging / name, dst)
+            published.append(dst)
+        shutil.rmtree(self.staging, ignore_errors=True)
+        if self.fsync:
+            _fsync_dir(self.folder)
+        if self.blobs is not None:
+            self.blobs.ingest_folder(self.folder, names)
+        if self.archive:
+            published.append(self._write_archive(names))
+        return published
+
+    def abort(self):
+        with self._lock:
+            self.committed = True
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def _write_archive(self, names: list[str]) -> Path:
+        dst = self.folder / f"bundle.{self.archive}"
+        tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        arc = f"{self.folder.name}/"
+        if self.archive == 'zip':
+            with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+                for name in names:
+                    z.write(self.folder / name, arc + name)
+        else:
+            with tarfile.open(tmp, 'w:gz') as t:
+                for name in names:
+                    t.add(self.folder / name, arc + name)
+        if self.fsync:
+            with open(tmp, 'rb+') as f:
+                os.fsync(f.fileno())
+        os.replace(tmp, dst)
+        return dst
+
+    def __enter__(self) -> "RunBundle":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            if not self.committed:
+                self.commit()
+        else:
+            self.abort()
+
 def run_folder(root: Path, date_slug: str, topic_slug: str) -> Path:
     return ensure_dir(root / f"{date_slug}_{topic_slug}")
 
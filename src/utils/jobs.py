@@ -0,0 +1,113 @@
+﻿import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from .io import ensure_dir
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED = ("done", "failed", "cancelled")
+
+class QueueFull(RuntimeError):
+    """submit() refused: `max_queued` jobs are already waiting."""
+
+class JobQueue:
+    """Generation jobs in SQLite, so queued work survives a daemon restart.
+
+    claim() hands the oldest queued job to exactly one worker (BEGIN IMMEDIATE makes the
+    select-and-mark atomic across threads and processes). Jobs still marked running when
+    a daemon starts were interrupted; recover() puts them back in the queue, up to
+    `max_attempts` runs per job."""
+
+    def __init__(self, path: Path, max_attempts: int = 3):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        ensure_dir(self.path.parent)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY, topic TEXT NOT NULL, tone TEXT, options TEXT NOT NULL,
+                status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT,
+                created_at REAL, started_at REAL, finished_at REAL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def submit(self, topic: str, tone: Optional[str] = None, options: Optional[Dict[str, Any]] = None,
+               max_queued: Optional[int] = None) -> int:
+        with closing(self._connect()) as db, db:
+            db.execute("BEGIN IMMEDIATE")  # count and insert as one step, or two submits can both squeeze in
+            if max_queued is not None:
+                (queued,) = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()
+                if queued >= max_queued:
+                    raise QueueFull(f"{queued} job(s) already queued (max {max_queued})")
+            return db.execute("INSERT INTO jobs(topic, tone, options, status, created_at) VALUES(?, ?, ?, 'queued', ?)",
+                              (topic, tone, json.dumps(options or {}), time.time())).lastrowid
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job running and return it, or None when the queue is empty."""
+        with closing(self._connect()) as db, db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                           (time.time(), row[0]))
+        return self.get(row[0]) if row is not None else None
+
+    def finish(self, job_id: int, result: Dict[str, Any]):
+        self._close(job_id, "done", result=json.dumps(result, ensure_ascii=False))
+
+    def fail(self, job_id: int, error: str):
+        self._close(job_id, "failed", error=error)
+
+    def _close(self, job_id: int, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with closing(self._connect()) as db, db:
+            db.execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                       (status, result, error, time.time(), job_id))
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that has not started; False if it is running or finished."""
+        with closing(self._connect()) as db, db:
+            n = db.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                           (time.time(), job_id)).rowcount
+        return n > 0
+
+    def recover(self) -> int:
+        """Requeue jobs a previous daemon left running; fail those out of attempts."""
+        with closing(self._connect()) as db, db:
+            db.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? "
+                       "WHERE status = 'running' AND attempts >= ?",
+                       (time.time(), f"interrupted {self.max_attempts} time(s), giving up", self.max_attempts))
+            return db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'").rowcount
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = _job(row)
+            if job["status"] == "queued":
+                (ahead,) = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?",
+                                      (job_id,)).fetchone()
+                job["position"] = ahead
+        return job
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM jobs" + (" WHERE status = ?" if status else "") + " ORDER BY id DESC LIMIT ?"
+        with closing(self._connect()) as db:
+            return [_job(r) for r in db.execute(sql, ([status] if status else []) + [limit]).fetchall()]
+
+    def counts(self) -> Dict[str, int]:
+        with closing(self._connect()) as db:
+            found = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {s: found.get(s, 0) for s in JOB_STATUSES}
+
+def _job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["options"] = json.loads(job["options"] or "{}")
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
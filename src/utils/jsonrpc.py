@@ -0,0 +1,81 @@
+﻿"""JSON-RPC framing shared by both MCP servers: one JSON value per line of stdin/stdout.
+
+Lines are read and written as bytes. Each line is parsed without first being stripped
+or decoded, so a multi-megabyte save_post payload is not copied before parsing.
+Responses are UTF-8 with no \\uXXXX escaping. Lines of FAST_MIN_BYTES or more are parsed
+with orjson when it is installed, and the standard json module handles everything else.
+orjson is imported on the first such line, because importing it costs a few
+milliseconds. Like src.utils.tracing, this module loads before the first tools/call.
+"""
+import json
+import threading
+
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+FAST_MIN_BYTES = 16 * 1024  # smaller lines parse in microseconds with either backend
+
+_orjson = None  # module once imported, False if not installed
+
+def _fast():
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+        except ImportError:  # optional: pip install orjson
+            orjson = False
+        _orjson = orjson
+    return _orjson
+
+def backend() -> str:
+    return "orjson" if _fast() else "json"
+
+def loads(line: bytes):
+    if len(line) >= FAST_MIN_BYTES and _fast():
+        return _orjson.loads(line)
+    return json.loads(line)
+
+def dumps(obj) -> bytes:
+    if _orjson:  # only once a large request pulled it in; responses themselves are small
+        try:
+            return _orjson.dumps(obj)
+        except TypeError:  # e.g. ints beyond 64 bits; the stdlib encoder takes anything JSON can
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def frame(obj) -> bytes:
+    """One response (or batch of responses) as a newline-terminated line."""
+    return dumps(obj) + b"\n"
+
+def expects_reply(item) -> bool:
+    """Batch entries that get a response: requests and malformed entries. A null id counts as
+    a notification, as it does in both servers' handlers, so the batch never waits for it."""
+    return not isinstance(item, dict) or item.get("id") is not None
+
+class Batch:
+    """Responses to one batch array, emitted as a single array once every request in it
+    has answered. Requests may finish out of order on worker threads; add(None) accounts
+    for one that ends without a response (e.g. cancelled)."""
+
+    def __init__(self, expected: int, emit):
+        self._left = expected
+        self._replies: list = []
+        self._emit = emit
+        self._lock = threading.Lock()
+
+    def add(self, response: dict | None):
+        with self._lock:
+            if response is not None:
+                self._replies.append(response)
+            self._left -= 1
+            done = self._left == 0
+        if done and self._replies:
+            self._emit(self._replies)
+
+class _NoReply:
+    """Sink for notifications inside a batch: JSON-RPC sends them no response."""
+    __slots__ = ()
+
+    def add(self, response):
+        pass
+
+NO_REPLY = _NoReply()
@@ -0,0 +1,162 @@
+﻿"""Citation link checks: concurrent HEAD requests (GET when HEAD is refused) with per-host
+limits, a timeout per request and redirects followed, on plain asyncio streams so no HTTP
+dependency is needed. Definitive answers (live or dead) are cached by canonical URL in a
+SqliteCache; timeouts, 5xx and rate limits are rechecked next time. asyncio and ssl are
+imported on the first check, so importing this module (the review stage does) stays cheap."""
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote, urljoin, urlsplit, urlunsplit
+from .cache import SqliteCache
+
+OK, DEAD, UNREACHABLE, SKIPPED = "ok", "dead", "unreachable", "skipped"
+USER_AGENT = "Mozilla/5.0 (compatible; medium-blog-generator link check)"
+REDIRECTS = {301, 302, 303, 307, 308}
+HEAD_REFUSED = {400, 403, 405, 406, 501}  # servers that answer HEAD differently from GET
+TRANSIENT = {401, 403, 408, 425, 429}     # reachable but not answering us right now: not "dead"
+CACHE_VERSION = "v1"
+URL_RE = re.compile(r"https?://[^\s<>\"\]]+")
+
+@dataclass
+class LinkStatus:
+    url: str
+    state: str                  # ok | dead | unreachable | skipped
+    status: Optional[int] = None
+    final_url: str = ""
+    error: str = ""
+    checked_at: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.state in (OK, SKIPPED)
+
+def canonical_url(url: str) -> str:
+    """Cache key: lowercase scheme and host, no default port, userinfo or fragment, "/" for an empty path."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:  # out of range; the check reports it
+        return url.strip()
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+def classify(status: int) -> str:
+    if status < 400:
+        return OK
+    if status in TRANSIENT or status >= 500:
+        return UNREACHABLE
+    return DEAD
+
+class LinkChecker:
+    """Check many URLs at once: at most `concurrency` requests in flight and `per_host` per
+    host, `timeout` seconds per request (connect to headers). Picklable, like SqliteCache."""
+
+    def __init__(self, cache: Optional[SqliteCache] = None, concurrency: int = 16, per_host: int = 2,
+                 timeout: float = 10.0, max_redirects: int = 5):
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+
+    def check(self, urls: Iterable[str], refresh: bool = False) -> Dict[str, LinkStatus]:
+        """Status per given URL (duplicates and URLs with the same canonical form are checked once)."""
+        import asyncio
+        return asyncio.run(self.check_async(urls, refresh))
+
+    async def check_async(self, urls: Iterable[str], refresh: bool = False) -> Dict[str, LinkStatus]:
+        import asyncio, ssl
+        by_key: Dict[str, List[str]] = {}
+        for url in urls:
+            by_key.setdefault(canonical_url(url), []).append(url)
+        results: Dict[str, LinkStatus] = {}
+        todo = []
+        for key, originals in by_key.items():
+            hit = None if refresh or self.cache is None else self.cache.get(f"link:{CACHE_VERSION}:{key}")
+            if hit is not None:
+                results[key] = LinkStatus(**{**hit, "cached": True})
+            else:
+                todo.append(key)
+        limit = asyncio.Semaphore(self.concurrency)
+        hosts: Dict[str, asyncio.Semaphore] = {}
+        ctx = ssl.create_default_context()
+        checked = await asyncio.gather(*(self._check(key, limit, hosts, ctx) for key in todo))
+        for key, status in zip(todo, checked):
+            results[key] = status
+            if self.cache is not None and status.state in (OK, DEAD):
+                self.cache.put(f"link:{CACHE_VERSION}:{key}", asdict(status))
+        return {url: LinkStatus(**{**asdict(results[key]), "url": url})
+                for key, originals in by_key.items() for url in originals}
+
+    async def _check(self, url: str, limit: "asyncio.Semaphore", hosts: Dict[str, "asyncio.Semaphore"],
+                     ctx: "ssl.SSLContext") -> LinkStatus:
+        import asyncio
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                parts = urlsplit(current)
+                if parts.scheme not in ("http", "https") or not parts.hostname:
+                    if current == url:
+                        return LinkStatus(url, SKIPPED, error="not an http(s) URL", checked_at=time.time())
+                    return LinkStatus(url, OK, final_url=current, checked_at=time.time())  # e.g. redirect to mailto:
+                host = hosts.setdefault(parts.hostname, asyncio.Semaphore(self.per_host))
+                async with host, limit:  # host first: waiting on a busy host must not hold a global slot
+                    status, location = await asyncio.wait_for(self._request("HEAD", parts, ctx), self.timeout)
+                    if status in HEAD_REFUSED:
+                        status, location = await asyncio.wait_for(self._request("GET", parts, ctx), self.timeout)
+                if status in REDIRECTS and location:
+                    current = urljoin(current, location)
+                    continue
+                return LinkStatus(url, classify(status), status, current, checked_at=time.time())
+            return LinkStatus(url, DEAD, status, current, f"more than {self.max_redirects} redirects", time.time())
+        except asyncio.TimeoutError:
+            return LinkStatus(url, UNREACHABLE, None, current, f"timed out after {self.timeout:g}s", time.time())
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:  # DNS, refused, TLS, malformed reply
+            return LinkStatus(url, UNREACHABLE, None, current, f"{type(e).__name__}: {e}", time.time())
+
+    async def _request(self, method: str, parts, ctx: "ssl.SSLContext") -> tuple[int, str]:
+        """Status and Location of one request; the body is never read."""
+        import asyncio
+        https = parts.scheme == "https"
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or (443 if https else 80),
+                                                       ssl=ctx if https else None)
+        try:
+            safe = "/%:@!$&'()*+,;=~-._?"  # only what is not valid in a request line gets escaped
+            target = quote(parts.path or "/", safe=safe) + (f"?{quote(parts.query, safe=safe)}" if parts.query else "")
+            host = parts.netloc.rsplit("@", 1)[-1]
+            if not host.isascii():
+                host = host.encode("idna").decode("ascii")
+            writer.write((f"{method} {target} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n"
+                          "Accept: */*\r\nConnection: close\r\n\r\n").encode("ascii"))
+            await writer.drain()
+            line = await reader.readline()
+            fields = line.split(None, 2)
+            if len(fields) < 2 or not fields[0].startswith(b"HTTP/") or not fields[1].isdigit():
+                raise ValueError(f"not an HTTP response: {line[:60]!r}")
+            location = ""
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                if name.strip().lower() == "location":
+                    location = value.strip()
+            return int(fields[1]), location
+        finally:
+            writer.close()
+
+def urls_in(text: str) -> List[str]:
+    """http(s) URLs in references.txt lines or markdown, in order, without duplicates."""
+    seen, out = set(), []
+    for m in URL_RE.finditer(text):
+        url = m.group(0).rstrip(".,;:")
+        while url.endswith(")") and url.count(")") > url.count("("):  # markdown (url), keep Foo_(bar)
+            url = url[:-1].rstrip(".,;:")
+        if url not in seen:
+            seen.add(url)
+            out.append(url)
+    return out
@@ -0,0 +1,244 @@
+﻿import hashlib
+import random
+import re
+import sqlite3
+import struct
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from .cache import normalize_text
+from .io import ensure_dir
+
+NUM_PERM = 64
+BANDS = 16            # 16 bands x 4 rows: candidates start showing up around 0.5 Jaccard
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+_rng = random.Random(1729)  # fixed seed: signatures must be stable across processes and runs
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+def shingles(text: str, kind: str) -> set:
+    """Topics use character 5-grams (robust to small wording changes), drafts word 3-grams."""
+    norm = normalize_text(text)
+    if kind == "topic":
+        padded = f" {norm} "
+        return {padded[i:i + 5] for i in range(max(1, len(padded) - 4))}
+    words = norm.split()
+    if len(words) < 3:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+def signature(items: Iterable[str]) -> Tuple[int, ...]:
+    hashes = [_hash64(s) for s in items]
+    if not hashes:
+        return tuple([_MASK] * NUM_PERM)
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_WORD_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+class DraftSignature:
+    """signature(shingles(text, "draft")) built from chunks of text, for drafts that are
+    streamed to disk and never held in memory whole. Only the last two words and an
+    unfinished word are kept between chunks."""
+
+    def __init__(self):
+        self._mins = [_MASK] * NUM_PERM
+        self._seen = False  # at least one shingle hashed
+        self._last: List[str] = []  # up to two previous words, for 3-grams across chunks
+        self._partial = ""
+
+    def feed(self, text: str):
+        text = self._partial + text.lower()
+        cut = len(text.rstrip(_WORD_CHARS))  # start of a word that may continue in the next chunk
+        self._partial = text[cut:]
+        self._words(_WORD_RE.findall(text, 0, cut))
+
+    def _words(self, words: List[str]):
+        if not words:
+            return
+        words = self._last + words
+        self._last = words[-2:]
+        grams = {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+        if not grams:
+            return
+        self._seen = True
+        hashes = [_hash64(g) for g in grams]
+        self._mins = [min(m, min((a * h + b) % _PRIME for h in hashes)) for m, (a, b) in zip(self._mins, _PERMS)]
+
+    def finish(self) -> Tuple[int, ...]:
+        self._words(_WORD_RE.findall(self._partial))
+        self._partial = ""
+        if not self._seen:  # fewer than three words: shingles() uses the words themselves
+            return signature({" ".join(self._last)} if self._last else set())
+        return tuple(self._mins)
+
+def estimate(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+def _buckets(sig: Tuple[int, ...]) -> List[int]:
+    out = []
+    for band in range(BANDS):
+        raw = struct.pack(f"<{ROWS}Q", *sig[band * ROWS:(band + 1) * ROWS])
+        # signed 63-bit bucket id; the band number is mixed in so bands never collide
+        out.append(int.from_bytes(hashlib.blake2b(raw, digest_size=8, salt=bytes([band])).digest(), "little") >> 1)
+    return out
+
+class SimilarityIndex:
+    """Persistent MinHash/LSH index over topics and drafts, keyed by run folder.
+
+    Queries hash the text once and do a single indexed bucket lookup, so cost does not
+    grow with the number of indexed posts."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        ensure_dir(self.path.parent)
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, "
+                       "key TEXT NOT NULL, sig BLOB NOT NULL, mtime REAL, UNIQUE(kind, key))")
+            db.execute("CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER NOT NULL, doc_id INTEGER NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets(bucket)")
+            db.execute("CREATE INDEX IF NOT EXISTS buckets_doc ON buckets(doc_id)")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state.pop("_local", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _reader(self) -> sqlite3.Connection:
+        # queries are on the hot path: keep one read connection per thread instead of reopening
+        local = self.__dict__.setdefault("_local", threading.local())
+        db = getattr(local, "db", None)
+        if db is None:
+            db = local.db = self._connect()
+        return db
+
+    def _signature(self, kind: str, text: str) -> Tuple[int, ...]:
+        # save_post checks a draft with similar() and then add()s the same text; remember the
+        # last signature per kind on this thread so large drafts are only shingled once. Keyed by
+        # a digest so the cache never pins the draft itself; hashing costs a fraction of shingling
+        local = self.__dict__.setdefault("_local", threading.local())
+        last = local.__dict__.setdefault("sigs", {})
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        hit = last.get(kind)
+        if hit is not None and hit[0] == digest:
+            return hit[1]
+        sig = signature(shingles(text, kind))
+        last[kind] = (digest, sig)
+        return sig
+
+    def add(self, kind: str, key: str, text: Optional[str], mtime: Optional[float] = None,
+            sig: Optional[Tuple[int, ...]] = None):
+        """Insert or replace the entry for (kind, key). Pass `sig` (e.g. from DraftSignature)
+        instead of the text when it is already known."""
+        sig = sig or self._signature(kind, text)
+        blob = struct.pack(f"<{NUM_PERM}Q", *sig)
+        with closing(self._connect()) as db, db:
+            db.execute("BEGIN IMMEDIATE")  # take the write lock before the SELECT so concurrent adds of one key serialize
+            row = db.execute("SELECT id FROM docs WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if row:
+                db.execute("DELETE FROM buckets WHERE doc_id = ?", (row[0],))
+                db.execute("UPDATE docs SET sig = ?, mtime = ? WHERE id = ?", (blob, mtime, row[0]))
+                doc_id = row[0]
+            else:
+                doc_id = db.execute("INSERT INTO docs(kind, key, sig, mtime) VALUES(?, ?, ?, ?)",
+                                    (kind, key, blob, mtime)).lastrowid
+            db.executemany("INSERT INTO buckets(bucket, doc_id) VALUES(?, ?)",
+                           [(b, doc_id) for b in _buckets(sig)])
+
+    def similar(self, kind: str, text: Optional[str], threshold: float = 0.0, exclude: Iterable[str] = (),
+                sig: Optional[Tuple[int, ...]] = None) -> List[Tuple[str, float]]:
+        """(key, estimated Jaccard) for indexed entries of this kind, best first."""
+        sig = sig or self._signature(kind, text)
+        buckets = _buckets(sig)
+        skip = set(exclude)
+        db = self._reader()
+        # two indexed lookups (bucket -> doc ids -> rows); a single JOIN lets the planner scan docs by kind
+        ids = [r[0] for r in db.execute(
+            f"SELECT DISTINCT doc_id FROM buckets WHERE bucket IN ({','.join('?' * len(buckets))})", buckets)]
+        rows = db.execute(f"SELECT key, sig FROM docs WHERE id IN ({','.join('?' * len(ids))}) AND +kind = ?",
+                          ids + [kind]).fetchall() if ids else []
+        out = []
+        for key, blob in rows:
+            if key in skip:
+                continue
+            score = estimate(sig, struct.unpack(f"<{NUM_PERM}Q", blob))
+            if score >= threshold:
+                out.append((key, score))
+        return sorted(out, key=lambda x: -x[1])
+
+    def mtimes(self, kind: str) -> Dict[str, float]:
+        with closing(self._connect()) as db:
+            return dict(db.execute("SELECT key, mtime FROM docs WHERE kind = ?", (kind,)).fetchall())
+
+    def sync(self, *roots: Path) -> int:
+        """Index drafts (and their H1 as topic) that are new or changed since the last sync."""
+        known = self.mtimes("draft")
+        n = 0
+        for root in roots:
+            if not Path(root).is_dir():
+                continue
+            for draft in Path(root).glob("*/draft.md"):
+                key = str(draft.parent.resolve())
+                mtime = draft.stat().st_mtime
+                if known.get(key) == mtime:
+                    continue
+                text = draft.read_text(encoding="utf-8-sig", errors="replace")
+                title = next((ln.strip().lstrip("#").strip() for ln in text.splitlines() if ln.strip()), "")
+                self.add("draft", key, text, mtime)
+                if title:
+                    self.add("topic", key, title, mtime)
+                n += 1
+        return n
+
+DUPLICATE_ACTIONS = ("warn", "abort", "off")
+
+class DuplicateGuard:
+    """Similarity index plus the configured threshold/action ('warn', 'abort' or 'off')."""
+
+    def __init__(self, index: SimilarityIndex, threshold: float = 0.8, action: str = "warn"):
+        if action not in DUPLICATE_ACTIONS:
+            raise ValueError(f"similarity action must be one of {DUPLICATE_ACTIONS}, got {action!r}")
+        self.index = index
+        self.threshold = float(threshold)
+        self.action = action
+
+    def find(self, topic: str, markdown: Optional[str] = None, exclude: Iterable[str] = (),
+             draft_sig: Optional[Tuple[int, ...]] = None) -> List[Dict[str, object]]:
+        """Existing runs whose topic (or draft, when given as text or signature) is at least
+        `threshold` similar."""
+        if self.action == "off":
+            return []
+        exclude = list(exclude)
+        hits: Dict[str, Dict[str, object]] = {}
+        checks = [("topic", topic, None)] + ([("draft", markdown, draft_sig)] if markdown or draft_sig else [])
+        for kind, text, sig in checks:
+            for key, score in self.index.similar(kind, text, self.threshold, exclude, sig=sig):
+                prev = hits.get(key)
+                if prev is None or score > prev["similarity"]:
+                    hits[key] = {"folder": key, "kind": kind, "similarity": round(score, 3)}
+        return sorted(hits.values(), key=lambda h: -h["similarity"])
+
+    def add(self, folder: Path, topic: str, markdown: Optional[str], draft_sig: Optional[Tuple[int, ...]] = None):
+        key = str(Path(folder).resolve())
+        draft = Path(folder) / "draft.md"
+        mtime = draft.stat().st_mtime if draft.exists() else None
+        self.index.add("topic", key, topic, mtime)
+        self.index.add("draft", key, markdown, mtime, sig=draft_sig)
+
+def describe(dup: Dict[str, object]) -> str:
+    return f"near-duplicate of {dup['folder']} ({dup['kind']} similarity {dup['similarity']})"
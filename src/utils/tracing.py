@@ -0,0 +1,159 @@
+﻿"""Timed spans and per-request metrics.
+
+A Tracer collects spans and writes them in the Chrome trace event format, so a run's
+trace.json opens in chrome://tracing or https://ui.perfetto.dev. Callers take
+`tracer=None` when tracing is off; span(None, ...) hands back a shared no-op, so
+disabled tracing costs one `is None` check per call site.
+
+Metrics keeps a request count, error count and latency histogram per name for the MCP
+servers' `metrics` tool. Both servers import this module before their first tools/call,
+so it sticks to cheap standard-library imports (not even typing).
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_FILE = "trace.json"
+
+class Span:
+    __slots__ = ("name", "cat", "args")
+
+    def __init__(self, name: str, cat: str, args: dict):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def set(self, **args):
+        """Attach sizes/counts that are only known once the work is done."""
+        self.args.update(args)
+
+class Tracer:
+    """Thread-safe collector of complete ("X") trace events for one run or request."""
+
+    def __init__(self, name: str = "run", **meta):
+        self.meta = {"name": name, **meta}
+        self._t0 = time.perf_counter()
+        self._wall0 = time.time()
+        self._events: list[dict] = []
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        sp = Span(name, cat, args)
+        start = time.perf_counter()
+        try:
+            yield sp
+        except BaseException as e:
+            sp.args["error"] = type(e).__name__
+            raise
+        finally:
+            self.add(name, start, time.perf_counter(), cat, **sp.args)
+
+    def add(self, name: str, start: float, end: float, cat: str = "stage", **args):
+        """Record an interval measured elsewhere (time.perf_counter() values)."""
+        thread = threading.current_thread()
+        event = {"name": name, "cat": cat, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                 "ts": round((start - self._t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    @property
+    def events(self) -> list[dict]:
+        with self._lock:
+            spans = sorted(self._events, key=lambda e: e["ts"])
+            names = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": n}}
+                     for tid, n in self._threads.items()]
+        return names + spans
+
+    def to_json(self) -> str:
+        return json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms",
+                           "otherData": {**self.meta, "started": self._wall0}}, default=str)
+
+    def write(self, folder: Path, name: str = TRACE_FILE) -> Path:
+        from .io import write_text
+        path = Path(folder) / name
+        write_text(path, self.to_json())
+        return path
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+NO_SPAN = _NoSpan()
+
+def span(tracer: Tracer | None, name: str, cat: str = "stage", **args):
+    """tracer.span(...), or a shared no-op span when tracer is None."""
+    return NO_SPAN if tracer is None else tracer.span(name, cat, **args)
+
+# histogram bucket upper bounds in ms; the last bucket is everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+class _Stat:
+    __slots__ = ("count", "errors", "total", "max", "buckets", "recent")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.recent: deque = deque(maxlen=window)
+
+def _pct(ordered: list, p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+class Metrics:
+    """Request counts and latencies per name. The histogram covers the process lifetime;
+    p50/p95/p99 are computed over the last `window` requests of each name."""
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self.started = time.time()
+        self._stats: dict[str, _Stat] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, ok: bool = True):
+        ms = seconds * 1000
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = _Stat(self.window)
+            st.count += 1
+            st.errors += not ok
+            st.total += ms
+            st.max = max(st.max, ms)
+            st.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            st.recent.append(ms)
+
+    def snapshot(self, name: str | None = None) -> dict:
+        with self._lock:
+            stats = {k: (v.count, v.errors, v.total, v.max, list(v.buckets), sorted(v.recent))
+                     for k, v in self._stats.items() if name is None or k == name}
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        out = {}
+        for k, (count, errors, total, mx, buckets, recent) in sorted(stats.items()):
+            out[k] = {
+                "count": count, "errors": errors,
+                "mean_ms": round(total / count, 2), "max_ms": round(mx, 2),
+                "p50_ms": round(_pct(recent, 50), 2), "p95_ms": round(_pct(recent, 95), 2),
+                "p99_ms": round(_pct(recent, 99), 2),
+                "histogram": {label: n for label, n in zip(labels, buckets) if n},
+            }
+        return {"uptime_s": round(time.time() - self.started, 1), "requests": out}
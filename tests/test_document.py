@@ -0,0 +1,102 @@
+"""parse_markdown -> Document -> render round trips (nothing the author wrote is lost), and
+load_document() preferring draft.md once it no longer matches draft.json.
+
+    python -m pytest -q tests/test_document.py
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from src.utils.catalog import content_hash
+from src.utils.document import load_document, parse_markdown
+
+def roundtrip(body: str):
+    """Markdown and HTML of `body` under a title, after parsing it into the tree."""
+    md = f"# Title\n\n{body}"
+    doc, _ = parse_markdown(md)
+    rendered = doc.render()
+    return md, rendered.markdown, rendered.html, doc
+
+class RoundTripTest(unittest.TestCase):
+    def test_flat_lists(self):
+        md, out, html, _ = roundtrip("- a\n- b\n\n1. one\n2. two\n")
+        self.assertEqual(out, md)
+        self.assertIn("<ul><li>a</li><li>b</li></ul>", html)
+        self.assertIn("<ol><li>one</li><li>two</li></ol>", html)
+
+    def test_nested_list(self):
+        md, out, html, doc = roundtrip("- one\n  - nested\n    1. deep\n- two\n")
+        self.assertEqual(out, md)
+        self.assertEqual([b.kind for b in doc.sections[0].blocks], ["raw"])
+        self.assertEqual(html, "<ul><li>one<ul><li>nested<ol><li>deep</li></ol></li></ul></li><li>two</li></ul>")
+
+    def test_quote(self):
+        md, out, html, _ = roundtrip("> a quote\n> with **two** lines\n")
+        self.assertEqual(out, md)
+        self.assertEqual(html, "<blockquote><p>a quote with <strong>two</strong> lines</p></blockquote>")
+
+    def test_table(self):
+        md, out, html, _ = roundtrip("| a | b |\n|---|---|\n| 1 | 2 |\n")
+        self.assertEqual(out, md)
+        self.assertEqual(html, "<pre>| a | b |\n|---|---|\n| 1 | 2 |</pre>")
+
+    def test_images(self):
+        md, out, html, doc = roundtrip("![diagram](https://x.test/d.png)\n\nSee ![icon](i.png) and [docs](https://x.test/docs).\n")
+        self.assertEqual(out, md)
+        self.assertIn('<figure><img src="https://x.test/d.png" alt="diagram"></figure>', html)
+        self.assertIn('See <img src="i.png" alt="icon"> and <a href="https://x.test/docs">docs</a>.', html)
+        self.assertEqual([c.url for c in doc.citations], ["https://x.test/docs"])  # images are not references
+
+    def test_code_fences(self):
+        md, out, html, doc = roundtrip("```python\nx = 1\n\n```\n\n~~~\n```\nnot a fence end\n~~~\n")
+        self.assertEqual([(b.kind, b.lang) for b in doc.sections[0].blocks], [("code", "python"), ("code", "")])
+        self.assertIn("```python\nx = 1\n\n```\n", out)
+        self.assertIn("````\n```\nnot a fence end\n````\n", out)  # re-fenced so the inner line stays content
+        self.assertEqual(parse_markdown(out)[0].render().markdown, out)
+        self.assertIn("<pre>x = 1\n</pre>", html)
+
+    def test_sections_keep_raw_blocks(self):
+        md, out, html, doc = roundtrip("Intro.\n\n## Part\n> quoted\n\nAfter.\n")
+        self.assertEqual(out, md)
+        self.assertEqual([b.kind for b in doc.sections[1].blocks], ["raw", "p"])
+
+class LoadDocumentTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        self.md = "# Saved\n\nOriginal text.\n"
+        doc, _ = parse_markdown(self.md)
+        doc.source_hash = content_hash(self.md)
+        doc.standfirst = "only in the tree"  # tells the two sources apart
+        (self.folder / "draft.md").write_text(self.md, encoding="utf-8")
+        (self.folder / "draft.json").write_text(doc.to_json(), encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matching_tree_is_used(self):
+        self.assertEqual(load_document(self.folder).standfirst, "only in the tree")
+
+    def test_hand_edited_markdown_wins(self):
+        (self.folder / "draft.md").write_text(self.md + "\nEdited.\n", encoding="utf-8")
+        doc = load_document(self.folder)
+        self.assertEqual(doc.standfirst, "")
+        self.assertIn("Edited.", doc.to_markdown())
+
+    def test_tree_without_hash_falls_back_on_newer_markdown(self):
+        data = json.loads((self.folder / "draft.json").read_text(encoding="utf-8"))
+        del data["source_hash"]
+        (self.folder / "draft.json").write_text(json.dumps(data), encoding="utf-8")
+        self.assertEqual(load_document(self.folder).standfirst, "only in the tree")
+        later = (self.folder / "draft.json").stat().st_mtime + 60
+        os.utime(self.folder / "draft.md", (later, later))
+        self.assertEqual(load_document(self.folder).standfirst, "")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""JSON-RPC batches against both MCP servers as subprocesses: every batch gets its array back.
+
+    python -m pytest -q tests/test_jsonrpc.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+RUNNER = REPO / "mcp-runner" / "runner.py"
+BROWSER = REPO / "mcp-browser-python" / "server.py"
+
+def exchange(script: Path, *messages) -> list:
+    """Replies to `messages` (one line each); the server exits at end of input."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {k: v for k, v in os.environ.items() if not k.startswith("ANTHROPIC_")}
+        env.update(ANTHROPIC_API_KEY="", LOCAL_OUTPUT_DIR=str(Path(tmp) / "outputs"),
+                   STATE_DIR=str(Path(tmp) / "state"), BLOB_DIR=str(Path(tmp) / "blobs"))
+        lines = "".join(json.dumps(m) + "\n" for m in messages).encode("utf-8")
+        proc = subprocess.run([sys.executable, str(script)], cwd=str(REPO), env=env, input=lines,
+                              capture_output=True, timeout=30)
+    return [json.loads(ln) for ln in proc.stdout.splitlines() if ln.strip()]
+
+def request(method: str, req_id, **params) -> dict:
+    msg = {"jsonrpc": "2.0", "id": req_id, "method": method}
+    if params:
+        msg["params"] = params
+    return msg
+
+class BatchTest(unittest.TestCase):
+    def assertIds(self, replies: list, *ids):
+        self.assertEqual(len(replies), 1, replies)
+        self.assertIsInstance(replies[0], list)
+        self.assertEqual(sorted(r["id"] for r in replies[0]), sorted(ids))
+
+    def test_runner_cancel_with_id(self):
+        replies = exchange(RUNNER, [request("notifications/cancelled", 5, requestId=99),
+                                    request("tools/list", 7)])
+        self.assertIds(replies, 7)
+
+    def test_runner_null_id_call(self):
+        replies = exchange(RUNNER, [request("tools/call", None, name="metrics", arguments={}),
+                                    request("tools/list", 8)])
+        self.assertIds(replies, 8)
+
+    def test_runner_notifications_only(self):
+        self.assertEqual(exchange(RUNNER, [{"jsonrpc": "2.0", "method": "notifications/initialized"}],
+                                  request("prompts/list", 1)),
+                         [{"jsonrpc": "2.0", "id": 1, "result": {"prompts": []}}])
+
+    def test_browser_cancel_with_id(self):
+        replies = exchange(BROWSER, [request("notifications/cancelled", 5, requestId=99),
+                                     request("resources/list", 7)])
+        self.assertIds(replies, 5, 7)  # answered with "method not found", so the batch completes
+
+if __name__ == "__main__":
+    unittest.main()
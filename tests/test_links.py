@@ -0,0 +1,110 @@
+"""LinkChecker against a local stdlib HTTP stub; nothing leaves 127.0.0.1.
+
+    python -m pytest -q tests/test_links.py
+"""
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+from src.utils.cache import SqliteCache
+from src.utils.links import CACHE_VERSION, DEAD, OK, UNREACHABLE, LinkChecker, canonical_url
+
+SLOW_SECONDS = 0.6
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, location: str = ""):
+        self.send_response(status)
+        if location:
+            self.send_header("location", location)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/ok":
+            self._reply(200)
+        elif path == "/gone":
+            self._reply(404)
+        elif path == "/err":
+            self._reply(503)
+        elif path == "/slow":
+            time.sleep(SLOW_SECONDS)
+            self._reply(200)
+        elif path == "/redir":
+            self._reply(302, "/ok")
+        elif path == "/loop":
+            self._reply(302, "/loop")
+        elif path == "/nohead":
+            self._reply(405 if self.command == "HEAD" else 200)
+        else:
+            self._reply(404)
+
+    do_GET = do_HEAD
+
+class LinkCheckerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.port = cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def url(self, path: str, host: str = "127.0.0.1") -> str:
+        return f"http://{host}:{self.port}{path}"
+
+    def test_states(self):
+        urls = {name: self.url(f"/{name}") for name in ("ok", "gone", "err", "redir", "loop", "nohead")}
+        res = LinkChecker(timeout=5, max_redirects=3).check(urls.values())
+        self.assertEqual((res[urls["ok"]].state, res[urls["ok"]].status), (OK, 200))
+        self.assertEqual((res[urls["gone"]].state, res[urls["gone"]].status), (DEAD, 404))
+        self.assertEqual((res[urls["err"]].state, res[urls["err"]].status), (UNREACHABLE, 503))
+        self.assertEqual(res[urls["redir"]].state, OK)
+        self.assertEqual(res[urls["redir"]].final_url, self.url("/ok"))
+        self.assertEqual(res[urls["loop"]].state, DEAD)
+        self.assertIn("redirects", res[urls["loop"]].error)
+        self.assertEqual((res[urls["nohead"]].state, res[urls["nohead"]].status), (OK, 200))
+
+    def test_timeout(self):
+        url = self.url("/slow")
+        res = LinkChecker(timeout=0.2).check([url])[url]
+        self.assertEqual(res.state, UNREACHABLE)
+        self.assertIn("timed out", res.error)
+
+    def test_only_ok_and_dead_are_cached(self):
+        urls = [self.url("/ok"), self.url("/gone"), self.url("/err"), self.url("/slow?t=1")]
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SqliteCache(Path(tmp) / "links.sqlite", ttl_seconds=3600)
+            checker = LinkChecker(cache, timeout=0.2)
+            checker.check(urls)
+            cached = {u for u in urls if cache.get(f"link:{CACHE_VERSION}:{canonical_url(u)}") is not None}
+            self.assertEqual(cached, {self.url("/ok"), self.url("/gone")})
+            again = checker.check(urls)
+            self.assertEqual({u for u in urls if again[u].cached}, cached)
+            self.assertEqual(again[self.url("/gone")].state, DEAD)
+            self.assertFalse(any(r.cached for r in checker.check(urls, refresh=True).values()))
+
+    def test_busy_host_does_not_hold_global_slots(self):
+        slow = [self.url(f"/slow?n={i}") for i in range(4)]
+        fast = self.url("/ok", host="localhost")
+        started = time.time()
+        res = LinkChecker(concurrency=2, per_host=1, timeout=10).check(slow + [fast])
+        self.assertEqual(res[fast].state, OK)
+        self.assertLess(res[fast].checked_at - started, SLOW_SECONDS / 2)
+
+if __name__ == "__main__":
+    unittest.main()